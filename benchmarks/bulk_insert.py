@@ -0,0 +1,195 @@
+"""
+Сравнение построчной и пакетной вставки приемов пищи и записей веса.
+
+Запускается на отдельной (тестовой) базе PostgreSQL, таблицы создаются
+автоматически, созданные данные удаляются в конце:
+
+    python -m benchmarks.bulk_insert --dsn postgresql+asyncpg://localhost/bench
+
+Пакетная вставка приемов пищи распределяется по --days дням для каждого из
+--users пользователей, поэтому при users * days больше ~4700 проверяется и
+разбиение обновления user_daily_totals на несколько запросов.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Бенчмарк построчной и пакетной вставки."
+    )
+    parser.add_argument("--dsn", required=True, help="URL базы данных (asyncpg)")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--days", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument(
+        "--single-rows",
+        type=int,
+        default=500,
+        help="Сколько записей вставить построчно для сравнения",
+    )
+    return parser.parse_args()
+
+
+def configure_environment(dsn: str) -> None:
+    """
+    Настройки читаются при импорте src.settings, поэтому задаются до импорта
+    модулей приложения. Токены бенчмарку не нужны.
+    """
+    os.environ["DB_URL"] = dsn
+    os.environ["DB_SLOW_QUERY_MS"] = "0"
+    for name in ("BOT_TOKEN", "GPT_TOKEN", "PROXY_LIST", "USER_AGREEMENT_URL"):
+        os.environ.setdefault(name, "")
+
+
+# Пользователи бенчмарков получают telegram_id ниже этого значения, чтобы не
+# пересекаться с настоящими пользователями
+BENCH_TELEGRAM_ID_START = -(10**12)
+
+
+async def create_bench_users(count: int) -> list[int]:
+    """
+    Создаёт count пользователей бенчмарка и возвращает их id.
+    """
+    from src.models.user import User
+    from src.services.db.database import async_session
+
+    async with async_session() as session:
+        users = [
+            User(telegram_id=BENCH_TELEGRAM_ID_START - i) for i in range(count)
+        ]
+        session.add_all(users)
+        await session.commit()
+        return [user.id for user in users]
+
+
+async def delete_bench_users(user_ids: list[int]) -> None:
+    """
+    Удаляет пользователей бенчмарка вместе со всеми их данными.
+    """
+    from sqlalchemy import delete
+
+    from src.models.user import User
+    from src.models.user_daily_totals import UserDailyTotals
+    from src.models.user_food_log import UserFoodLog
+    from src.models.user_progress import UserProgress
+    from src.models.user_report import UserReport
+    from src.models.user_weight_history import UserWeightHistory
+    from src.services.db.database import async_session
+
+    async with async_session() as session:
+        for model in (
+            UserFoodLog,
+            UserWeightHistory,
+            UserReport,
+            UserDailyTotals,
+            UserProgress,
+        ):
+            await session.execute(delete(model).where(model.user_id.in_(user_ids)))
+        await session.execute(delete(User).where(User.id.in_(user_ids)))
+        await session.commit()
+
+
+def make_food_rows(user_ids: list[int], rows_count: int, days: int) -> list[dict]:
+    start = datetime.now() - timedelta(days=days)
+    return [
+        {
+            "user_id": random.choice(user_ids),
+            "food_name": f"Блюдо {i}",
+            "calories": random.uniform(50, 800),
+            "proteins": random.uniform(0, 50),
+            "fats": random.uniform(0, 50),
+            "carbohydrates": random.uniform(0, 100),
+            "amount": 100,
+            "date_added": start
+            + timedelta(days=random.randrange(days), minutes=i % 1440),
+            "is_saved": True,
+        }
+        for i in range(rows_count)
+    ]
+
+
+def report(name: str, rows_count: int, elapsed: float) -> None:
+    print(
+        f"{name:<40} {rows_count:>8} строк  {elapsed:>8.2f} с  "
+        f"{rows_count / elapsed:>10.0f} строк/с"
+    )
+
+
+async def run(args) -> None:
+    from src.services.db.database import engine, init_db
+    from src.services.db.user_food_log_repository import (
+        bulk_create_food_logs,
+        create_food_log,
+        update_food_save_status,
+    )
+    from src.services.db.user_weight_history_repository import (
+        bulk_create_weight_records,
+        create_weight_record,
+    )
+
+    await init_db(engine)
+
+    user_ids = await create_bench_users(args.users)
+
+    try:
+        single_rows = make_food_rows(user_ids, args.single_rows, args.days)
+        started_at = time.perf_counter()
+        for i, row in enumerate(single_rows):
+            entry_uuid = f"bench-{i}-{time.time_ns()}"
+            nutrition_info = {**row, "food": row["food_name"]}
+            await create_food_log(row["user_id"], nutrition_info, 0, entry_uuid)
+            await update_food_save_status(row["user_id"], entry_uuid, "save_food")
+        report(
+            "Приемы пищи: построчно",
+            len(single_rows),
+            time.perf_counter() - started_at,
+        )
+
+        bulk_rows = make_food_rows(user_ids, args.rows, args.days)
+        started_at = time.perf_counter()
+        await bulk_create_food_logs(bulk_rows)
+        report(
+            "Приемы пищи: bulk_create_food_logs",
+            len(bulk_rows),
+            time.perf_counter() - started_at,
+        )
+
+        started_at = time.perf_counter()
+        for i in range(args.single_rows):
+            await create_weight_record(user_ids[i % len(user_ids)], 70 + i % 10)
+        report("Вес: построчно", args.single_rows, time.perf_counter() - started_at)
+
+        weight_rows = [
+            {
+                "user_id": user_ids[i % len(user_ids)],
+                "weight": 70 + i % 10,
+                "date_added": datetime.now() - timedelta(minutes=i),
+            }
+            for i in range(args.rows)
+        ]
+        started_at = time.perf_counter()
+        await bulk_create_weight_records(weight_rows)
+        report(
+            "Вес: bulk_create_weight_records",
+            len(weight_rows),
+            time.perf_counter() - started_at,
+        )
+    finally:
+        await delete_bench_users(user_ids)
+        await engine.dispose()
+
+
+def main():
+    args = parse_args()
+    configure_environment(args.dsn)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Проверка, что планировщик выбирает составные индексы для основных запросов
+дневника, веса и отчетов на реалистичном объёме данных.
+
+Скрипт создаёт --users пользователей и заполняет для них таблицы приемов
+пищи, веса и отчетов (по умолчанию 2 млн приемов пищи), выполняет ANALYZE,
+затем для каждого запроса выполняет EXPLAIN с настройками планировщика по
+умолчанию и ищет в плане ожидаемый индекс. Запускается на отдельной
+(тестовой) базе PostgreSQL: перед проверкой, как и при запуске приложения,
+выполняется init_db (создаются недостающие таблицы, колонки и индексы), а
+созданные данные удаляются в конце:
+
+    python -m benchmarks.explain_indexes --dsn postgresql+asyncpg://localhost/bench
+
+Если хотя бы один запрос не использует свой индекс, скрипт завершается с
+кодом 1.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.bulk_insert import (
+    BENCH_TELEGRAM_ID_START,
+    configure_environment,
+    create_bench_users,
+    delete_bench_users,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Проверка использования составных индексов через EXPLAIN."
+    )
+    parser.add_argument("--dsn", required=True, help="URL базы данных (asyncpg)")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument(
+        "--food-logs-per-user", type=int, default=200, help="Приемов пищи на человека"
+    )
+    parser.add_argument("--weights-per-user", type=int, default=50)
+    parser.add_argument("--reports-per-user", type=int, default=20)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument(
+        "--verbose", action="store_true", help="Выводить планы всех запросов"
+    )
+    return parser.parse_args()
+
+
+async def seed(args) -> None:
+    """
+    Заполняет таблицы для пользователей бенчмарка одним INSERT ... SELECT
+    на таблицу: так миллионы строк вставляются за секунды. Каждый десятый
+    прием пищи не сохранён в дневник, как неподтверждённые распознавания.
+    Суммы по дням не пересчитываются: проверяемые запросы их не читают.
+    """
+    from sqlalchemy import text
+
+    from src.services.db.database import async_session
+
+    users_filter = "u.telegram_id BETWEEN :last_telegram_id AND :first_telegram_id"
+    params = {
+        "first_telegram_id": BENCH_TELEGRAM_ID_START,
+        "last_telegram_id": BENCH_TELEGRAM_ID_START - args.users + 1,
+        "days": float(args.days),
+    }
+    statements = [
+        (
+            "user_food_logs",
+            args.food_logs_per_user,
+            "INSERT INTO user_food_logs (user_id, food_name, calories, proteins, "
+            "fats, carbohydrates, amount, date_added, is_saved, message_id, "
+            "entry_uuid) "
+            "SELECT u.id, 'Блюдо ' || g, random() * 800, random() * 50, "
+            "random() * 50, random() * 100, 100, "
+            "now() - random() * :days * interval '1 day', g % 10 <> 0, 0, "
+            "'explain-' || u.id || '-' || g "
+            "FROM users u CROSS JOIN generate_series(1, :count) g "
+            f"WHERE {users_filter}",
+        ),
+        (
+            "user_weight_history",
+            args.weights_per_user,
+            "INSERT INTO user_weight_history (user_id, weight, date_added) "
+            "SELECT u.id, 60 + random() * 40, "
+            "now() - random() * :days * interval '1 day' "
+            "FROM users u CROSS JOIN generate_series(1, :count) g "
+            f"WHERE {users_filter}",
+        ),
+        (
+            "user_reports",
+            args.reports_per_user,
+            "INSERT INTO user_reports (user_id, created_at, report_type, content) "
+            "SELECT u.id, now() - random() * :days * interval '1 day', "
+            "CASE WHEN g % 2 = 0 THEN 'nutrition-report' "
+            "ELSE 'quality-report' END, 'Отчет ' || g "
+            "FROM users u CROSS JOIN generate_series(1, :count) g "
+            f"WHERE {users_filter}",
+        ),
+    ]
+
+    for table, count, statement in statements:
+        started_at = time.perf_counter()
+        async with async_session() as session:
+            await session.execute(text(statement), {**params, "count": count})
+            await session.commit()
+        print(
+            f"{table:<24} {args.users * count:>10} строк  "
+            f"{time.perf_counter() - started_at:>8.2f} с"
+        )
+
+    async with async_session() as session:
+        for table, _, _ in statements:
+            await session.execute(text(f"ANALYZE {table}"))
+        await session.commit()
+
+
+def build_queries(user_id: int) -> list[tuple[str, str, object]]:
+    """
+    Запросы в том виде, в каком их строят репозитории, и индекс, который
+    каждый из них должен использовать.
+    """
+    from sqlalchemy import desc, func, select
+
+    from src.models.user_food_log import UserFoodLog
+    from src.models.user_report import UserReport
+    from src.models.user_weight_history import UserWeightHistory
+
+    day_start = datetime.combine(datetime.now().date(), datetime.min.time())
+    food_logs_index = "ix_user_food_logs_user_id_date_added_saved"
+    weight_index = "ix_user_weight_history_user_id_date_added"
+    reports_index = "ix_user_reports_user_id_report_type_created_at"
+
+    return [
+        (
+            "Последние приемы пищи",
+            food_logs_index,
+            select(UserFoodLog)
+            .where(UserFoodLog.user_id == user_id, UserFoodLog.is_saved == True)
+            .order_by(UserFoodLog.date_added.desc())
+            .limit(10),
+        ),
+        (
+            "Приемы пищи за день",
+            food_logs_index,
+            select(UserFoodLog).where(
+                UserFoodLog.user_id == user_id,
+                UserFoodLog.is_saved == True,
+                UserFoodLog.date_added >= day_start,
+                UserFoodLog.date_added < day_start + timedelta(days=1),
+            ),
+        ),
+        (
+            "Количество приемов пищи",
+            food_logs_index,
+            select(func.count(UserFoodLog.id)).where(
+                UserFoodLog.user_id == user_id, UserFoodLog.is_saved == True
+            ),
+        ),
+        (
+            "История веса",
+            weight_index,
+            select(UserWeightHistory)
+            .where(UserWeightHistory.user_id == user_id)
+            .order_by(desc(UserWeightHistory.date_added))
+            .limit(30),
+        ),
+        (
+            "Первый вес",
+            weight_index,
+            select(UserWeightHistory)
+            .where(UserWeightHistory.user_id == user_id)
+            .order_by(UserWeightHistory.date_added.asc())
+            .limit(1),
+        ),
+        (
+            "Последний отчет",
+            reports_index,
+            select(UserReport)
+            .where(UserReport.user_id == user_id)
+            .where(UserReport.report_type == "nutrition-report")
+            .order_by(UserReport.created_at.desc())
+            .limit(1),
+        ),
+    ]
+
+
+async def check_plans(user_id: int, verbose: bool) -> bool:
+    from sqlalchemy import text
+    from sqlalchemy.dialects import postgresql
+
+    from src.services.db.database import async_session
+
+    all_ok = True
+    async with async_session() as session:
+        for name, index_name, query in build_queries(user_id):
+            sql = query.compile(
+                dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+            )
+            result = await session.execute(text(f"EXPLAIN {sql}"))
+            plan = "\n".join(row[0] for row in result.all())
+
+            ok = index_name in plan
+            all_ok = all_ok and ok
+            print(f"{'OK' if ok else 'НЕТ ИНДЕКСА':<12} {name:<28} {index_name}")
+            if verbose or not ok:
+                print(plan, end="\n\n")
+    return all_ok
+
+
+async def run(args) -> bool:
+    from src.services.db.database import engine, init_db
+
+    await init_db(engine)
+
+    user_ids = await create_bench_users(args.users)
+    try:
+        await seed(args)
+        return await check_plans(user_ids[len(user_ids) // 2], args.verbose)
+    finally:
+        await delete_bench_users(user_ids)
+        await engine.dispose()
+
+
+def main():
+    args = parse_args()
+    configure_environment(args.dsn)
+    if not asyncio.run(run(args)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
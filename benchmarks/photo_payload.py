@@ -0,0 +1,185 @@
+"""
+Размер фотографии, отправляемой в языковую модель, до и после выбора размера
+(select_photo_size) и пережатия (prepare_image).
+
+Telegram присылает каждую фотографию в нескольких размерах; скрипт строит их
+из исходных файлов по стандартным сторонам Telegram, выбирает размер как бот
+и сравнивает с отправкой самого большого размера без обработки. Сеть не
+нужна, нужен Pillow (poetry install -E images):
+
+    python -m benchmarks.photo_payload photos/
+
+С --upstream каждая фотография дополнительно отправляется в модель в обоих
+вариантах и измеряется время распознавания. Для этого нужны GPT_TOKEN и
+PROXY_LIST в окружении или .env, запросы оплачиваются.
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Большие стороны размеров фотографии, которые присылает Telegram
+TELEGRAM_PHOTO_SIDES = (90, 320, 800, 1280, 2560)
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Бенчмарк размера фотографий, отправляемых в модель."
+    )
+    parser.add_argument("paths", nargs="+", type=Path, help="Файлы или папки")
+    parser.add_argument(
+        "--upstream",
+        action="store_true",
+        help="Измерить время распознавания в модели (платные запросы)",
+    )
+    return parser.parse_args()
+
+
+def configure_environment(upstream: bool) -> None:
+    """
+    Настройки читаются при импорте src.settings, поэтому задаются до импорта
+    модулей приложения. Без --upstream токены не нужны; с ним значения берутся
+    из окружения или .env, которые пустые значения здесь перекрыли бы.
+    """
+    os.environ.setdefault("DB_URL", "postgresql+asyncpg://localhost/bench")
+    if upstream:
+        return
+    for name in ("BOT_TOKEN", "GPT_TOKEN", "PROXY_LIST", "USER_AGREEMENT_URL"):
+        os.environ.setdefault(name, "")
+
+
+def find_images(paths: list[Path]) -> list[Path]:
+    images = []
+    for path in paths:
+        if path.is_dir():
+            images += sorted(
+                p for p in path.rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES
+            )
+        else:
+            images.append(path)
+    return images
+
+
+def telegram_photo_sizes(data: bytes) -> list[SimpleNamespace]:
+    """
+    Размеры фотографии, как их присылает Telegram: JPEG с большей стороной из
+    TELEGRAM_PHOTO_SIDES, не больше исходной.
+    """
+    from PIL import Image, ImageOps
+
+    sizes = []
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        for side in TELEGRAM_PHOTO_SIDES:
+            side = min(side, max(image.size))
+            resized = image.copy()
+            resized.thumbnail((side, side))
+            output = io.BytesIO()
+            resized.save(output, format="JPEG", quality=87)
+            sizes.append(
+                SimpleNamespace(
+                    width=resized.width, height=resized.height, data=output.getvalue()
+                )
+            )
+            if side == max(image.size):
+                break
+    return sizes
+
+
+async def recognize(image_data: bytes) -> float:
+    from src.services.logic.chat_gpt_service import retrieve_nutrition_data
+
+    started_at = time.perf_counter()
+    await retrieve_nutrition_data(
+        "", image_base64=base64.b64encode(image_data).decode("utf-8")
+    )
+    return time.perf_counter() - started_at
+
+
+def b64_size(data: bytes) -> int:
+    return len(base64.b64encode(data))
+
+
+async def run(args) -> None:
+    from src.settings import settings
+    from src.services.http.client_pool import http_client_pool
+    from src.services.media.image import (
+        PIL_AVAILABLE,
+        prepare_image,
+        select_photo_size,
+    )
+
+    if not PIL_AVAILABLE:
+        sys.exit("Нужен Pillow: poetry install -E images")
+
+    images = find_images(args.paths)
+    if not images:
+        sys.exit("Фотографии не найдены")
+
+    print(
+        f"{'Файл':<32} {'Наибольший':>11} {'Выбранный':>11} "
+        f"{'Пережатый':>11} {'Подготовка':>11}"
+        + (f" {'Время до':>9} {'Время после':>12}" if args.upstream else "")
+    )
+    totals = {"largest": 0, "selected": 0, "prepared": 0}
+    prepare_times, latencies_before, latencies_after = [], [], []
+    try:
+        for path in images:
+            sizes = telegram_photo_sizes(path.read_bytes())
+            largest = sizes[-1].data
+            selected = select_photo_size(sizes, settings.photo_target_side).data
+
+            started_at = time.perf_counter()
+            prepared = (await prepare_image(selected)).data
+            prepare_times.append(time.perf_counter() - started_at)
+
+            totals["largest"] += b64_size(largest)
+            totals["selected"] += b64_size(selected)
+            totals["prepared"] += b64_size(prepared)
+            line = (
+                f"{path.name[:32]:<32} {b64_size(largest) // 1024:>8} КБ "
+                f"{b64_size(selected) // 1024:>8} КБ "
+                f"{b64_size(prepared) // 1024:>8} КБ "
+                f"{prepare_times[-1] * 1000:>8.0f} мс"
+            )
+            if args.upstream:
+                latencies_before.append(await recognize(largest))
+                latencies_after.append(await recognize(prepared))
+                line += (
+                    f" {latencies_before[-1]:>7.2f} с {latencies_after[-1]:>10.2f} с"
+                )
+            print(line)
+    finally:
+        await http_client_pool.aclose()
+
+    print()
+    print(
+        f"Всего base64: наибольший {totals['largest'] // 1024} КБ, "
+        f"выбранный {totals['selected'] // 1024} КБ, "
+        f"пережатый {totals['prepared'] // 1024} КБ "
+        f"({totals['prepared'] / totals['largest']:.0%} от наибольшего)"
+    )
+    print(f"Подготовка: медиана {statistics.median(prepare_times) * 1000:.0f} мс")
+    if args.upstream:
+        print(
+            f"Распознавание: медиана {statistics.median(latencies_before):.2f} с "
+            f"без обработки, {statistics.median(latencies_after):.2f} с после"
+        )
+
+
+def main():
+    args = parse_args()
+    configure_environment(args.upstream)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
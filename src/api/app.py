@@ -1,18 +1,46 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
-from src.api.routers import achievements, nutrition, analytics, users
+from src.api.routers import achievements, nutrition, analytics, users, bot, service
+from src.bot.bot import setup_webhook, close_bot
+from src.settings import settings
+from src.services.http.client_pool import http_client_pool
+from src.services.logic.ai_report_jobs import ai_report_job_queue
+from src.services.logic.diary_import_jobs import diary_import_job_runner
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    В режиме webhook регистрирует webhook при старте. При остановке (в том
+    числе каждого воркера uvicorn) закрывает бота, останавливает фоновые
+    задачи и закрывает соединения к OpenAI.
+    """
+    webhook_mode = settings.bot_mode == "webhook"
+    if webhook_mode:
+        await setup_webhook()
+    try:
+        yield
+    finally:
+        if webhook_mode:
+            await close_bot()
+        await ai_report_job_queue.aclose()
+        await diary_import_job_runner.aclose()
+        await http_client_pool.aclose()
 
 
 def create_app() -> FastAPI:
+    webhook_mode = settings.bot_mode == "webhook"
     app = FastAPI(
         title="Diet Mate API",
         description="Backend-система приложения для интеллектуального контроля питания Diet Mate.",
         version="1.0.0",
         docs_url="/api/v1/docs",  # Swagger UI
         redoc_url="/api/v1/redoc",  # ReDoc
+        lifespan=lifespan,
     )
     app.add_middleware(
         CORSMiddleware,
@@ -26,6 +54,10 @@ def create_app() -> FastAPI:
     app.include_router(nutrition.router, prefix="/api/v1")
     app.include_router(analytics.router, prefix="/api/v1")
     app.include_router(achievements.router, prefix="/api/v1")
+    app.include_router(service.router, prefix="/api/v1")
+
+    if webhook_mode:
+        app.include_router(bot.router, prefix="/api/v1")
 
     return app
 
@@ -0,0 +1,17 @@
+from fastapi import HTTPException, Path
+
+from src.services.logic.ai_report_jobs import ai_report_job_queue
+from src.api.schemas.ai_report import AIReportJobResponse
+
+
+async def ai_report_job_status(
+    job_id: str = Path(..., description="ID задачи генерации отчета"),
+) -> AIReportJobResponse:
+    """
+    Возвращает статус задачи генерации AI отчета и сам отчет, если он готов.
+    """
+    job = await ai_report_job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена.")
+
+    return job
@@ -0,0 +1,28 @@
+import secrets
+from typing import Optional
+from aiogram.types import Update
+from fastapi import Header, HTTPException, Request
+
+from src.settings import settings
+from src.bot.bot import feed_update_in_background, get_bot
+
+
+async def bot_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: Optional[str] = Header(None),
+) -> dict:
+    """
+    Принимает обновление от Telegram и передаёт его в диспетчер бота. Ответ
+    возвращается сразу, обновление обрабатывается в фоне. Обновления без
+    верного секретного токена в заголовке отклоняются.
+    """
+    secret = settings.webhook_secret.get_secret_value()
+    if not secret or not secrets.compare_digest(
+        x_telegram_bot_api_secret_token or "", secret
+    ):
+        raise HTTPException(status_code=403, detail="Неверный секретный токен.")
+
+    bot = get_bot()
+    update = Update.model_validate(await request.json(), context={"bot": bot})
+    feed_update_in_background(bot, update)
+    return {"ok": True}
@@ -1,6 +1,6 @@
 from fastapi import HTTPException, Body
 
-from src.services.logic.ai_report_service import create_ai_report
+from src.services.logic.ai_report_jobs import ai_report_job_queue
 from src.models.user_report import UserReport
 from src.api.schemas.ai_report import AIReportResponse, GenerateAIReportRequest
 
@@ -10,11 +10,17 @@ async def generate_ai_report(
 ) -> AIReportResponse:
     """
     Генерирует новый AI отчет на основе параметров, переданных в теле запроса.
+    Генерация идёт через очередь отчетов, поэтому повторный запрос с теми же
+    данными дожидается уже запущенной генерации, а не начинает новую.
     """
     try:
-        user_report: UserReport = await create_ai_report(
-            telegram_id=data.telegram_id, report_type=data.report_type, limit=data.limit
+        job = await ai_report_job_queue.submit(
+            telegram_id=data.telegram_id,
+            report_type=data.report_type,
+            limit=data.limit,
+            force=data.force,
         )
+        user_report: UserReport = await ai_report_job_queue.wait(job)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -0,0 +1,57 @@
+import json
+import logging
+
+from fastapi import HTTPException, Body
+from fastapi.responses import StreamingResponse
+
+from src.models.user_report import UserReport
+from src.services.logic.ai_report_service import stream_ai_report
+from src.api.schemas.ai_report import AIReportResponse, GenerateAIReportRequest
+
+
+logger = logging.getLogger(__name__)
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def generate_ai_report_stream(
+    data: GenerateAIReportRequest = Body(...),
+) -> StreamingResponse:
+    """
+    Генерирует новый AI отчет и отдаёт его по мере генерации в формате
+    Server-Sent Events: события "delta" с фрагментами текста, затем "done"
+    с сохранённым отчетом или "error" при ошибке.
+    """
+    try:
+        chunks = await stream_ai_report(
+            telegram_id=data.telegram_id,
+            report_type=data.report_type,
+            limit=data.limit,
+            force=data.force,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_stream():
+        try:
+            async for chunk in chunks:
+                if isinstance(chunk, UserReport):
+                    report = AIReportResponse.model_validate(chunk)
+                    yield _sse_event(
+                        "done", report.model_dump(mode="json", by_alias=True)
+                    )
+                else:
+                    yield _sse_event("delta", {"text": chunk})
+        except Exception as e:
+            logger.error(f"Ошибка потоковой генерации AI отчета: {str(e)}")
+            yield _sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,44 @@
+import logging
+from typing import Literal, Optional
+
+from fastapi import HTTPException, Query, Request
+
+from src.api.schemas.diary_import import DiaryImportJobResponse
+from src.services.logic.diary_import_jobs import diary_import_job_runner
+
+
+logger = logging.getLogger(__name__)
+
+
+async def import_diary(
+    request: Request,
+    telegram_id: int = Query(..., description="Telegram user ID"),
+    file_format: Optional[Literal["csv", "json"]] = Query(
+        None,
+        description="Формат тела запроса: 'csv' или 'json' (массив или JSON Lines). "
+        "По умолчанию определяется по Content-Type.",
+    ),
+) -> DiaryImportJobResponse:
+    """
+    Принимает историю питания и веса из тела запроса (CSV или JSON) и
+    запускает её импорт в фоне. Возвращает задачу, статус и итог которой
+    можно получить по её id. КБЖУ, которых нет в файле, определяются через
+    кэш и языковую модель.
+    """
+    if file_format is None:
+        content_type = request.headers.get("content-type", "")
+        file_format = "csv" if "csv" in content_type else "json"
+
+    try:
+        job = await diary_import_job_runner.submit(
+            telegram_id, request.stream(), file_format
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        logger.exception("Ошибка запуска импорта дневника")
+        raise HTTPException(
+            status_code=500, detail="Не удалось запустить импорт дневника."
+        )
+
+    return job
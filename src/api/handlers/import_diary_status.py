@@ -0,0 +1,18 @@
+from fastapi import HTTPException, Path
+
+from src.api.schemas.diary_import import DiaryImportJobResponse
+from src.services.logic.diary_import_jobs import diary_import_job_runner
+
+
+async def import_diary_status(
+    job_id: str = Path(..., description="ID задачи импорта дневника"),
+) -> DiaryImportJobResponse:
+    """
+    Возвращает статус задачи импорта дневника и её итог: окончательный, если
+    импорт завершён, или по уже записанным пачкам.
+    """
+    job = await diary_import_job_runner.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена.")
+
+    return job
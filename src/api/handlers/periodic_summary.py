@@ -3,7 +3,7 @@ from datetime import datetime, timedelta, timezone
 
 from src.api.schemas.periodic_summary import PeriodicSummaryResponse, DaySummaryOut
 from src.services.logic.nutrition_service import get_user_nutrition_by_telegram_id
-from src.services.logic.daily_intake_service import get_and_calculate_daily_intake
+from src.services.logic.daily_intake_service import get_and_calculate_periodic_intake
 
 
 async def periodic_summary(
@@ -26,6 +26,8 @@ async def periodic_summary(
         user_nutrition_dict = None
 
     today = datetime.now(timezone.utc)
+    first_day = today - timedelta(days=days - 1)
+    first_day_start = datetime(first_day.year, first_day.month, first_day.day)
     days_array = []
 
     sum_calories = 0.0
@@ -34,11 +36,10 @@ async def periodic_summary(
     sum_carbohydrates = 0.0
     count_non_zero_days = 0
 
-    for i in range(days):
-        day_dt = today - timedelta(days=i)
-        day_start = datetime(day_dt.year, day_dt.month, day_dt.day)
-
-        calc = await get_and_calculate_daily_intake(telegram_id, day_start)
+    periodic_intake = await get_and_calculate_periodic_intake(
+        telegram_id, first_day_start, days
+    )
+    for calc in periodic_intake:
         total_calories = calc["calories"]
         total_proteins = calc["proteins"]
         total_fats = calc["fats"]
@@ -53,7 +54,7 @@ async def periodic_summary(
             sum_carbohydrates += total_carbohydrates
 
         day_summary = DaySummaryOut(
-            date=day_start.date(),
+            date=calc["date"],
             total_calories=total_calories,
             total_proteins=total_proteins,
             total_fats=total_fats,
@@ -62,8 +63,6 @@ async def periodic_summary(
         )
         days_array.append(day_summary)
 
-    days_array.sort(key=lambda x: x.date)
-
     if count_non_zero_days > 0:
         avg_calories = sum_calories / count_non_zero_days
         avg_proteins = sum_proteins / count_non_zero_days
@@ -0,0 +1,17 @@
+from src.bot.rate_limiter import outbound_rate_limiter
+from src.services.db.database import get_pool_stats
+from src.services.logic.chat_gpt_service import get_nutrition_parse_stats
+from src.services.logic.nutrition_cache_service import get_nutrition_cache_stats
+
+
+async def service_stats() -> dict:
+    """
+    Служебные счётчики процесса для мониторинга: кэш КБЖУ, пул соединений с
+    БД, разбор ответов модели о КБЖУ и очередь исходящих запросов бота.
+    """
+    return {
+        "nutrition_cache": get_nutrition_cache_stats(),
+        "db_pool": get_pool_stats(),
+        "nutrition_parse": get_nutrition_parse_stats(),
+        "bot_outbound": outbound_rate_limiter.stats(),
+    }
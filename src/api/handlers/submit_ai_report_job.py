@@ -0,0 +1,26 @@
+from fastapi import HTTPException, Body
+
+from src.services.logic.ai_report_jobs import ai_report_job_queue, AIReportJob
+from src.api.schemas.ai_report import AIReportJobResponse, GenerateAIReportRequest
+
+
+async def submit_ai_report_job(
+    data: GenerateAIReportRequest = Body(...),
+) -> AIReportJobResponse:
+    """
+    Ставит генерацию AI отчета в очередь и сразу возвращает задачу. Статус и
+    готовый отчет можно получить по id задачи.
+    """
+    try:
+        job: AIReportJob = await ai_report_job_queue.submit(
+            telegram_id=data.telegram_id,
+            report_type=data.report_type,
+            limit=data.limit,
+            force=data.force,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return job
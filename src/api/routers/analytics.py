@@ -2,10 +2,20 @@ from fastapi import APIRouter
 
 from src.api.handlers.last_ai_report import last_ai_report
 from src.api.handlers.generate_ai_report import generate_ai_report
-from src.api.schemas.ai_report import AIReportResponse
+from src.api.handlers.generate_ai_report_stream import generate_ai_report_stream
+from src.api.handlers.submit_ai_report_job import submit_ai_report_job
+from src.api.handlers.ai_report_job_status import ai_report_job_status
+from src.api.schemas.ai_report import AIReportResponse, AIReportJobResponse
 
 
 router = APIRouter(prefix="/analytics", tags=["Аналитика"])
 
 router.post("/generate-ai-report", response_model=AIReportResponse)(generate_ai_report)
+router.post("/generate-ai-report/stream")(generate_ai_report_stream)
 router.get("/last-ai-report", response_model=AIReportResponse)(last_ai_report)
+router.post(
+    "/ai-report-jobs", response_model=AIReportJobResponse, status_code=202
+)(submit_ai_report_job)
+router.get("/ai-report-jobs/{job_id}", response_model=AIReportJobResponse)(
+    ai_report_job_status
+)
@@ -0,0 +1,8 @@
+from fastapi import APIRouter
+
+from src.api.handlers.bot_webhook import bot_webhook
+
+
+router = APIRouter(prefix="/bot", tags=["Бот"], include_in_schema=False)
+
+router.post("/webhook")(bot_webhook)
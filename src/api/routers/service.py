@@ -0,0 +1,8 @@
+from fastapi import APIRouter
+
+from src.api.handlers.service_stats import service_stats
+
+
+router = APIRouter(prefix="/service", tags=["Служебное"], include_in_schema=False)
+
+router.get("/stats")(service_stats)
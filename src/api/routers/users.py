@@ -3,9 +3,18 @@ from fastapi import APIRouter
 from src.api.handlers.weight_history import weight_history
 from src.api.schemas.weight_history import WeightHistoryResponse
 from src.api.handlers.user_report import user_report
+from src.api.handlers.import_diary import import_diary
+from src.api.handlers.import_diary_status import import_diary_status
+from src.api.schemas.diary_import import DiaryImportJobResponse
 
 
 router = APIRouter(prefix="/users", tags=["Пользователи"])
 
 router.get("/weight-history", response_model=WeightHistoryResponse)(weight_history)
 router.get("/user-report")(user_report)
+router.post(
+    "/import-diary", response_model=DiaryImportJobResponse, status_code=202
+)(import_diary)
+router.get("/import-diary/{job_id}", response_model=DiaryImportJobResponse)(
+    import_diary_status
+)
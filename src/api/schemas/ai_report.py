@@ -1,11 +1,13 @@
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
+from typing import Optional
 
 
 class GenerateAIReportRequest(BaseModel):
     telegram_id: int
     report_type: str
     limit: int = 10
+    force: bool = False
 
 
 class AIReportResponse(BaseModel):
@@ -15,3 +17,15 @@ class AIReportResponse(BaseModel):
     report: str = Field(..., alias="content")
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class AIReportJobResponse(BaseModel):
+    id: str
+    report_type: str
+    status: str
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    report: Optional[AIReportResponse] = None
+
+    model_config = ConfigDict(from_attributes=True)
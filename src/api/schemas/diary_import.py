@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict
+
+
+class DiaryImportResponse(BaseModel):
+    food_logs_created: int
+    weight_records_created: int
+    recognized: int
+    skipped: int
+    errors: List[str]
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DiaryImportJobResponse(BaseModel):
+    id: str
+    status: str
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    result: Optional[DiaryImportResponse] = None
+
+    model_config = ConfigDict(from_attributes=True)
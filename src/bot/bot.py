@@ -1,6 +1,7 @@
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher
+from aiogram.types import Update
 from src.settings import settings
 from src.bot.handlers import (
     diary_handler,
@@ -8,31 +9,73 @@ from src.bot.handlers import (
     profile_handler,
     start_handler,
 )
+from src.bot.middlewares.fsm_batch import FSMWriteBatchMiddleware
 from src.bot.middlewares.user_check import UserCheckMiddleware
+from src.bot.storage import DatabaseStorage, create_fsm_storage
+from src.bot.rate_limiter import outbound_rate_limiter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Путь обработчика обновлений в API (src/api/routers/bot.py)
+WEBHOOK_PATH = "/api/v1/bot/webhook"
+
+_bot: Bot | None = None
+_dispatcher: Dispatcher | None = None
+# Обновления из webhook, которые ещё обрабатываются
+_webhook_tasks: set[asyncio.Task] = set()
+
+
+def get_bot() -> Bot:
+    """
+    Возвращает экземпляр бота процесса (создаётся один раз). Все исходящие
+    запросы бота проходят через ограничитель частоты.
+    """
+    global _bot
+    if _bot is None:
+        _bot = Bot(token=settings.bot_token.get_secret_value())
+        _bot.session.middleware(outbound_rate_limiter)
+    return _bot
+
+
+def get_dispatcher() -> Dispatcher:
+    """
+    Возвращает диспетчер процесса с зарегистрированными миддлварями и хендлерами.
+    Роутеры можно подключить только к одному диспетчеру, поэтому он создаётся один раз.
+    """
+    global _dispatcher
+    if _dispatcher is None:
+        storage = create_fsm_storage()
+        _dispatcher = Dispatcher(storage=storage)
+
+        if isinstance(storage, DatabaseStorage):
+            _dispatcher.update.outer_middleware(FSMWriteBatchMiddleware(storage))
+        _dispatcher.update.middleware(UserCheckMiddleware())
+
+        _dispatcher.include_router(start_handler.router)
+        _dispatcher.include_router(input_handlers.router)
+        _dispatcher.include_router(profile_handler.router)
+        _dispatcher.include_router(diary_handler.router)
+    return _dispatcher
+
 
 async def start_bot():
+    """
+    Запускает бота в режиме polling.
+    """
     try:
         # Инициализация бота
-        bot = Bot(token=settings.bot_token.get_secret_value())
+        bot = get_bot()
         bot_info = await bot.get_me()
         logger.info(f"Bot info: {bot_info}")
 
         # Создаём диспетчер и регистрируем миддлвари и хендлеры
-        dp = Dispatcher()
-
-        dp.update.middleware(UserCheckMiddleware())
-
-        dp.include_router(start_handler.router)
-        dp.include_router(input_handlers.router)
-        dp.include_router(profile_handler.router)
-        dp.include_router(diary_handler.router)
+        dp = get_dispatcher()
 
-        # Пропускаем все входящие
-        await bot.delete_webhook(drop_pending_updates=True)
+        # Polling не работает при установленном webhook
+        await bot.delete_webhook(
+            drop_pending_updates=settings.bot_drop_pending_updates
+        )
 
         # Запускаем polling
         await dp.start_polling(bot)
@@ -40,5 +83,58 @@ async def start_bot():
         logger.error(f"Ошибка при запуске бота: {e}")
 
 
+async def setup_webhook():
+    """
+    Регистрирует webhook в Telegram. Повторный вызов из другой реплики безопасен.
+    """
+    bot = get_bot()
+    dp = get_dispatcher()
+    webhook_url = settings.webhook_base_url.rstrip("/") + WEBHOOK_PATH
+    await bot.set_webhook(
+        webhook_url,
+        secret_token=settings.webhook_secret.get_secret_value(),
+        allowed_updates=dp.resolve_used_update_types(),
+        drop_pending_updates=settings.bot_drop_pending_updates,
+    )
+    logger.info(f"Webhook установлен: {webhook_url}")
+
+
+def feed_update_in_background(bot: Bot, update: Update) -> None:
+    """
+    Обрабатывает обновление из webhook в фоне, чтобы сразу ответить Telegram.
+    Распознавание еды может идти дольше таймаута webhook, и тогда Telegram
+    присылает то же обновление повторно.
+    """
+    task = asyncio.create_task(_feed_update(bot, update))
+    _webhook_tasks.add(task)
+    task.add_done_callback(_webhook_tasks.discard)
+
+
+async def _feed_update(bot: Bot, update: Update) -> None:
+    try:
+        await get_dispatcher().feed_update(bot, update)
+    except Exception as e:
+        logger.exception(f"Ошибка обработки обновления {update.update_id}: {e}")
+
+
+async def close_bot():
+    """
+    Дожидается обработки принятых обновлений (не дольше
+    webhook_shutdown_timeout_seconds, остальные прерываются) и закрывает
+    HTTP-сессию бота и хранилище FSM.
+    """
+    if _webhook_tasks:
+        _, pending = await asyncio.wait(
+            set(_webhook_tasks), timeout=settings.webhook_shutdown_timeout_seconds
+        )
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    if _dispatcher is not None:
+        await _dispatcher.storage.close()
+    if _bot is not None:
+        await _bot.session.close()
+
+
 if __name__ == "__main__":
     asyncio.run(start_bot())
@@ -1,25 +1,35 @@
+import asyncio
 import logging
-from pathlib import Path
-import tempfile
+import re
 import uuid
 from aiogram import Router, F
-from aiogram.types import Message, PhotoSize
+from aiogram.types import Message
 from aiogram.filters.state import StateFilter
 import base64
 
-from src.services.logic.user_food_log_service import create_food_log_by_telegram_user_id
-from src.services.logic.chat_gpt_service import (
-    retrieve_nutrition_data,
-    extract_nutrition_details,
-    convert_speech_to_text,
+from src.settings import settings
+from src.services.logic.user_food_log_service import (
+    create_food_log_by_telegram_user_id,
+    create_food_logs_by_telegram_user_id,
 )
+from src.services.logic.chat_gpt_service import convert_speech_to_text
+from src.services.logic.nutrition_cache_service import (
+    get_nutrition_info,
+    get_nutrition_info_batch,
+)
+from src.services.media.voice import download_voice, preprocess_voice
+from src.services.media.image import select_photo_size, download_photo, prepare_image
 from src.bot.keyboards.inline import save_food_button
+from src.bot.side_effects import SideEffects, fire_and_forget
 
 
 logger = logging.getLogger(__name__)
 
 router = Router()
 
+# Пункт списка: "- борщ", "• хлеб", "1. яблоко", "2) чай"
+LIST_ITEM_PATTERN = re.compile(r"^(?:[-–—•*]|\d+[.)])\s+(.+)$")
+
 
 @router.message(F.text & ~F.text.startswith("/"), StateFilter(None))
 async def handle_text(message: Message):
@@ -30,6 +40,12 @@ async def handle_text(message: Message):
     if user_text == "❌ отмена":
         await message.answer("Операция отменена.")
         return
+
+    # Явный список — несколько позиций, распознаём их одним запросом
+    items = split_food_list(message.text)
+    if items:
+        await _process_food_batch(message, items)
+        return
     await _process_food_description(message, message.text.strip())
 
 
@@ -40,11 +56,13 @@ async def handle_voice(message: Message):
     """
     try:
         voice = message.voice
-        file_id = voice.file_id
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            file_path = Path(tmp_dir) / f"{file_id}.ogg"
-            await message.bot.download(file_id, destination=file_path)
-            transcription = await convert_speech_to_text(str(file_path))
+        audio = await download_voice(message.bot, voice.file_id, voice.file_size)
+        audio = await preprocess_voice(audio)
+        transcription = await convert_speech_to_text(audio)
+    except ValueError as e:
+        logger.warning(f"Голосовое сообщение отклонено: {str(e)}")
+        await message.answer("Голосовое сообщение слишком длинное")
+        return
     except Exception as e:
         logger.error(f"Ошибка загрузки аудио: {str(e)}")
         await message.answer("Ошибка обработки аудио")
@@ -60,18 +78,19 @@ async def handle_voice(message: Message):
 @router.message(F.photo, StateFilter(None))
 async def handle_photo(message: Message):
     """
-    Хендлер для получения фотографии. Скачивает фото, кодирует его в base64
-    и передает в языковую модель.
+    Хендлер для получения фотографии. Скачивает в память наименьший подходящий
+    размер фото, пережимает его и передает в языковую модель.
     """
     try:
-        photo: PhotoSize = message.photo[-1]
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            file_path = Path(tmp_dir) / f"{photo.file_id}.jpg"
-            await message.bot.download(photo.file_id, destination=file_path)
-            with open(file_path, "rb") as f:
-                image_base64 = base64.b64encode(f.read()).decode("utf-8")
+        photo = select_photo_size(message.photo, settings.photo_target_side)
+        image_data = await download_photo(message.bot, photo)
+        prepared_image = await prepare_image(image_data)
+        image_base64 = base64.b64encode(prepared_image.data).decode("utf-8")
         await _process_food_description(
-            message, description="прикрепленная фотография", image_base64=image_base64
+            message,
+            description="прикрепленная фотография",
+            image_base64=image_base64,
+            image_hash=prepared_image.image_hash,
         )
     except Exception as e:
         logger.error(f"Ошибка при обработке фотографии: {str(e)}")
@@ -80,45 +99,49 @@ async def handle_photo(message: Message):
         )
 
 
+def split_food_list(text: str) -> list[str] | None:
+    """
+    Возвращает позиции, если сообщение — список из нескольких пунктов, каждый
+    на своей строке с маркером ("-", "•", "1." и т.п.). Иначе None: обычный
+    многострочный текст (рецепт, "борщ\n200 г") описывает одно блюдо.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if len(lines) < 2:
+        return None
+    matches = [LIST_ITEM_PATTERN.match(line) for line in lines]
+    if not all(matches):
+        return None
+    return [match.group(1).strip() for match in matches]
+
+
 async def _process_food_description(
-    message: Message, description: str, image_base64: str | None = None
+    message: Message,
+    description: str,
+    image_base64: str | None = None,
+    image_hash: str | None = None,
 ):
     """
-    Общая функция обработки описания еды.
+    Общая функция обработки описания еды. Служебные сообщения отправляются
+    параллельно с распознаванием и удаляются в фоне.
     """
     user_id = message.from_user.id
-    emoji_message = None
-    calculation_message = None
+    status_task = asyncio.create_task(_send_status_messages(message))
 
     try:
-        emoji_message = await message.answer("⌛")
-        calculation_message = await message.answer("Идет расчет...")
-
-        response_text = await retrieve_nutrition_data(
-            product_name=description, image_base64=image_base64
+        nutrition_info, error = await get_nutrition_info(
+            description=description,
+            image_base64=image_base64,
+            image_hash=image_hash,
+            user_id=user_id,
         )
-        nutrition_info, error = await extract_nutrition_details(response_text)
 
         if error:
             await message.answer(error)
             return
 
-        for msg in [emoji_message, calculation_message]:
-            try:
-                if msg:
-                    await msg.delete()
-            except Exception:
-                pass
-
         entry_uuid = str(uuid.uuid4())
         sent_message = await message.answer(
-            f"Еда: {nutrition_info['food']}\n"
-            f"Калории: {nutrition_info['calories']} ккал\n"
-            f"Белки: {nutrition_info['proteins']} г\n"
-            f"Жиры: {nutrition_info['fats']} г\n"
-            f"Углеводы: {nutrition_info['carbohydrates']} г\n"
-            f"Клетчатка: {nutrition_info.get('fiber', '0')} г\n"
-            f"AI Оценка: {nutrition_info['rating']}",
+            format_nutrition_info(nutrition_info),
             reply_markup=save_food_button(entry_uuid=entry_uuid, action="add"),
         )
 
@@ -133,9 +156,87 @@ async def _process_food_description(
         logger.error(f"Ошибка обработки: {str(e)}")
         await message.answer("Произошла ошибка при расчете. Попробуйте еще раз.")
     finally:
-        for msg in [calculation_message, emoji_message]:
-            try:
-                if msg:
-                    await msg.delete()
-            except Exception:
-                pass
+        fire_and_forget(_delete_status_messages(status_task), "удаление статуса")
+
+
+async def _process_food_batch(message: Message, descriptions: list[str]):
+    """
+    Обработка нескольких позиций еды: распознаются одним запросом (пачками по
+    recognition_batch_max_items), все записи о приеме пищи создаются одним INSERT.
+    """
+    user_id = message.from_user.id
+    status_task = asyncio.create_task(_send_status_messages(message))
+
+    try:
+        batch_size = settings.recognition_batch_max_items
+        results = []
+        for start in range(0, len(descriptions), batch_size):
+            results += await get_nutrition_info_batch(
+                descriptions[start : start + batch_size], user_id=user_id
+            )
+
+        entries = []
+        for description, (nutrition_info, error) in zip(descriptions, results):
+            if error:
+                await message.answer(f"{description}: {error}")
+                continue
+
+            entry_uuid = str(uuid.uuid4())
+            sent_message = await message.answer(
+                format_nutrition_info(nutrition_info),
+                reply_markup=save_food_button(entry_uuid=entry_uuid, action="add"),
+            )
+            entries.append(
+                {
+                    "nutrition_info": nutrition_info,
+                    "message_id": sent_message.message_id,
+                    "entry_uuid": entry_uuid,
+                }
+            )
+
+        await create_food_logs_by_telegram_user_id(
+            telegram_user_id=user_id, entries=entries
+        )
+
+    except Exception as e:
+        logger.error(f"Ошибка обработки: {str(e)}")
+        await message.answer("Произошла ошибка при расчете. Попробуйте еще раз.")
+    finally:
+        fire_and_forget(_delete_status_messages(status_task), "удаление статуса")
+
+
+async def _send_status_messages(message: Message) -> list[Message]:
+    """
+    Отправляет служебные сообщения о том, что идет расчет.
+    """
+    sent = []
+    try:
+        sent.append(await message.answer("⌛"))
+        sent.append(await message.answer("Идет расчет..."))
+    except Exception as e:
+        logger.warning(f"Не удалось отправить статус расчета: {str(e)}")
+    return sent
+
+
+async def _delete_status_messages(status_task: asyncio.Task) -> None:
+    """
+    Дожидается отправки служебных сообщений и удаляет их.
+    """
+    async with SideEffects() as effects:
+        for msg in await status_task:
+            effects.spawn(msg.delete(), "удаление служебного сообщения")
+
+
+def format_nutrition_info(nutrition_info: dict) -> str:
+    """
+    Формирует текст сообщения с КБЖУ распознанной еды.
+    """
+    return (
+        f"Еда: {nutrition_info['food']}\n"
+        f"Калории: {nutrition_info['calories']} ккал\n"
+        f"Белки: {nutrition_info['proteins']} г\n"
+        f"Жиры: {nutrition_info['fats']} г\n"
+        f"Углеводы: {nutrition_info['carbohydrates']} г\n"
+        f"Клетчатка: {nutrition_info.get('fiber', '0')} г\n"
+        f"AI Оценка: {nutrition_info['rating']}"
+    )
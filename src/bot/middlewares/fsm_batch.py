@@ -0,0 +1,19 @@
+from aiogram.dispatcher.middlewares.base import BaseMiddleware
+from aiogram.types import Update
+
+from src.bot.storage import DatabaseStorage
+
+
+class FSMWriteBatchMiddleware(BaseMiddleware):
+    """
+    Записывает изменения состояния FSM, сделанные при обработке обновления,
+    одним запросом к БД после её завершения: типичный шаг диалога
+    (update_data + set_state) стоит одного upsert вместо двух.
+    """
+
+    def __init__(self, storage: DatabaseStorage):
+        self._storage = storage
+
+    async def __call__(self, handler, event: Update, data: dict):
+        async with self._storage.batch():
+            return await handler(event, data)
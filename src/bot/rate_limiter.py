@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import time
+from typing import Any, Hashable
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    DeleteMessage,
+    DeleteMessages,
+    SendChatAction,
+    TelegramMethod,
+)
+
+from src.settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = "high"
+PRIORITY_LOW = "low"
+
+# Косметические вызовы уступают очередь ответам пользователю
+_LOW_PRIORITY_METHODS = (DeleteMessage, DeleteMessages, SendChatAction)
+
+# Сколько держать корзину чата после последнего запроса
+_CHAT_BUCKET_IDLE_SECONDS = 60.0
+
+
+class TokenBucket:
+    """
+    Корзина токенов: rate токенов в секунду, не больше capacity подряд.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def wait_time(self) -> float:
+        """
+        Сколько секунд ждать до появления токена (0 — токен есть).
+        """
+        now = time.monotonic()
+        self._refill(now)
+        if self.blocked_until > now:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+    def block(self, seconds: float) -> None:
+        """
+        Запрещает выдачу токенов на seconds секунд (после RetryAfter).
+        """
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class OutboundRateLimiter(BaseRequestMiddleware):
+    """
+    Миддлварь сессии бота, через которую проходят все исходящие запросы к
+    Bot API. Запросы в чат ограничиваются корзинами токенов на чат и на всего
+    бота; удаление служебных сообщений пропускает вперёд ответы тому же
+    пользователю и, когда упираемся в общий лимит бота, ответы остальным.
+    На TelegramRetryAfter запрос повторяется после указанной паузы, а чат
+    (или весь бот, если чата нет) блокируется на это время.
+    """
+
+    def __init__(
+        self,
+        global_rate: float,
+        chat_rate: float,
+        chat_burst: int,
+        retry_after_attempts: int,
+    ):
+        self._global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        self._retry_after_attempts = retry_after_attempts
+        self._chat_buckets: dict[Hashable, TokenBucket] = {}
+        self._waiting = {PRIORITY_HIGH: 0, PRIORITY_LOW: 0}
+        # Запросы с высоким приоритетом: ожидающие по чатам и ожидающие только
+        # токен бота (корзина их чата уже позволяет отправку)
+        self._high_by_chat: dict[Hashable, int] = {}
+        self._high_on_global = 0
+        self.sent = 0
+        self.retry_after_count = 0
+
+    def _get_chat_bucket(self, chat_id: Hashable) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) > 1000:
+                self._prune_chat_buckets()
+            bucket = TokenBucket(self._chat_rate, self._chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _prune_chat_buckets(self) -> None:
+        idle_since = time.monotonic() - _CHAT_BUCKET_IDLE_SECONDS
+        for chat_id, bucket in list(self._chat_buckets.items()):
+            if bucket.updated_at < idle_since and bucket.blocked_until < idle_since:
+                del self._chat_buckets[chat_id]
+
+    def _low_priority_gated(self, chat_id: Hashable) -> bool:
+        """
+        Низкий приоритет уступает запросам с высоким в том же чате и запросам
+        любого чата, которые ждут только общий токен бота. Запросы, которые
+        ждут свою корзину чата (или паузу RetryAfter в ней), не задерживают
+        остальные чаты.
+        """
+        return bool(self._high_by_chat.get(chat_id) or self._high_on_global)
+
+    async def _acquire(self, chat_id: Hashable, priority: str) -> None:
+        """
+        Ждёт токены в корзинах чата и бота с учётом приоритета.
+        """
+        high = priority == PRIORITY_HIGH
+        on_global = False
+        self._waiting[priority] += 1
+        if high:
+            self._high_by_chat[chat_id] = self._high_by_chat.get(chat_id, 0) + 1
+        try:
+            while True:
+                if not high and self._low_priority_gated(chat_id):
+                    await asyncio.sleep(1 / self._global_bucket.rate)
+                    continue
+
+                chat_bucket = self._get_chat_bucket(chat_id)
+                chat_wait = chat_bucket.wait_time()
+                global_wait = self._global_bucket.wait_time()
+                if chat_wait <= 0 and global_wait <= 0:
+                    self._global_bucket.consume()
+                    chat_bucket.consume()
+                    return
+
+                if high and on_global != (chat_wait <= 0):
+                    on_global = not on_global
+                    self._high_on_global += 1 if on_global else -1
+                await asyncio.sleep(max(chat_wait, global_wait))
+        finally:
+            self._waiting[priority] -= 1
+            if high:
+                if on_global:
+                    self._high_on_global -= 1
+                self._high_by_chat[chat_id] -= 1
+                if not self._high_by_chat[chat_id]:
+                    del self._high_by_chat[chat_id]
+
+    async def __call__(self, make_request, bot: Bot, method: TelegramMethod) -> Any:
+        chat_id = getattr(method, "chat_id", None)
+        priority = (
+            PRIORITY_LOW if isinstance(method, _LOW_PRIORITY_METHODS) else PRIORITY_HIGH
+        )
+
+        for attempt in range(self._retry_after_attempts + 1):
+            if chat_id is not None:
+                await self._acquire(chat_id, priority)
+            else:
+                # Запросы вне чата не ограничиваются, но ждут глобальную паузу
+                blocked_for = self._global_bucket.blocked_until - time.monotonic()
+                if blocked_for > 0:
+                    await asyncio.sleep(blocked_for)
+
+            try:
+                response = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.retry_after_count += 1
+                if attempt == self._retry_after_attempts:
+                    raise
+                logger.warning(
+                    f"Лимит Telegram для {type(method).__name__} (чат {chat_id}): "
+                    f"повтор через {e.retry_after} с"
+                )
+                if chat_id is not None:
+                    self._get_chat_bucket(chat_id).block(e.retry_after)
+                else:
+                    self._global_bucket.block(e.retry_after)
+                continue
+
+            self.sent += 1
+            return response
+
+    def stats(self) -> dict:
+        """
+        Глубина очередей исходящих запросов и счётчики.
+        """
+        return {
+            "waiting_high": self._waiting[PRIORITY_HIGH],
+            "waiting_low": self._waiting[PRIORITY_LOW],
+            "chats": len(self._chat_buckets),
+            "sent": self.sent,
+            "retry_after": self.retry_after_count,
+        }
+
+
+outbound_rate_limiter = OutboundRateLimiter(
+    global_rate=settings.bot_global_rate_per_second,
+    chat_rate=settings.bot_chat_rate_per_second,
+    chat_burst=settings.bot_chat_burst,
+    retry_after_attempts=settings.bot_retry_after_attempts,
+)
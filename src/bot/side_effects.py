@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Optional
+
+from src.settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Ссылки на фоновые задачи, чтобы их не собрал сборщик мусора до завершения
+_background_tasks: set[asyncio.Task] = set()
+
+
+class SideEffects:
+    """
+    Группа независимых побочных действий хендлера: вызовов Bot API и записей
+    в БД. Действия выполняются параллельно, не больше limit одновременно.
+    Ошибка одного действия логируется и не прерывает остальные и сам хендлер.
+    При выходе из async with дожидается завершения всех действий.
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        self._semaphore = asyncio.Semaphore(limit or settings.bot_side_effects_limit)
+        self._tasks: list[asyncio.Task] = []
+
+    async def __aenter__(self) -> "SideEffects":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await asyncio.gather(*self._tasks)
+
+    def spawn(self, action: Awaitable, name: str = "") -> asyncio.Task:
+        """
+        Запускает действие. Задача возвращает его результат или None при ошибке.
+        """
+        task = asyncio.create_task(self._run(action, name))
+        self._tasks.append(task)
+        return task
+
+    async def _run(self, action: Awaitable, name: str) -> Any:
+        async with self._semaphore:
+            return await _isolated(action, name)
+
+
+async def _isolated(action: Awaitable, name: str) -> Any:
+    try:
+        return await action
+    except Exception as e:
+        logger.warning(f"Побочное действие {name} завершилось ошибкой: {str(e)}")
+        return None
+
+
+def fire_and_forget(action: Awaitable, name: str = "") -> asyncio.Task:
+    """
+    Запускает косметическое действие (например, удаление служебного сообщения)
+    в фоне, не задерживая ответ пользователю. Ошибки логируются.
+    """
+    task = asyncio.create_task(_isolated(action, name))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
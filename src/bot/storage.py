@@ -0,0 +1,245 @@
+import asyncio
+import base64
+import logging
+import pickle
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage,
+    DefaultKeyBuilder,
+    KeyBuilder,
+    StateType,
+    StorageKey,
+)
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.settings import settings
+from src.models.fsm_state import FSMState
+from src.services.db.database import engine as db_engine
+
+
+logger = logging.getLogger(__name__)
+
+
+def dump_data(data: Dict[str, Any]) -> str:
+    """
+    Сериализует данные FSM для Redis. В данных бывают Enum (Gender, Goal, ...),
+    которые не сериализуются в JSON, поэтому pickle.
+    """
+    return base64.b64encode(pickle.dumps(data)).decode()
+
+
+def load_data(value: str | bytes) -> Dict[str, Any]:
+    return pickle.loads(base64.b64decode(value))
+
+
+class _WriteBatch:
+    """
+    Изменения состояний FSM за время обработки одного обновления.
+    """
+
+    def __init__(self):
+        # Прочитанные и изменённые значения колонок state и data по ключу
+        self.values: dict[str, dict[str, Any]] = {}
+        # Только изменённые колонки по ключу, записываются при flush
+        self.changes: dict[str, dict[str, Any]] = {}
+        self.closed = False
+
+
+class DatabaseStorage(BaseStorage):
+    """
+    Хранилище FSM в таблице fsm_states. Все воркеры и реплики читают
+    состояние из БД, поэтому видят актуальное. Изменения записываются upsert
+    только изменённых колонок (state и/или data), поэтому смена состояния не
+    затирает данные, записанные другим процессом. Внутри batch() (на время
+    обработки обновления) чтения одного ключа выполняются один раз, а все
+    изменения записываются одним upsert при выходе. Вне batch() каждое
+    изменение записывается сразу. Записи старше ttl удаляются фоновой
+    очисткой.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        ttl: timedelta = timedelta(days=7),
+        key_builder: Optional[KeyBuilder] = None,
+    ):
+        self._engine = engine
+        self._session_maker = sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        self._table_ready = False
+        self._ttl = ttl
+        self._key_builder = key_builder or DefaultKeyBuilder()
+        self._cleanup_task: Optional[asyncio.Task] = None
+        self._last_cleanup: Optional[datetime] = None
+        self._batch: ContextVar[Optional[_WriteBatch]] = ContextVar(
+            f"fsm_write_batch_{id(self)}", default=None
+        )
+
+    async def _ensure_table(self) -> None:
+        """
+        Создаёт таблицу fsm_states, если её нет (например, в отдельной SQLite базе).
+        """
+        if not self._table_ready:
+            async with self._engine.begin() as conn:
+                await conn.run_sync(FSMState.__table__.create, checkfirst=True)
+            self._table_ready = True
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[None]:
+        """
+        Откладывает запись изменений до выхода из блока и записывает их одним
+        upsert на ключ, даже если обработчик завершился ошибкой. Изменения,
+        сделанные после выхода (например, фоновыми задачами), пишутся сразу.
+        """
+        if self._batch.get() is not None:
+            yield
+            return
+
+        batch = _WriteBatch()
+        token = self._batch.set(batch)
+        try:
+            yield
+        finally:
+            batch.closed = True
+            self._batch.reset(token)
+            for key, values in batch.changes.items():
+                await self._write(key, values)
+
+    def _current_batch(self) -> Optional[_WriteBatch]:
+        batch = self._batch.get()
+        return batch if batch is not None and not batch.closed else None
+
+    async def _get_values(self, key: str) -> dict[str, Any]:
+        batch = self._current_batch()
+        if batch and key in batch.values:
+            return batch.values[key]
+
+        await self._ensure_table()
+        async with self._session_maker() as session:
+            result = await session.execute(
+                select(FSMState.state, FSMState.data).where(FSMState.key == key)
+            )
+            row = result.one_or_none()
+        values = {"state": row.state, "data": row.data} if row else {}
+
+        if batch:
+            values.update(batch.changes.get(key, {}))
+            batch.values[key] = values
+        return values
+
+    async def _set(self, key: str, column: str, value) -> None:
+        batch = self._current_batch()
+        if batch is None:
+            await self._write(key, {column: value})
+            return
+
+        batch.changes.setdefault(key, {})[column] = value
+        if key in batch.values:
+            batch.values[key][column] = value
+
+    async def _write(self, key: str, values: dict[str, Any]) -> None:
+        """
+        Записывает изменённые колонки состояния в БД, создавая запись при её
+        отсутствии.
+        """
+        await self._ensure_table()
+        now = datetime.now()
+        dialect = postgresql if self._engine.dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(FSMState).values(
+            {"key": key, **values, "updated_at": now}
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FSMState.key],
+            set_={
+                **{column: getattr(stmt.excluded, column) for column in values},
+                "updated_at": now,
+            },
+        )
+        async with self._session_maker() as session:
+            await session.execute(stmt)
+            await session.commit()
+        self._schedule_cleanup()
+
+    def _schedule_cleanup(self) -> None:
+        """
+        Удаляет в фоне состояния, не менявшиеся дольше ttl. Не чаще раза в час.
+        """
+        now = datetime.now()
+        if self._last_cleanup and now - self._last_cleanup < timedelta(hours=1):
+            return
+        self._last_cleanup = now
+        self._cleanup_task = asyncio.create_task(self._cleanup_expired(now))
+
+    async def _cleanup_expired(self, now: datetime) -> None:
+        try:
+            async with self._session_maker() as session:
+                await session.execute(
+                    delete(FSMState).where(FSMState.updated_at < now - self._ttl)
+                )
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Ошибка очистки состояний FSM: {str(e)}")
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        await self._set(self._key_builder.build(key), "state", state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        values = await self._get_values(self._key_builder.build(key))
+        return values.get("state")
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self._set(
+            self._key_builder.build(key), "data", pickle.dumps(data) if data else None
+        )
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        values = await self._get_values(self._key_builder.build(key))
+        return pickle.loads(values["data"]) if values.get("data") else {}
+
+    async def close(self) -> None:
+        if self._cleanup_task and not self._cleanup_task.done():
+            await self._cleanup_task
+
+
+def create_fsm_storage() -> BaseStorage:
+    """
+    Создаёт хранилище состояний FSM по настройке FSM_STORAGE:
+     - database — таблица fsm_states в основной БД (или в FSM_DATABASE_URL,
+       например sqlite+aiosqlite:///fsm.sqlite3 для тестов);
+     - redis — Redis по FSM_REDIS_URL (нужен пакет redis);
+     - memory — память процесса, состояния теряются при перезапуске.
+    Для нескольких реплик бота подходят database и redis.
+    """
+    if settings.fsm_storage == "redis":
+        # Импорт здесь: пакет redis нужен только при использовании RedisStorage
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        logger.info("FSM хранилище: Redis")
+        return RedisStorage.from_url(
+            settings.fsm_redis_url, json_dumps=dump_data, json_loads=load_data
+        )
+
+    if settings.fsm_storage == "database":
+        if settings.fsm_database_url:
+            engine = create_async_engine(settings.fsm_database_url)
+        else:
+            engine = db_engine
+
+        logger.info("FSM хранилище: база данных")
+        return DatabaseStorage(
+            engine,
+            ttl=timedelta(seconds=settings.fsm_state_ttl_seconds),
+        )
+
+    return MemoryStorage()
@@ -2,7 +2,10 @@ import asyncio
 import uvicorn
 from src.api.app import create_app
 from src.bot.bot import start_bot
-from src.services.db.database import init_achievements, init_db, engine
+from src.settings import settings
+from src.services.db.database import init_db, engine
+from src.services.logic.achievements_service import init_achievements
+from src.services.logic.daily_totals_service import ensure_daily_totals_backfilled
 
 
 async def start_api(app):
@@ -18,16 +21,25 @@ async def main():
     # Инициализация FastAPI приложения
     await init_db(engine)
 
+    # Однократное заполнение сумм КБЖУ по дням для существующих приемов пищи
+    await ensure_daily_totals_backfilled()
+
     # Инициализация достижений
     await init_achievements()
 
     app = create_app()
 
-    # Запускаем одновременно бота и API
-    await asyncio.gather(
-        start_bot(),  # Запуск бота
-        start_api(app),  # Запуск API через Uvicorn
-    )
+    # Фоновые задачи и соединения к OpenAI закрываются при остановке API
+    # (lifespan в src/api/app.py)
+    if settings.bot_mode == "webhook":
+        # Обновления бота приходят в API, отдельный polling не нужен
+        await start_api(app)
+    else:
+        # Запускаем одновременно бота и API
+        await asyncio.gather(
+            start_bot(),  # Запуск бота
+            start_api(app),  # Запуск API через Uvicorn
+        )
 
 
 if __name__ == "__main__":
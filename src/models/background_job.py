@@ -0,0 +1,63 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Index
+from src.models.base import Base
+from datetime import datetime, timedelta
+
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class BackgroundJob(Base):
+    """
+    Фоновая задача (генерация AI-отчета, импорт дневника). Состояние хранится
+    в БД, поэтому статус доступен из любого воркера и после перезапуска.
+    """
+
+    __tablename__ = "background_jobs"
+
+    id = Column(String(32), primary_key=True)
+    kind = Column(String(50), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Ключ объединения одинаковых задач, например тип и отпечаток данных отчета
+    dedup_key = Column(String(128), nullable=True)
+    params = Column(JSON, nullable=True)
+    status = Column(String(20), nullable=False, default=JOB_PENDING)
+    report_id = Column(Integer, ForeignKey("user_reports.id"), nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_background_jobs_kind_user_id_dedup_key",
+            "kind",
+            "user_id",
+            "dedup_key",
+        ),
+        # Не больше одной незавершённой задачи с тем же ключом: одновременные
+        # одинаковые запросы не создают (и не оплачивают) две генерации
+        Index(
+            "ux_background_jobs_active_dedup_key",
+            "kind",
+            "user_id",
+            "dedup_key",
+            unique=True,
+            postgresql_where=(
+                dedup_key.isnot(None) & status.in_([JOB_PENDING, JOB_RUNNING])
+            ),
+        ),
+        Index("ix_background_jobs_finished_at", "finished_at"),
+    )
+
+    def is_interrupted(self, stale_seconds: float) -> bool:
+        """
+        Незавершённая задача, которая не обновлялась дольше stale_seconds:
+        процесс, выполнявший её, остановлен или упал.
+        """
+        if self.status not in (JOB_PENDING, JOB_RUNNING):
+            return False
+        return datetime.now() - self.updated_at > timedelta(seconds=stale_seconds)
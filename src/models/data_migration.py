@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, DateTime
+from src.models.base import Base
+from datetime import datetime
+
+
+class DataMigration(Base):
+    """
+    Отметки о выполненных однократных преобразованиях данных (например,
+    заполнении user_daily_totals по уже существующим приемам пищи).
+    """
+
+    __tablename__ = "data_migrations"
+
+    name = Column(String(100), primary_key=True)
+    applied_at = Column(DateTime, default=datetime.now, nullable=False)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, DateTime, LargeBinary
+from src.models.base import Base
+from datetime import datetime
+
+
+class FSMState(Base):
+    __tablename__ = "fsm_states"
+
+    key = Column(String(255), primary_key=True)
+    state = Column(String(255), nullable=True)
+    data = Column(LargeBinary, nullable=True)
+    updated_at = Column(DateTime, default=datetime.now, nullable=False, index=True)
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, String, DateTime, JSON
+from src.models.base import Base
+from datetime import datetime
+
+
+class NutritionCache(Base):
+    __tablename__ = "nutrition_cache"
+
+    cache_key = Column(String(80), primary_key=True)
+    nutrition_info = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from src.models.base import Base
@@ -13,3 +13,12 @@ class UserAchievement(Base):
     unlocked_at = Column(DateTime, default=datetime.now)
 
     achievement = relationship("Achievement", back_populates="user_achievements")
+
+    __table_args__ = (
+        Index(
+            "ix_user_achievements_user_id_achievement_id",
+            "user_id",
+            "achievement_id",
+            unique=True,
+        ),
+    )
@@ -0,0 +1,26 @@
+from sqlalchemy import (
+    Column,
+    Integer,
+    Float,
+    Date,
+    ForeignKey,
+    UniqueConstraint,
+)
+from src.models.base import Base
+
+
+class UserDailyTotals(Base):
+    __tablename__ = "user_daily_totals"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    date = Column(Date, nullable=False)
+    calories = Column(Float, nullable=False, default=0.0)
+    proteins = Column(Float, nullable=False, default=0.0)
+    fats = Column(Float, nullable=False, default=0.0)
+    carbohydrates = Column(Float, nullable=False, default=0.0)
+    logs_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "date", name="uq_user_daily_totals_user_id_date"),
+    )
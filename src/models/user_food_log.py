@@ -1,4 +1,13 @@
-from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, Boolean
+from sqlalchemy import (
+    Column,
+    Integer,
+    Float,
+    String,
+    ForeignKey,
+    DateTime,
+    Boolean,
+    Index,
+)
 from sqlalchemy.orm import relationship
 from src.models.base import Base
 from datetime import datetime
@@ -23,3 +32,14 @@ class UserFoodLog(Base):
     rating = Column(String, nullable=True)
 
     user = relationship("User", back_populates="food_logs")
+
+    __table_args__ = (
+        # Все выборки дневника фильтруют по (user_id, is_saved=True)
+        # и ограничивают/сортируют по date_added.
+        Index(
+            "ix_user_food_logs_user_id_date_added_saved",
+            "user_id",
+            "date_added",
+            postgresql_where=(is_saved == True),
+        ),
+    )
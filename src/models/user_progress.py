@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey
+from src.models.base import Base
+
+
+class UserProgress(Base):
+    __tablename__ = "user_progress"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
+    current_streak = Column(Integer, nullable=False, default=0)  # в днях
+    longest_streak = Column(Integer, nullable=False, default=0)  # в днях
+    last_logged_date = Column(Date, nullable=True)
+    first_weight = Column(Float, nullable=True)  # в килограммах
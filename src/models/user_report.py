@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from src.models.base import Base
 from datetime import datetime
@@ -12,5 +12,15 @@ class UserReport(Base):
     created_at = Column(DateTime, default=datetime.now)
     report_type = Column(String(50))
     content = Column(Text)
+    input_fingerprint = Column(String(64), nullable=True)
 
     user = relationship("User", back_populates="reports")
+
+    __table_args__ = (
+        Index(
+            "ix_user_reports_user_id_report_type_created_at",
+            "user_id",
+            "report_type",
+            "created_at",
+        ),
+    )
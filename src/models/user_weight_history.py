@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from src.models.base import Base
 
@@ -12,4 +12,8 @@ class UserWeightHistory(Base):
     weight = Column(Float, nullable=False)
     date_added = Column(DateTime, default=datetime.now)
 
-    user = relationship("User", back_populates="weight_history")
\ No newline at end of file
+    user = relationship("User", back_populates="weight_history")
+
+    __table_args__ = (
+        Index("ix_user_weight_history_user_id_date_added", "user_id", "date_added"),
+    )
@@ -0,0 +1,31 @@
+from src.settings import settings
+from src.services.cache.read_through_cache import ReadThroughCache
+
+
+# Кэш свой в каждом процессе, а инвалидация при записи действует только в
+# процессе, который записал. Поэтому другие воркеры видят изменения профиля и
+# нормы с задержкой до entity_cache_ttl_seconds.
+
+# User по telegram_id. Кэшируются только пользователи, принявшие соглашение:
+# отсутствующего пользователя создаёт /start, а непринятое соглашение могут
+# принять в другом процессе, и UserCheckMiddleware должен сразу это увидеть.
+# Принятое соглашение не отзывается, поэтому такая запись не устаревает.
+user_cache = ReadThroughCache(
+    maxsize=settings.entity_cache_size,
+    ttl_seconds=settings.entity_cache_ttl_seconds,
+    should_cache=lambda user: user.agreement_accepted,
+)
+
+# UserProfile по user_id, включая отсутствие профиля.
+user_profile_cache = ReadThroughCache(
+    maxsize=settings.entity_cache_size,
+    ttl_seconds=settings.entity_cache_ttl_seconds,
+    cache_none=True,
+)
+
+# UserNutrition по profile_id, включая отсутствие нормы.
+user_nutrition_cache = ReadThroughCache(
+    maxsize=settings.entity_cache_size,
+    ttl_seconds=settings.entity_cache_ttl_seconds,
+    cache_none=True,
+)
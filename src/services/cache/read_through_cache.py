@@ -0,0 +1,63 @@
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from src.services.cache.lru_cache import LRUCache
+from src.services.cache.single_flight import SingleFlight
+
+
+_MISSING_VALUE = object()
+
+
+class ReadThroughCache:
+    """
+    Асинхронный read-through кэш поверх LRUCache: при промахе вызывает loader,
+    кладёт результат в кэш и возвращает его. Одновременные промахи по одному
+    ключу объединяются в один вызов loader. Если should_cache задан, в кэш
+    попадают только значения, для которых он возвращает True. ttl_seconds <= 0
+    отключает кэширование, объединение одновременных загрузок остаётся.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl_seconds: float,
+        cache_none: bool = False,
+        should_cache: Optional[Callable[[Any], bool]] = None,
+    ):
+        self._cache = LRUCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self._enabled = ttl_seconds > 0
+        self._cache_none = cache_none
+        self._should_cache = should_cache
+        self._in_flight = SingleFlight()
+
+    async def get_or_load(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        value = self._cache.get(key)
+        if value is not None:
+            return None if value is _MISSING_VALUE else value
+
+        def store(value: Any) -> None:
+            if not self._enabled:
+                return
+            if value is not None:
+                if self._should_cache and not self._should_cache(value):
+                    return
+                self._cache.set(key, value)
+            elif self._cache_none:
+                self._cache.set(key, _MISSING_VALUE)
+
+        return await self._in_flight.run(key, loader, on_result=store)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Удаляет значение из кэша. Загрузка, начатая до инвалидации, не попадёт в кэш.
+        """
+        self._cache.delete(key)
+        self._in_flight.forget(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._in_flight.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
@@ -0,0 +1,63 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные вызовы с одинаковым ключом: пока вызов
+    выполняется, остальные дожидаются его результата (или исключения), а не
+    выполняют свой.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def run(
+        self,
+        key: Hashable,
+        call: Callable[[], Awaitable[Any]],
+        on_result: Optional[Callable[[Any], None]] = None,
+    ) -> Any:
+        """
+        Выполняет call или дожидается уже выполняющегося вызова с тем же key.
+        on_result вызывается с результатом, только если вызов не был забыт
+        через forget, пока выполнялся.
+        """
+        in_flight = self._in_flight.get(key)
+        if in_flight:
+            self.coalesced += 1
+            return await asyncio.shield(in_flight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение уже передано ожидающим, не оставляем его "неполученным"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if on_result is not None and self._in_flight.get(key) is future:
+                on_result(result)
+            return result
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def forget(self, key: Hashable) -> None:
+        """
+        Следующий вызов с key выполнится заново, не дожидаясь текущего.
+        """
+        self._in_flight.pop(key, None)
+
+    def clear(self) -> None:
+        self._in_flight.clear()
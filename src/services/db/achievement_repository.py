@@ -1,5 +1,6 @@
 from typing import List
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 
 from src.models.achievement import Achievement
 from src.services.db.database import async_session
@@ -12,3 +13,16 @@ async def get_all_achievements() -> List[Achievement]:
     async with async_session() as session:
         result = await session.execute(select(Achievement))
         return result.scalars().all()
+
+
+async def create_missing_achievements(achievements_data: List[dict]) -> None:
+    """
+    Добавляет в таблицу achievements записи, которых там ещё нет (по code).
+    """
+    async with async_session() as session:
+        await session.execute(
+            insert(Achievement)
+            .values(achievements_data)
+            .on_conflict_do_nothing(index_elements=[Achievement.code])
+        )
+        await session.commit()
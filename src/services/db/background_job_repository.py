@@ -0,0 +1,144 @@
+import uuid
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql
+
+from src.models.background_job import (
+    BackgroundJob,
+    JOB_FAILED,
+    JOB_PENDING,
+    JOB_RUNNING,
+)
+from src.services.db.database import async_session
+
+
+async def create_background_job(
+    kind: str,
+    user_id: int,
+    params: Optional[dict] = None,
+    dedup_key: Optional[str] = None,
+) -> Optional[BackgroundJob]:
+    """
+    Создаёт задачу в статусе pending и возвращает её. Если задан dedup_key и у
+    пользователя уже есть незавершённая задача того же вида с этим ключом,
+    задача не создаётся (ON CONFLICT DO NOTHING) и возвращается None.
+    """
+    now = datetime.now()
+    async with async_session() as session:
+        result = await session.execute(
+            postgresql.insert(BackgroundJob)
+            .values(
+                id=uuid.uuid4().hex,
+                kind=kind,
+                user_id=user_id,
+                params=params,
+                dedup_key=dedup_key,
+                status=JOB_PENDING,
+                created_at=now,
+                updated_at=now,
+            )
+            .on_conflict_do_nothing(
+                index_elements=["kind", "user_id", "dedup_key"],
+                index_where=(
+                    BackgroundJob.dedup_key.isnot(None)
+                    & BackgroundJob.status.in_([JOB_PENDING, JOB_RUNNING])
+                ),
+            )
+            .returning(BackgroundJob)
+        )
+        job = result.scalar_one_or_none()
+        await session.commit()
+        return job
+
+
+async def get_background_job(
+    job_id: str, kind: Optional[str] = None
+) -> Optional[BackgroundJob]:
+    async with async_session() as session:
+        stmt = select(BackgroundJob).where(BackgroundJob.id == job_id)
+        if kind is not None:
+            stmt = stmt.where(BackgroundJob.kind == kind)
+        result = await session.execute(stmt)
+        return result.scalar_one_or_none()
+
+
+async def find_background_job(
+    kind: str,
+    user_id: int,
+    dedup_key: str,
+    statuses: Iterable[str],
+    updated_after: datetime,
+) -> Optional[BackgroundJob]:
+    """
+    Возвращает последнюю задачу с тем же ключом в одном из статусов statuses,
+    обновлявшуюся после updated_after, или None.
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            select(BackgroundJob)
+            .where(
+                BackgroundJob.kind == kind,
+                BackgroundJob.user_id == user_id,
+                BackgroundJob.dedup_key == dedup_key,
+                BackgroundJob.status.in_(list(statuses)),
+                BackgroundJob.updated_at >= updated_after,
+            )
+            .order_by(BackgroundJob.created_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+
+async def fail_stale_background_jobs(
+    kind: str, user_id: int, dedup_key: str, updated_before: datetime, error: str
+) -> int:
+    """
+    Отмечает прерванными незавершённые задачи с тем же ключом, которые не
+    обновлялись с updated_before (процесс, выполнявший их, остановлен), чтобы
+    они не мешали создать новую. Возвращает число таких задач.
+    """
+    now = datetime.now()
+    async with async_session() as session:
+        result = await session.execute(
+            update(BackgroundJob)
+            .where(
+                BackgroundJob.kind == kind,
+                BackgroundJob.user_id == user_id,
+                BackgroundJob.dedup_key == dedup_key,
+                BackgroundJob.status.in_([JOB_PENDING, JOB_RUNNING]),
+                BackgroundJob.updated_at < updated_before,
+            )
+            .values(status=JOB_FAILED, error=error, finished_at=now, updated_at=now)
+        )
+        await session.commit()
+        return result.rowcount
+
+
+async def update_background_job(job_id: str, **values) -> None:
+    """
+    Обновляет поля задачи и время её последнего обновления.
+    """
+    async with async_session() as session:
+        await session.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job_id)
+            .values(**values, updated_at=datetime.now())
+        )
+        await session.commit()
+
+
+async def delete_finished_background_jobs(kind: str, finished_before: datetime) -> int:
+    """
+    Удаляет завершённые задачи, закончившиеся раньше finished_before.
+    Возвращает число удалённых задач.
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            delete(BackgroundJob).where(
+                BackgroundJob.kind == kind,
+                BackgroundJob.finished_at < finished_before,
+            )
+        )
+        await session.commit()
+        return result.rowcount
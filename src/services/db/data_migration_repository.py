@@ -0,0 +1,19 @@
+from sqlalchemy.dialects.postgresql import insert
+
+from src.models.data_migration import DataMigration
+from src.services.db.database import async_session
+
+
+async def is_data_migration_applied(name: str) -> bool:
+    async with async_session() as session:
+        return await session.get(DataMigration, name) is not None
+
+
+async def mark_data_migration_applied(name: str) -> None:
+    async with async_session() as session:
+        await session.execute(
+            insert(DataMigration)
+            .values(name=name)
+            .on_conflict_do_nothing(index_elements=[DataMigration.name])
+        )
+        await session.commit()
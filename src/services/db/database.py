@@ -1,8 +1,8 @@
-from sqlalchemy import text
+import time
+from sqlalchemy import event, inspect, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.orm import sessionmaker
 
-from src.models.achievement import Achievement
 from src.settings import settings
 from src.models.base import Base
 import logging
@@ -10,61 +10,128 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-engine = create_async_engine(settings.db_url.get_secret_value(), echo=True)
+
+def create_engine_from_settings() -> AsyncEngine:
+    """
+    Создаёт асинхронный движок с параметрами пула и логирования из настроек.
+    """
+    db_url = settings.db_url.get_secret_value()
+    connect_args = {}
+    if "+asyncpg" in db_url:
+        # Кэш подготовленных выражений asyncpg на каждое соединение
+        connect_args["prepared_statement_cache_size"] = (
+            settings.db_statement_cache_size
+        )
+
+    new_engine = create_async_engine(
+        db_url,
+        echo=settings.db_echo,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=connect_args,
+    )
+    if settings.db_slow_query_ms > 0:
+        _register_slow_query_logging(new_engine, settings.db_slow_query_ms)
+    return new_engine
+
+
+def _register_slow_query_logging(engine: AsyncEngine, threshold_ms: int) -> None:
+    """
+    Логирует запросы, выполнявшиеся дольше threshold_ms миллисекунд.
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        elapsed_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+        if elapsed_ms >= threshold_ms:
+            logger.warning(f"Медленный запрос ({elapsed_ms:.0f} мс): {statement}")
+
+
+def get_pool_stats() -> dict:
+    """
+    Текущее использование пула соединений.
+    """
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+
+engine = create_engine_from_settings()
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
-achievements_data = [
-    {
-        "code": "start",
-        "name": "Главное - начать!",
-        "description": "Ты расчитал КБЖУ в первый раз.",
-        "icon_url": "/static/achievements/start.png",
-    },
-    {
-        "code": "discipline",
-        "name": "Дисциплина",
-        "description": "Ты расчитывал КБЖУ 7 дней подряд!",
-        "icon_url": "/static/achievements/discipline.png",
-    },
-    {
-        "code": "halfway",
-        "name": "Половина пути",
-        "description": "Ты прошел 50% пути к целевому весу.",
-        "icon_url": "/static/achievements/halfway.png",
-    },
-    {
-        "code": "winner",
-        "name": "Победитель",
-        "description": "Ты достиг целевого веса!",
-        "icon_url": "/static/achievements/winner.png",
-    },
-]
-
-
-async def init_achievements():
+
+def create_missing_columns(sync_conn) -> None:
     """
-    Добавляет 4 достижения в таблицу achievements, если их там ещё нет.
+    Добавляет в существующие таблицы nullable-колонки, появившиеся в моделях.
+    create_all не изменяет уже созданные таблицы.
     """
-    async with async_session() as session:
-        for ach in achievements_data:
-            result = await session.execute(
-                text("SELECT * FROM achievements WHERE code = :code"),
-                {"code": ach["code"]},
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=sync_conn.dialect)
+            logger.info(f"Добавляем колонку {table.name}.{column.name}")
+            sync_conn.execute(
+                text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
             )
-            if not result.scalar_one_or_none():
-                new_ach = Achievement(
-                    code=ach["code"],
-                    name=ach["name"],
-                    description=ach["description"],
-                    icon_url=ach["icon_url"],
-                )
-                session.add(new_ach)
-        await session.commit()
+
+
+def remove_duplicate_user_achievements(sync_conn) -> None:
+    """
+    Удаляет повторно выданные достижения (остаётся самая ранняя запись), чтобы
+    можно было создать уникальный индекс по (user_id, achievement_id).
+    Выполняется, только пока этого индекса нет.
+    """
+    inspector = inspect(sync_conn)
+    if not inspector.has_table("user_achievements"):
+        return
+    index_names = {
+        index["name"] for index in inspector.get_indexes("user_achievements")
+    }
+    if "ix_user_achievements_user_id_achievement_id" in index_names:
+        return
+
+    result = sync_conn.execute(
+        text(
+            "DELETE FROM user_achievements "
+            "WHERE user_id IS NOT NULL AND achievement_id IS NOT NULL "
+            "AND id NOT IN ("
+            "SELECT MIN(id) FROM user_achievements "
+            "GROUP BY user_id, achievement_id)"
+        )
+    )
+    if result.rowcount:
+        logger.info(f"Удалено повторных достижений: {result.rowcount}")
+
+
+def create_missing_indexes(sync_conn) -> None:
+    """
+    Создаёт индексы моделей, которых ещё нет в существующей базе.
+    create_all создаёт индексы только вместе с новыми таблицами.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
 
 
 async def init_db(engine: AsyncEngine):
     """
-    Инициализация базы данных: удаление всех таблиц и их повторное создание.
+    Инициализация базы данных: создание недостающих таблиц и индексов.
     """
     async with engine.begin() as conn:
         # Удаляем все существующие таблицы
@@ -76,3 +143,11 @@ async def init_db(engine: AsyncEngine):
         await conn.run_sync(Base.metadata.create_all)
 
         logger.info("Все таблицы созданы.")
+
+        # Добавляем колонки и индексы, появившиеся после создания таблиц
+        logger.info("Создаём недостающие колонки...")
+        await conn.run_sync(create_missing_columns)
+
+        logger.info("Создаём недостающие индексы...")
+        await conn.run_sync(remove_duplicate_user_achievements)
+        await conn.run_sync(create_missing_indexes)
@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from src.models.nutrition_cache import NutritionCache
+from src.services.db.database import async_session
+
+
+async def get_cached_nutrition(
+    cache_key: str, created_after: datetime
+) -> Optional[dict]:
+    """
+    Возвращает сохранённый результат расчёта КБЖУ по ключу, если он не старше
+    created_after, иначе None.
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            select(NutritionCache.nutrition_info).where(
+                NutritionCache.cache_key == cache_key,
+                NutritionCache.created_at >= created_after,
+            )
+        )
+        return result.scalar_one_or_none()
+
+
+async def save_cached_nutrition(cache_key: str, nutrition_info: dict) -> None:
+    """
+    Создаёт или перезаписывает результат расчёта КБЖУ по ключу.
+    """
+    now = datetime.now()
+    async with async_session() as session:
+        stmt = insert(NutritionCache).values(
+            cache_key=cache_key, nutrition_info=nutrition_info, created_at=now
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[NutritionCache.cache_key],
+            set_={"nutrition_info": nutrition_info, "created_at": now},
+        )
+        await session.execute(stmt)
+        await session.commit()
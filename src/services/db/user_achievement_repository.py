@@ -1,5 +1,6 @@
-from typing import List
+from typing import Iterable, List
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from datetime import datetime
 
 from src.models.user_achievement import UserAchievement
@@ -41,3 +42,49 @@ async def unlock_user_achievement(user_id: int, achievement_id: int) -> UserAchi
         await session.commit()
         await session.refresh(new_ua)
         return new_ua
+
+
+async def get_unlocked_achievement_ids(user_ids: Iterable[int]) -> dict[int, set[int]]:
+    """
+    Возвращает id полученных достижений для нескольких пользователей одним запросом.
+    """
+    user_ids = list(user_ids)
+    unlocked = {user_id: set() for user_id in user_ids}
+    async with async_session() as session:
+        result = await session.execute(
+            select(UserAchievement.user_id, UserAchievement.achievement_id).where(
+                UserAchievement.user_id.in_(user_ids)
+            )
+        )
+        for user_id, achievement_id in result.all():
+            unlocked[user_id].add(achievement_id)
+    return unlocked
+
+
+async def unlock_user_achievements(unlocks: List[tuple[int, int]]) -> None:
+    """
+    Создаёт записи о полученных достижениях пачкой. unlocks — пары
+    (user_id, achievement_id); уже полученные достижения пропускаются.
+    """
+    if not unlocks:
+        return
+
+    unlocked_at = datetime.utcnow()
+    async with async_session() as session:
+        await session.execute(
+            insert(UserAchievement)
+            .values(
+                [
+                    {
+                        "user_id": user_id,
+                        "achievement_id": achievement_id,
+                        "unlocked_at": unlocked_at,
+                    }
+                    for user_id, achievement_id in unlocks
+                ]
+            )
+            .on_conflict_do_nothing(
+                index_elements=[UserAchievement.user_id, UserAchievement.achievement_id]
+            )
+        )
+        await session.commit()
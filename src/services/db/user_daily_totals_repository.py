@@ -0,0 +1,186 @@
+from datetime import date
+from typing import Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.services.db.database import async_session
+from src.models.user_daily_totals import UserDailyTotals
+from src.models.user_food_log import UserFoodLog
+
+
+# Групп (пользователь, день) в одном INSERT: 7 параметров на группу, asyncpg
+# принимает не больше 32767 параметров в запросе
+DAILY_TOTALS_UPSERT_CHUNK = 1000
+
+
+async def apply_food_log_to_daily_totals(
+    session: AsyncSession, food_log: UserFoodLog, sign: int
+) -> int:
+    """
+    Прибавляет (sign=1) или вычитает (sign=-1) КБЖУ приема пищи из суммы за его день.
+    Выполняется в переданной сессии, чтобы изменение попало в ту же транзакцию,
+    что и смена is_saved. Возвращает число сохранённых приемов пищи за день.
+    """
+    factor = sign * food_log.amount / 100
+    values = {
+        "calories": food_log.calories * factor,
+        "proteins": food_log.proteins * factor,
+        "fats": food_log.fats * factor,
+        "carbohydrates": food_log.carbohydrates * factor,
+        "logs_count": sign,
+    }
+    stmt = insert(UserDailyTotals).values(
+        user_id=food_log.user_id, date=food_log.date_added.date(), **values
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserDailyTotals.user_id, UserDailyTotals.date],
+        set_={
+            column: getattr(UserDailyTotals, column) + getattr(stmt.excluded, column)
+            for column in values
+        },
+    ).returning(UserDailyTotals.logs_count)
+    result = await session.execute(stmt)
+    return result.scalar_one()
+
+
+async def apply_food_logs_to_daily_totals(
+    session: AsyncSession, food_log_rows: list[dict]
+) -> None:
+    """
+    Прибавляет к суммам по дням КБЖУ сохранённых приемов пищи из пакетной
+    вставки (словари значений колонок UserFoodLog) запросами
+    INSERT ... ON CONFLICT по DAILY_TOTALS_UPSERT_CHUNK дней.
+    """
+    columns = ["calories", "proteins", "fats", "carbohydrates", "logs_count"]
+    grouped: dict[tuple[int, date], dict] = {}
+    for row in food_log_rows:
+        if not row["is_saved"]:
+            continue
+        factor = row["amount"] / 100
+        totals = grouped.setdefault(
+            (row["user_id"], row["date_added"].date()),
+            dict.fromkeys(columns, 0),
+        )
+        totals["calories"] += row["calories"] * factor
+        totals["proteins"] += row["proteins"] * factor
+        totals["fats"] += row["fats"] * factor
+        totals["carbohydrates"] += row["carbohydrates"] * factor
+        totals["logs_count"] += 1
+    values = [
+        {"user_id": user_id, "date": day, **totals}
+        for (user_id, day), totals in sorted(grouped.items())
+    ]
+    for start in range(0, len(values), DAILY_TOTALS_UPSERT_CHUNK):
+        stmt = insert(UserDailyTotals).values(
+            values[start : start + DAILY_TOTALS_UPSERT_CHUNK]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserDailyTotals.user_id, UserDailyTotals.date],
+            set_={
+                column: getattr(UserDailyTotals, column)
+                + getattr(stmt.excluded, column)
+                for column in columns
+            },
+        )
+        await session.execute(stmt)
+
+
+async def get_daily_totals(user_id: int, day: date) -> Optional[UserDailyTotals]:
+    """
+    Возвращает суммы КБЖУ пользователя за день, или None, если за день нет записей.
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            select(UserDailyTotals).where(
+                UserDailyTotals.user_id == user_id, UserDailyTotals.date == day
+            )
+        )
+        return result.scalar_one_or_none()
+
+
+def _aggregate_saved_logs_query():
+    """
+    Запрос, агрегирующий сохранённые приемы пищи по (user_id, дата).
+    """
+    day = func.date(UserFoodLog.date_added)
+    factor = UserFoodLog.amount / 100.0
+    return select(
+        UserFoodLog.user_id.label("user_id"),
+        day.label("date"),
+        func.sum(UserFoodLog.calories * factor).label("calories"),
+        func.sum(UserFoodLog.proteins * factor).label("proteins"),
+        func.sum(UserFoodLog.fats * factor).label("fats"),
+        func.sum(UserFoodLog.carbohydrates * factor).label("carbohydrates"),
+        func.count(UserFoodLog.id).label("logs_count"),
+    ).where(UserFoodLog.is_saved == True).group_by(UserFoodLog.user_id, day)
+
+
+async def rebuild_daily_totals(user_id: Optional[int] = None) -> int:
+    """
+    Пересчитывает суммы по дням из приемов пищи (для всех пользователей или одного)
+    в одной транзакции. Возвращает количество записанных дней.
+    """
+    aggregated = _aggregate_saved_logs_query()
+    clear_stmt = delete(UserDailyTotals)
+    if user_id is not None:
+        aggregated = aggregated.where(UserFoodLog.user_id == user_id)
+        clear_stmt = clear_stmt.where(UserDailyTotals.user_id == user_id)
+
+    columns = [
+        "user_id",
+        "date",
+        "calories",
+        "proteins",
+        "fats",
+        "carbohydrates",
+        "logs_count",
+    ]
+    async with async_session() as session:
+        await session.execute(clear_stmt)
+        result = await session.execute(
+            insert(UserDailyTotals)
+            .from_select(columns, aggregated)
+            .returning(UserDailyTotals.id)
+        )
+        rows_count = len(result.all())
+        await session.commit()
+        return rows_count
+
+
+async def find_daily_totals_mismatches(
+    user_id: Optional[int] = None, tolerance: float = 0.01
+) -> list[dict]:
+    """
+    Сравнивает суммы по дням с приемами пищи и возвращает расхождения:
+    дни, которых нет в одной из таблиц, и дни с разными суммами.
+    """
+    aggregated = _aggregate_saved_logs_query()
+    totals_stmt = select(UserDailyTotals).where(UserDailyTotals.logs_count != 0)
+    if user_id is not None:
+        aggregated = aggregated.where(UserFoodLog.user_id == user_id)
+        totals_stmt = totals_stmt.where(UserDailyTotals.user_id == user_id)
+
+    async with async_session() as session:
+        expected = {
+            (row.user_id, row.date): row
+            for row in (await session.execute(aggregated)).all()
+        }
+        actual = {
+            (row.user_id, row.date): row
+            for row in (await session.execute(totals_stmt)).scalars().all()
+        }
+
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys()):
+        expected_row = expected.get(key)
+        actual_row = actual.get(key)
+        fields = {}
+        for field in ["calories", "proteins", "fats", "carbohydrates", "logs_count"]:
+            expected_value = getattr(expected_row, field) if expected_row else 0
+            actual_value = getattr(actual_row, field) if actual_row else 0
+            if abs((expected_value or 0) - (actual_value or 0)) > tolerance:
+                fields[field] = {"expected": expected_value, "actual": actual_value}
+        if fields:
+            mismatches.append({"user_id": key[0], "date": key[1], "fields": fields})
+    return mismatches
@@ -1,8 +1,21 @@
-from datetime import datetime, timedelta
-from sqlalchemy import func, select
+import uuid
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator
+from sqlalchemy import and_, func, insert, select
+from sqlalchemy.dialects import postgresql
 
+from src.settings import settings
 from src.services.db.database import async_session
+from src.services.db.user_daily_totals_repository import (
+    apply_food_log_to_daily_totals,
+    apply_food_logs_to_daily_totals,
+)
+from src.services.db.user_progress_repository import (
+    apply_food_log_to_progress,
+    recalculate_progress_for_users,
+)
 from src.models.user_food_log import UserFoodLog
+from src.models.user_daily_totals import UserDailyTotals
 
 
 async def create_food_log(
@@ -13,24 +26,111 @@ async def create_food_log(
     """
     async with async_session() as session:
         food_log = UserFoodLog(
-            user_id=user_id,
-            food_name=nutrition_info["food"],
-            calories=nutrition_info["calories"],
-            proteins=nutrition_info["proteins"],
-            fats=nutrition_info["fats"],
-            carbohydrates=nutrition_info["carbohydrates"],
-            fiber=nutrition_info.get("fiber"),
-            amount=100,
-            date_added=datetime.now(),
-            is_saved=False,
-            message_id=message_id,
-            entry_uuid=entry_uuid,
-            rating=nutrition_info.get("rating"),
+            **_food_log_values(user_id, nutrition_info, message_id, entry_uuid)
         )
         session.add(food_log)
         await session.commit()
 
 
+async def create_food_logs(user_id: int, entries: list[dict]) -> None:
+    """
+    Создаёт несколько записей в UserFoodLog пакетной вставкой.
+    entries — словари с ключами nutrition_info, message_id и entry_uuid.
+    """
+    await bulk_create_food_logs(
+        [
+            _food_log_values(
+                user_id,
+                entry["nutrition_info"],
+                entry["message_id"],
+                entry["entry_uuid"],
+            )
+            for entry in entries
+        ]
+    )
+
+
+async def bulk_create_food_logs(
+    rows: list[dict], skip_existing: bool = False
+) -> list[int]:
+    """
+    Вставляет множество записей UserFoodLog в одной транзакции многострочными
+    INSERT ... RETURNING (SQLAlchemy сам разбивает их на пачки). rows — словари
+    значений колонок; amount, date_added, is_saved, message_id, entry_uuid,
+    fiber и rating можно не указывать. Для сохранённых записей обновляются
+    суммы по дням и прогресс. Возвращает id в порядке rows.
+    С skip_existing записи с уже существующим entry_uuid пропускаются
+    (ON CONFLICT DO NOTHING) и не учитываются в суммах; тогда возвращаются id
+    только вставленных записей, без сохранения порядка.
+    """
+    if not rows:
+        return []
+
+    rows = [_with_food_log_defaults(row) for row in rows]
+    async with async_session() as session:
+        if skip_existing:
+            rows = list({row["entry_uuid"]: row for row in reversed(rows)}.values())
+            result = await session.execute(
+                postgresql.insert(UserFoodLog)
+                .on_conflict_do_nothing(index_elements=[UserFoodLog.entry_uuid])
+                .returning(UserFoodLog.id, UserFoodLog.entry_uuid),
+                rows,
+            )
+            inserted = result.all()
+            inserted_uuids = {row.entry_uuid for row in inserted}
+            rows = [row for row in rows if row["entry_uuid"] in inserted_uuids]
+            ids = [row.id for row in inserted]
+        else:
+            result = await session.execute(
+                insert(UserFoodLog).returning(
+                    UserFoodLog.id, sort_by_parameter_order=True
+                ),
+                rows,
+            )
+            ids = list(result.scalars().all())
+
+        await apply_food_logs_to_daily_totals(session, rows)
+        saved_user_ids = {row["user_id"] for row in rows if row["is_saved"]}
+        if saved_user_ids:
+            await recalculate_progress_for_users(session, saved_user_ids)
+
+        await session.commit()
+        return ids
+
+
+def _with_food_log_defaults(row: dict) -> dict:
+    return {
+        "amount": 100,
+        "date_added": datetime.now(),
+        "is_saved": False,
+        "message_id": 0,
+        "fiber": None,
+        "rating": None,
+        **row,
+        "entry_uuid": row.get("entry_uuid") or str(uuid.uuid4()),
+    }
+
+
+def _food_log_values(
+    user_id: int, nutrition_info: dict, message_id: int, entry_uuid: str
+) -> dict:
+    return {
+        "user_id": user_id,
+        "food_name": nutrition_info["food"],
+        "calories": nutrition_info["calories"],
+        "proteins": nutrition_info["proteins"],
+        "fats": nutrition_info["fats"],
+        "carbohydrates": nutrition_info["carbohydrates"],
+        "fiber": nutrition_info.get("fiber"),
+        "amount": 100,
+        "date_added": datetime.now(),
+        "is_saved": False,
+        "message_id": message_id,
+        "entry_uuid": entry_uuid,
+        "rating": nutrition_info.get("rating"),
+    }
+
+
 async def count_food_logs_for_user(user_id: int) -> int:
     """
     Количество сохранённых в дневник (is_saved=True) приемов пищи у пользователя.
@@ -50,10 +150,9 @@ async def get_unique_dates_with_logs(user_id: int):
     """
     async with async_session() as session:
         result = await session.execute(
-            select(func.date(UserFoodLog.date_added))
-            .where(UserFoodLog.user_id == user_id, UserFoodLog.is_saved == True)
-            .group_by(func.date(UserFoodLog.date_added))
-            .order_by(func.date(UserFoodLog.date_added).asc())
+            select(UserDailyTotals.date)
+            .where(UserDailyTotals.user_id == user_id, UserDailyTotals.logs_count > 0)
+            .order_by(UserDailyTotals.date.asc())
         )
         dates = [row[0] for row in result.all()]
         return dates
@@ -77,6 +176,76 @@ async def get_food_logs_by_user_id_and_day(user_id: int, day_start: datetime):
         return result.scalars().all()
 
 
+async def get_daily_intake_in_range(
+    user_id: int, range_start: datetime, range_end: datetime
+) -> dict[date, dict]:
+    """
+    Возвращает сохранённые (is_saved=True) приемы пищи за период [range_start, range_end)
+    вместе с суммой КБЖУ по каждому дню из user_daily_totals. Логи и суммы
+    выбираются одним запросом, поэтому период любой длины — один запрос.
+    Ключ результата — дата, значение — словарь с суммами и списком food_logs.
+    """
+    day = func.date(UserFoodLog.date_added)
+    async with async_session() as session:
+        result = await session.execute(
+            select(UserFoodLog, day.label("day"), UserDailyTotals)
+            .outerjoin(
+                UserDailyTotals,
+                and_(
+                    UserDailyTotals.user_id == UserFoodLog.user_id,
+                    UserDailyTotals.date == day,
+                ),
+            )
+            .where(
+                UserFoodLog.user_id == user_id,
+                UserFoodLog.is_saved == True,
+                UserFoodLog.date_added >= range_start,
+                UserFoodLog.date_added < range_end,
+            )
+            .order_by(UserFoodLog.date_added.asc())
+        )
+
+        days = {}
+        for food_log, log_day, daily_totals in result.all():
+            if log_day not in days:
+                days[log_day] = {"daily_totals": daily_totals, "food_logs": []}
+            days[log_day]["food_logs"].append(food_log)
+
+    return {
+        log_day: {
+            **_daily_totals_to_dict(day_data["daily_totals"], day_data["food_logs"]),
+            "food_logs": day_data["food_logs"],
+        }
+        for log_day, day_data in days.items()
+    }
+
+
+def _daily_totals_to_dict(
+    daily_totals: UserDailyTotals | None, food_logs: list[UserFoodLog]
+) -> dict:
+    """
+    Суммы КБЖУ за день. Если суммы за день ещё не посчитаны (до заполнения
+    user_daily_totals), считает их по приемам пищи.
+    """
+    if daily_totals is not None:
+        totals = {
+            "calories": daily_totals.calories,
+            "proteins": daily_totals.proteins,
+            "fats": daily_totals.fats,
+            "carbohydrates": daily_totals.carbohydrates,
+        }
+    else:
+        totals = {
+            "calories": sum(fl.calories * fl.amount / 100 for fl in food_logs),
+            "proteins": sum(fl.proteins * fl.amount / 100 for fl in food_logs),
+            "fats": sum(fl.fats * fl.amount / 100 for fl in food_logs),
+            "carbohydrates": sum(
+                fl.carbohydrates * fl.amount / 100 for fl in food_logs
+            ),
+        }
+    return {key: round(value, 2) for key, value in totals.items()}
+
+
 async def get_last_food_logs(user_id: int, limit: int = 10):
     """
     Возвращает последние limit сохранённых записей приемов пищи для заданного user_id.
@@ -91,6 +260,22 @@ async def get_last_food_logs(user_id: int, limit: int = 10):
         return result.scalars().all()
 
 
+async def stream_saved_food_logs(user_id: int) -> AsyncIterator[UserFoodLog]:
+    """
+    Отдаёт все сохранённые приемы пищи пользователя (самые свежие – первыми)
+    через курсор на стороне сервера, не загружая историю в память целиком.
+    """
+    async with async_session() as session:
+        result = await session.stream_scalars(
+            select(UserFoodLog)
+            .where(UserFoodLog.user_id == user_id, UserFoodLog.is_saved == True)
+            .order_by(UserFoodLog.date_added.desc())
+            .execution_options(yield_per=settings.db_stream_batch_size)
+        )
+        async for food_log in result:
+            yield food_log
+
+
 async def update_food_save_status(
     user_id: int, entry_uuid: str, action: str
 ) -> tuple[str, UserFoodLog]:
@@ -99,9 +284,9 @@ async def update_food_save_status(
     """
     async with async_session() as session:
         result = await session.execute(
-            select(UserFoodLog).where(
-                UserFoodLog.entry_uuid == entry_uuid, UserFoodLog.user_id == user_id
-            )
+            select(UserFoodLog)
+            .where(UserFoodLog.entry_uuid == entry_uuid, UserFoodLog.user_id == user_id)
+            .with_for_update()
         )
         food_log = result.scalar_one_or_none()
         if not food_log:
@@ -110,6 +295,16 @@ async def update_food_save_status(
         if action == "save_food":
             if not food_log.is_saved:
                 food_log.is_saved = True
+                day_logs_count = await apply_food_log_to_daily_totals(
+                    session, food_log, sign=1
+                )
+                await apply_food_log_to_progress(
+                    session,
+                    user_id,
+                    food_log.date_added.date(),
+                    sign=1,
+                    day_logs_count=day_logs_count,
+                )
                 await session.commit()
                 return f"{food_log.food_name} добавлено в ваш дневник!", food_log
             else:
@@ -118,6 +313,16 @@ async def update_food_save_status(
         elif action == "remove_food":
             if food_log.is_saved:
                 food_log.is_saved = False
+                day_logs_count = await apply_food_log_to_daily_totals(
+                    session, food_log, sign=-1
+                )
+                await apply_food_log_to_progress(
+                    session,
+                    user_id,
+                    food_log.date_added.date(),
+                    sign=-1,
+                    day_logs_count=day_logs_count,
+                )
                 await session.commit()
                 return f"{food_log.food_name} удалено из вашего дневника.", food_log
             else:
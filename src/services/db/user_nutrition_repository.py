@@ -2,19 +2,24 @@ from typing import Optional
 from sqlalchemy import select
 
 from src.services.db.database import async_session
+from src.services.cache.entity_cache import user_nutrition_cache
 from src.models.user_nutrition import UserNutrition
 
 
 async def get_nutrition_by_profile_id(profile_id: int) -> Optional[UserNutrition]:
     """
     Возвращает запись о суточной норме калорий UserNutrition по profile_id.
-    Если не найдена, вернёт None.
+    Если не найдена, вернёт None. Результат кэшируется.
     """
-    async with async_session() as session:
-        result_nutrition = await session.execute(
-            select(UserNutrition).where(UserNutrition.user_profile_id == profile_id)
-        )
-        return result_nutrition.scalar_one_or_none()
+
+    async def load_nutrition():
+        async with async_session() as session:
+            result_nutrition = await session.execute(
+                select(UserNutrition).where(UserNutrition.user_profile_id == profile_id)
+            )
+            return result_nutrition.scalar_one_or_none()
+
+    return await user_nutrition_cache.get_or_load(profile_id, load_nutrition)
 
 
 async def create_or_update_nutrition_by_profile_id(
@@ -38,6 +43,7 @@ async def create_or_update_nutrition_by_profile_id(
 
             await session.commit()
             await session.refresh(existing_nutrition)
+            user_nutrition_cache.invalidate(profile_id)
             return existing_nutrition
         else:
             new_nutrition = UserNutrition(
@@ -50,4 +56,5 @@ async def create_or_update_nutrition_by_profile_id(
             session.add(new_nutrition)
             await session.commit()
             await session.refresh(new_nutrition)
+            user_nutrition_cache.invalidate(profile_id)
             return new_nutrition
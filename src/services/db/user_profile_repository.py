@@ -1,20 +1,38 @@
-from typing import Optional
+from typing import Iterable, Optional
 from sqlalchemy import select
 
 from src.services.db.database import async_session
+from src.services.cache.entity_cache import user_profile_cache
 from src.models.user_profile import UserProfile
 
 
 async def get_user_profile_by_user_id(user_id: int) -> Optional[UserProfile]:
     """
     Возвращает профиль пользователя по user_id.
-    Если профиль не найден, возвращает None.
+    Если профиль не найден, возвращает None. Результат кэшируется.
+    """
+
+    async def load_profile():
+        async with async_session() as session:
+            result = await session.execute(
+                select(UserProfile).where(UserProfile.user_id == user_id)
+            )
+            return result.scalar_one_or_none()
+
+    return await user_profile_cache.get_or_load(user_id, load_profile)
+
+
+async def get_user_profiles_by_user_ids(
+    user_ids: Iterable[int],
+) -> dict[int, UserProfile]:
+    """
+    Возвращает профили нескольких пользователей одним запросом (по user_id).
     """
     async with async_session() as session:
         result = await session.execute(
-            select(UserProfile).where(UserProfile.user_id == user_id)
+            select(UserProfile).where(UserProfile.user_id.in_(list(user_ids)))
         )
-        return result.scalar_one_or_none()
+        return {profile.user_id: profile for profile in result.scalars().all()}
 
 
 async def create_or_update_profile_by_user_id(
@@ -41,6 +59,7 @@ async def create_or_update_profile_by_user_id(
 
             await session.commit()
             await session.refresh(existing_profile)
+            user_profile_cache.invalidate(user_id)
             return existing_profile
         else:
             new_profile = UserProfile(
@@ -56,4 +75,5 @@ async def create_or_update_profile_by_user_id(
             session.add(new_profile)
             await session.commit()
             await session.refresh(new_profile)
+            user_profile_cache.invalidate(user_id)
             return new_profile
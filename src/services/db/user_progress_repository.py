@@ -0,0 +1,183 @@
+from datetime import date, timedelta
+from typing import Iterable, Optional
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.services.db.database import async_session
+from src.models.user_progress import UserProgress
+from src.models.user_daily_totals import UserDailyTotals
+from src.models.user_weight_history import UserWeightHistory
+
+
+async def get_user_progress(user_id: int) -> Optional[UserProgress]:
+    """
+    Возвращает сохранённый прогресс пользователя (серии дней, первый вес) или None.
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            select(UserProgress).where(UserProgress.user_id == user_id)
+        )
+        return result.scalar_one_or_none()
+
+
+async def get_user_progress_by_user_ids(
+    user_ids: Iterable[int],
+) -> dict[int, UserProgress]:
+    """
+    Возвращает прогресс нескольких пользователей одним запросом (по user_id).
+    """
+    async with async_session() as session:
+        result = await session.execute(
+            select(UserProgress).where(UserProgress.user_id.in_(list(user_ids)))
+        )
+        return {progress.user_id: progress for progress in result.scalars().all()}
+
+
+async def rebuild_user_progress(user_id: int) -> UserProgress:
+    """
+    Пересчитывает прогресс пользователя с нуля по user_daily_totals и истории веса.
+    """
+    async with async_session() as session:
+        progress, _ = await _get_or_create_progress(session, user_id)
+        await _recalculate_progress(session, progress)
+        await session.commit()
+        await session.refresh(progress)
+        return progress
+
+
+async def rebuild_all_user_progress() -> int:
+    """
+    Пересчитывает все сохранённые строки прогресса (после пересчёта
+    user_daily_totals). Возвращает число пересчитанных пользователей.
+    """
+    async with async_session() as session:
+        result = await session.execute(select(UserProgress.user_id))
+        user_ids = result.scalars().all()
+        await recalculate_progress_for_users(session, user_ids)
+        await session.commit()
+        return len(user_ids)
+
+
+async def recalculate_progress_for_users(
+    session: AsyncSession, user_ids: Iterable[int]
+) -> None:
+    """
+    Пересчитывает прогресс нескольких пользователей в переданной сессии
+    (после пакетной вставки приемов пищи или веса).
+    """
+    for user_id in sorted(set(user_ids)):
+        progress, _ = await _get_or_create_progress(session, user_id)
+        await _recalculate_progress(session, progress)
+
+
+async def apply_food_log_to_progress(
+    session: AsyncSession, user_id: int, day: date, sign: int, day_logs_count: int
+) -> None:
+    """
+    Обновляет серии дней после добавления (sign=1) или удаления (sign=-1) приема
+    пищи за day. day_logs_count — число сохранённых приемов за этот день после
+    изменения. Пересчёт всей истории нужен только при удалении последнего приема
+    за день или при добавлении дня раньше последнего.
+    """
+    progress, created = await _get_or_create_progress(session, user_id)
+    if created:
+        await _recalculate_progress(session, progress)
+        return
+
+    if sign > 0 and day_logs_count == 1:
+        last_date = progress.last_logged_date
+        if last_date is None or day == last_date + timedelta(days=1):
+            progress.current_streak += 1
+        elif day > last_date:
+            progress.current_streak = 1
+        else:
+            await _recalculate_progress(session, progress)
+            return
+        progress.last_logged_date = day
+        progress.longest_streak = max(progress.longest_streak, progress.current_streak)
+    elif sign < 0 and day_logs_count == 0:
+        await _recalculate_progress(session, progress)
+
+
+async def apply_weight_to_progress(
+    session: AsyncSession, user_id: int, weight: float
+) -> None:
+    """
+    Запоминает первый зафиксированный вес пользователя.
+    """
+    progress, created = await _get_or_create_progress(session, user_id)
+    if created:
+        await _recalculate_progress(session, progress)
+    if progress.first_weight is None:
+        progress.first_weight = weight
+
+
+async def _get_or_create_progress(
+    session: AsyncSession, user_id: int
+) -> tuple[UserProgress, bool]:
+    """
+    Создаёт строку прогресса, если её нет (INSERT ... ON CONFLICT DO NOTHING,
+    поэтому одновременные первые записи не падают на уникальности user_id),
+    и блокирует её на время транзакции. Возвращает (прогресс, создана ли
+    строка сейчас); новую строку нужно заполнить через _recalculate_progress.
+    """
+    inserted = await session.execute(
+        insert(UserProgress)
+        .values(
+            user_id=user_id, current_streak=0, longest_streak=0, last_logged_date=None
+        )
+        .on_conflict_do_nothing(index_elements=[UserProgress.user_id])
+        .returning(UserProgress.id)
+    )
+    created = inserted.scalar_one_or_none() is not None
+
+    result = await session.execute(
+        select(UserProgress)
+        .where(UserProgress.user_id == user_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one(), created
+
+
+async def _recalculate_progress(session: AsyncSession, progress: UserProgress) -> None:
+    dates_result = await session.execute(
+        select(UserDailyTotals.date)
+        .where(
+            UserDailyTotals.user_id == progress.user_id,
+            UserDailyTotals.logs_count > 0,
+        )
+        .order_by(UserDailyTotals.date.asc())
+    )
+    dates = [row[0] for row in dates_result.all()]
+    current_streak, longest_streak = calculate_streaks(dates)
+    progress.current_streak = current_streak
+    progress.longest_streak = longest_streak
+    progress.last_logged_date = dates[-1] if dates else None
+
+    weight_result = await session.execute(
+        select(UserWeightHistory.weight)
+        .where(UserWeightHistory.user_id == progress.user_id)
+        .order_by(UserWeightHistory.date_added.asc())
+        .limit(1)
+    )
+    progress.first_weight = weight_result.scalar_one_or_none()
+
+
+def calculate_streaks(dates: list[date]) -> tuple[int, int]:
+    """
+    По отсортированному списку дат возвращает (серия, заканчивающаяся последней
+    датой; самая длинная серия) дней подряд.
+    """
+    current_streak = 0
+    longest_streak = 0
+    previous = None
+    for day in dates:
+        if previous is not None and day == previous + timedelta(days=1):
+            current_streak += 1
+        else:
+            current_streak = 1
+        longest_streak = max(longest_streak, current_streak)
+        previous = day
+    return current_streak, longest_streak
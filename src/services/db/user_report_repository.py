@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Optional
 from sqlalchemy import select
 
@@ -6,14 +7,20 @@ from src.services.db.database import async_session
 
 
 async def сreate_user_report(
-    user_id: int, report_type: str, content: str
+    user_id: int,
+    report_type: str,
+    content: str,
+    input_fingerprint: Optional[str] = None,
 ) -> UserReport:
     """
     Создаёт новую запись отчёта пользователя и возвращает созданный объект UserReport.
     """
     async with async_session() as session:
         user_report = UserReport(
-            user_id=user_id, report_type=report_type, content=content
+            user_id=user_id,
+            report_type=report_type,
+            content=content,
+            input_fingerprint=input_fingerprint,
         )
         session.add(user_report)
         await session.commit()
@@ -21,6 +28,11 @@ async def сreate_user_report(
         return user_report
 
 
+async def get_user_report_by_id(report_id: int) -> Optional[UserReport]:
+    async with async_session() as session:
+        return await session.get(UserReport, report_id)
+
+
 async def get_last_user_report_by_type(
     user_id: int, report_type: str
 ) -> Optional[UserReport]:
@@ -38,3 +50,24 @@ async def get_last_user_report_by_type(
         )
         result = await session.execute(stmt)
         return result.scalar_one_or_none()
+
+
+async def get_last_user_report_by_fingerprint(
+    user_id: int, report_type: str, input_fingerprint: str, created_after: datetime
+) -> Optional[UserReport]:
+    """
+    Возвращает последний отчёт пользователя user_id с заданным report_type и
+    отпечатком входных данных, созданный после created_after, или None.
+    """
+    async with async_session() as session:
+        stmt = (
+            select(UserReport)
+            .where(UserReport.user_id == user_id)
+            .where(UserReport.report_type == report_type)
+            .where(UserReport.input_fingerprint == input_fingerprint)
+            .where(UserReport.created_at >= created_after)
+            .order_by(UserReport.created_at.desc())
+            .limit(1)
+        )
+        result = await session.execute(stmt)
+        return result.scalar_one_or_none()
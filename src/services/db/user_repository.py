@@ -2,17 +2,22 @@ from sqlalchemy import select
 
 from src.models.user import User
 from src.services.db.database import async_session
+from src.services.cache.entity_cache import user_cache
 
 
 async def get_user_by_telegram_id(telegram_id: int) -> User:
     """
-    Возвращает пользователя по его telegram_id.
+    Возвращает пользователя по его telegram_id. Результат кэшируется.
     """
-    async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.telegram_id == telegram_id)
-        )
-        return result.scalar_one_or_none()
+
+    async def load_user():
+        async with async_session() as session:
+            result = await session.execute(
+                select(User).where(User.telegram_id == telegram_id)
+            )
+            return result.scalar_one_or_none()
+
+    return await user_cache.get_or_load(telegram_id, load_user)
 
 
 async def create_user(telegram_id: int, username: str) -> User:
@@ -25,6 +30,7 @@ async def create_user(telegram_id: int, username: str) -> User:
         )
         session.add(user)
         await session.commit()
+        user_cache.invalidate(telegram_id)
         return user
 
 
@@ -40,5 +46,6 @@ async def accept_user_agreement_by_telegram_id(telegram_id: int) -> bool:
         if user and not user.agreement_accepted:
             user.agreement_accepted = True
             await session.commit()
+            user_cache.invalidate(telegram_id)
             return True
         return False
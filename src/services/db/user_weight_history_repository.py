@@ -1,7 +1,13 @@
-from typing import List
-from sqlalchemy import select, desc
+from datetime import datetime
+from typing import AsyncIterator, List
+from sqlalchemy import insert, select, desc
 
+from src.settings import settings
 from src.services.db.database import async_session
+from src.services.db.user_progress_repository import (
+    apply_weight_to_progress,
+    recalculate_progress_for_users,
+)
 from src.models.user_weight_history import UserWeightHistory
 
 
@@ -13,11 +19,67 @@ async def create_weight_record(user_id: int, weight: float) -> UserWeightHistory
     async with async_session() as session:
         record = UserWeightHistory(user_id=user_id, weight=weight)
         session.add(record)
+        await apply_weight_to_progress(session, user_id, weight)
         await session.commit()
         await session.refresh(record)
         return record
 
 
+async def bulk_create_weight_records(
+    rows: list[dict], skip_existing: bool = False
+) -> list[int]:
+    """
+    Вставляет множество записей веса (словари с user_id, weight и
+    необязательным date_added) в одной транзакции многострочными
+    INSERT ... RETURNING и пересчитывает прогресс затронутых пользователей.
+    Возвращает id в порядке rows. С skip_existing записи, совпадающие с уже
+    сохранёнными по пользователю, дате и весу, пропускаются.
+    """
+    if not rows:
+        return []
+
+    rows = [{"date_added": datetime.now(), **row} for row in rows]
+    async with async_session() as session:
+        if skip_existing:
+            rows = await _without_existing_weight_records(session, rows)
+            if not rows:
+                return []
+        result = await session.execute(
+            insert(UserWeightHistory).returning(
+                UserWeightHistory.id, sort_by_parameter_order=True
+            ),
+            rows,
+        )
+        ids = list(result.scalars().all())
+        await recalculate_progress_for_users(session, {row["user_id"] for row in rows})
+        await session.commit()
+        return ids
+
+
+async def _without_existing_weight_records(session, rows: list[dict]) -> list[dict]:
+    """
+    Убирает из rows повторы и записи, уже сохранённые в таблице.
+    """
+    existing = await session.execute(
+        select(
+            UserWeightHistory.user_id,
+            UserWeightHistory.date_added,
+            UserWeightHistory.weight,
+        ).where(
+            UserWeightHistory.user_id.in_({row["user_id"] for row in rows}),
+            UserWeightHistory.date_added.in_({row["date_added"] for row in rows}),
+        )
+    )
+    seen = {tuple(record) for record in existing.all()}
+    new_rows = []
+    for row in rows:
+        key = (row["user_id"], row["date_added"], row["weight"])
+        if key not in seen:
+            seen.add(key)
+            new_rows.append(row)
+    return new_rows
+
+
 async def get_weight_history_by_user_id(
     user_id: int, limit: int = 10
 ) -> List[UserWeightHistory]:
@@ -36,6 +98,22 @@ async def get_weight_history_by_user_id(
         return result.scalars().all()
 
 
+async def stream_weight_records(user_id: int) -> AsyncIterator[UserWeightHistory]:
+    """
+    Отдаёт всю историю веса пользователя (самые свежие – первыми) через курсор
+    на стороне сервера, не загружая её в память целиком.
+    """
+    async with async_session() as session:
+        result = await session.stream_scalars(
+            select(UserWeightHistory)
+            .where(UserWeightHistory.user_id == user_id)
+            .order_by(desc(UserWeightHistory.date_added))
+            .execution_options(yield_per=settings.db_stream_batch_size)
+        )
+        async for record in result:
+            yield record
+
+
 async def get_first_record(user_id: int):
     """
     Возвращает самый первый зафиксированный вес пользователя, или None, если записей нет.
@@ -0,0 +1,331 @@
+import asyncio
+import importlib.util
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+
+from src.settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 в httpx доступен только при установленном пакете h2 (httpx[http2]).
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+T = TypeVar("T")
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+
+
+@dataclass
+class PooledClient:
+    """
+    Долгоживущий клиент, привязанный к одному прокси, и его состояние здоровья:
+    сглаженные задержка и доля ошибок, а также состояние предохранителя
+    (circuit breaker), который отключает прокси после серии ошибок.
+    """
+
+    client: httpx.AsyncClient
+    proxy_url: Optional[str]
+    consecutive_failures: int = 0
+    total_failures: int = 0
+    total_successes: int = 0
+    last_failure_at: Optional[float] = None
+    latency_ewma: Optional[float] = None
+    error_rate: float = 0.0
+    circuit: str = CIRCUIT_CLOSED
+    opened_at: Optional[float] = None
+
+    def is_healthy(self, cooldown_seconds: float) -> bool:
+        """
+        Закрытый предохранитель — прокси доступен. Открытый пропускает пробный
+        запрос, только когда прошло cooldown_seconds с момента открытия.
+        """
+        if self.circuit == CIRCUIT_CLOSED:
+            return True
+        return time.monotonic() - self.opened_at >= cooldown_seconds
+
+    def score(self) -> float:
+        """
+        Оценка для выбора прокси: ожидаемая задержка с поправкой на долю
+        ошибок. Меньше — лучше; прокси без замеров пробуются первыми.
+        """
+        latency = self.latency_ewma or 0.0
+        return latency / max(1.0 - self.error_rate, 0.1)
+
+
+class HttpClientPool:
+    """
+    Пул keep-alive httpx.AsyncClient: по одному клиенту на каждый прокси из proxy_list
+    (или один клиент без прокси). Клиенты создаются лениво и переиспользуются между
+    запросами, поэтому TCP/TLS рукопожатие через прокси выполняется один раз.
+    Запросы идут через лучший по задержке и ошибкам прокси; отключённые прокси
+    возвращаются в работу фоновыми пробными запросами.
+    """
+
+    def __init__(
+        self,
+        proxy_urls: list[str],
+        max_connections: int,
+        max_keepalive_connections: int,
+        keepalive_expiry: float,
+        http2: bool,
+        failure_threshold: int,
+        cooldown_seconds: float,
+        ewma_alpha: float,
+        probe_url: str,
+        probe_interval_seconds: float,
+        hedge_delay_seconds: float,
+    ):
+        self._proxy_urls = proxy_urls
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._http2 = http2 and HTTP2_AVAILABLE
+        self._failure_threshold = failure_threshold
+        self._cooldown_seconds = cooldown_seconds
+        self._ewma_alpha = ewma_alpha
+        self._probe_url = probe_url
+        self._probe_interval_seconds = probe_interval_seconds
+        self._hedge_delay_seconds = hedge_delay_seconds
+        self._entries: list[PooledClient] = []
+        self._entries_by_client: dict[int, PooledClient] = {}
+        self._rotation = 0
+        self._probe_task: Optional[asyncio.Task] = None
+        self.hedged_requests = 0
+
+    def _build_client(self, proxy_url: Optional[str]) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            proxy=proxy_url,
+            limits=self._limits,
+            http2=self._http2,
+        )
+
+    def _ensure_entries(self) -> list[PooledClient]:
+        if not self._entries:
+            for proxy_url in self._proxy_urls or [None]:
+                entry = PooledClient(
+                    client=self._build_client(proxy_url), proxy_url=proxy_url
+                )
+                self._entries.append(entry)
+                self._entries_by_client[id(entry.client)] = entry
+        return self._entries
+
+    def _ensure_probing(self) -> None:
+        if (
+            self._probe_task is None
+            and len(self._proxy_urls) > 1
+            and self._probe_interval_seconds > 0
+        ):
+            self._probe_task = asyncio.get_running_loop().create_task(
+                self._probe_loop()
+            )
+
+    def get_clients(self) -> list[httpx.AsyncClient]:
+        """
+        Возвращает клиентов в порядке попыток: доступные прокси от лучшей оценки
+        к худшей (при равенстве — по кругу). Прокси с открытым предохранителем
+        не возвращаются, если есть хоть один доступный; иначе возвращается
+        дольше всех отключённый.
+        """
+        entries = self._ensure_entries()
+        self._ensure_probing()
+        start = self._rotation % len(entries)
+        self._rotation += 1
+        ordered = entries[start:] + entries[:start]
+
+        healthy = [
+            entry for entry in ordered if entry.is_healthy(self._cooldown_seconds)
+        ]
+        if not healthy:
+            return [min(ordered, key=lambda entry: entry.opened_at).client]
+        healthy.sort(key=lambda entry: entry.score())
+        return [entry.client for entry in healthy]
+
+    def get_client(self) -> httpx.AsyncClient:
+        """
+        Возвращает лучшего на данный момент клиента.
+        """
+        return self.get_clients()[0]
+
+    def report_success(
+        self, client: httpx.AsyncClient, latency: Optional[float] = None
+    ) -> None:
+        entry = self._entries_by_client.get(id(client))
+        if entry:
+            entry.consecutive_failures = 0
+            entry.total_successes += 1
+            entry.error_rate *= 1 - self._ewma_alpha
+            if latency is not None:
+                entry.latency_ewma = (
+                    latency
+                    if entry.latency_ewma is None
+                    else self._ewma_alpha * latency
+                    + (1 - self._ewma_alpha) * entry.latency_ewma
+                )
+            if entry.circuit == CIRCUIT_OPEN:
+                logger.info(f"Прокси {self._safe_proxy(entry)} снова доступен")
+                entry.circuit = CIRCUIT_CLOSED
+                entry.opened_at = None
+
+    def report_failure(self, client: httpx.AsyncClient) -> None:
+        entry = self._entries_by_client.get(id(client))
+        if entry:
+            now = time.monotonic()
+            entry.consecutive_failures += 1
+            entry.total_failures += 1
+            entry.last_failure_at = now
+            entry.error_rate = (
+                self._ewma_alpha + (1 - self._ewma_alpha) * entry.error_rate
+            )
+            if entry.circuit == CIRCUIT_OPEN:
+                # Пробный запрос не прошёл: ждём следующий период
+                entry.opened_at = now
+            elif entry.consecutive_failures >= self._failure_threshold:
+                entry.circuit = CIRCUIT_OPEN
+                entry.opened_at = now
+                logger.warning(
+                    f"Прокси {self._safe_proxy(entry)} отключен на "
+                    f"{self._cooldown_seconds} с после "
+                    f"{entry.consecutive_failures} ошибок подряд"
+                )
+
+    async def request_with_hedging(
+        self,
+        send: Callable[[httpx.AsyncClient], Awaitable[T]],
+        is_success: Callable[[T], bool],
+    ) -> Optional[T]:
+        """
+        Выполняет send через лучший прокси. Если ответа нет дольше
+        hedge_delay_seconds, параллельно отправляет тот же запрос через
+        следующий прокси и берёт первый успешный ответ. При неуспешном ответе
+        сразу пробует следующий прокси. Возвращает успешный ответ или
+        последний полученный, если успешных не было.
+        """
+        clients = self.get_clients()
+        pending: set[asyncio.Task] = set()
+        next_index = 0
+        last_result = None
+
+        def launch() -> None:
+            nonlocal next_index
+            pending.add(asyncio.create_task(send(clients[next_index])))
+            next_index += 1
+
+        launch()
+        try:
+            while pending:
+                can_hedge = (
+                    self._hedge_delay_seconds > 0
+                    and len(pending) < 2
+                    and next_index < len(clients)
+                )
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self._hedge_delay_seconds if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    self.hedged_requests += 1
+                    launch()
+                    continue
+
+                for task in done:
+                    pending.discard(task)
+                    error = task.exception()
+                    if error is not None:
+                        logger.error(f"Ошибка запроса через прокси: {str(error)}")
+                        continue
+                    result = task.result()
+                    if is_success(result):
+                        return result
+                    last_result = result
+
+                if len(pending) < 2 and next_index < len(clients):
+                    launch()
+            return last_result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _probe(self, entry: PooledClient) -> None:
+        """
+        Пробный запрос через отключённый прокси. Любой HTTP-ответ означает,
+        что прокси снова работает.
+        """
+        started_at = time.monotonic()
+        try:
+            await entry.client.get(self._probe_url, timeout=10)
+        except Exception as e:
+            logger.info(f"Пробный запрос через {self._safe_proxy(entry)}: {str(e)}")
+            self.report_failure(entry.client)
+        else:
+            self.report_success(entry.client, time.monotonic() - started_at)
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._probe_interval_seconds)
+            candidates = [
+                entry
+                for entry in self._entries
+                if entry.circuit == CIRCUIT_OPEN
+                and entry.is_healthy(self._cooldown_seconds)
+            ]
+            if candidates:
+                await asyncio.gather(*(self._probe(entry) for entry in candidates))
+
+    @staticmethod
+    def _safe_proxy(entry: PooledClient) -> Optional[str]:
+        return entry.proxy_url.rsplit("@", 1)[-1] if entry.proxy_url else None
+
+    def stats(self) -> list[dict]:
+        """
+        Состояние клиентов пула (без учётных данных прокси).
+        """
+        return [
+            {
+                "proxy": self._safe_proxy(entry),
+                "healthy": entry.is_healthy(self._cooldown_seconds),
+                "circuit": entry.circuit,
+                "latency_ewma": entry.latency_ewma,
+                "error_rate": round(entry.error_rate, 3),
+                "consecutive_failures": entry.consecutive_failures,
+                "total_failures": entry.total_failures,
+                "total_successes": entry.total_successes,
+            }
+            for entry in self._entries
+        ]
+
+    async def aclose(self) -> None:
+        """
+        Закрывает все клиенты пула. Вызывается при остановке приложения.
+        """
+        if self._probe_task:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+            self._probe_task = None
+        for entry in self._entries:
+            await entry.client.aclose()
+        self._entries = []
+        self._entries_by_client = {}
+
+
+http_client_pool = HttpClientPool(
+    proxy_urls=settings.get_proxy_urls(),
+    max_connections=settings.http_max_connections,
+    max_keepalive_connections=settings.http_max_keepalive_connections,
+    keepalive_expiry=settings.http_keepalive_expiry,
+    http2=settings.http2_enabled,
+    failure_threshold=settings.proxy_failure_threshold,
+    cooldown_seconds=settings.proxy_cooldown_seconds,
+    ewma_alpha=settings.proxy_ewma_alpha,
+    probe_url=settings.proxy_probe_url,
+    probe_interval_seconds=settings.proxy_probe_interval_seconds,
+    hedge_delay_seconds=settings.proxy_hedge_delay_seconds,
+)
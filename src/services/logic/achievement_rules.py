@@ -0,0 +1,88 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Iterable, Optional
+
+from src.models.user_profile import UserProfile
+from src.models.user_progress import UserProgress
+from src.services.logic.achievement_checks import (
+    has_started,
+    has_discipline,
+    has_halfway,
+    has_winner,
+)
+
+
+class AchievementEvent(Enum):
+    FOOD_LOG_SAVED = "food_log_saved"
+    WEIGHT_RECORDED = "weight_recorded"
+    PROFILE_UPDATED = "profile_updated"
+
+
+@dataclass(frozen=True)
+class AchievementRule:
+    """
+    Правило достижения: описание, события, после которых его нужно проверять,
+    и сама проверка по прогрессу и профилю пользователя.
+    """
+
+    code: str
+    name: str
+    description: str
+    icon_url: Optional[str]
+    events: frozenset[AchievementEvent]
+    check: Callable[[UserProgress, Optional[UserProfile]], bool]
+
+
+achievement_rules = [
+    AchievementRule(
+        code="start",
+        name="Главное - начать!",
+        description="Ты расчитал КБЖУ в первый раз.",
+        icon_url="/static/achievements/start.png",
+        events=frozenset({AchievementEvent.FOOD_LOG_SAVED}),
+        check=has_started,
+    ),
+    AchievementRule(
+        code="discipline",
+        name="Дисциплина",
+        description="Ты расчитывал КБЖУ 7 дней подряд!",
+        icon_url="/static/achievements/discipline.png",
+        events=frozenset({AchievementEvent.FOOD_LOG_SAVED}),
+        check=has_discipline,
+    ),
+    AchievementRule(
+        code="halfway",
+        name="Половина пути",
+        description="Ты прошел 50% пути к целевому весу.",
+        icon_url="/static/achievements/halfway.png",
+        events=frozenset(
+            {AchievementEvent.WEIGHT_RECORDED, AchievementEvent.PROFILE_UPDATED}
+        ),
+        check=has_halfway,
+    ),
+    AchievementRule(
+        code="winner",
+        name="Победитель",
+        description="Ты достиг целевого веса!",
+        icon_url="/static/achievements/winner.png",
+        events=frozenset(
+            {AchievementEvent.WEIGHT_RECORDED, AchievementEvent.PROFILE_UPDATED}
+        ),
+        check=has_winner,
+    ),
+]
+
+_rules_by_event: dict[AchievementEvent, list[AchievementRule]] = {
+    event: [rule for rule in achievement_rules if event in rule.events]
+    for event in AchievementEvent
+}
+
+
+def get_rules_for_events(events: Iterable[AchievementEvent]) -> list[AchievementRule]:
+    """
+    Возвращает правила, которые реагируют хотя бы на одно из событий.
+    """
+    affected_codes = set()
+    for event in events:
+        affected_codes.update(rule.code for rule in _rules_by_event[event])
+    return [rule for rule in achievement_rules if rule.code in affected_codes]
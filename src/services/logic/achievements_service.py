@@ -1,20 +1,115 @@
+import logging
+from typing import Iterable
+
 from src.services.db.user_repository import get_user_by_telegram_id
-from src.services.db.achievement_repository import get_all_achievements
+from src.services.db.achievement_repository import (
+    get_all_achievements,
+    create_missing_achievements,
+)
 from src.services.db.user_achievement_repository import (
     get_user_achievements,
-    unlock_user_achievement,
+    get_unlocked_achievement_ids,
+    unlock_user_achievements,
 )
-from src.services.logic.achievement_checks import (
-    has_started,
-    has_discipline,
-    has_halfway,
-    has_winner,
+from src.services.db.user_profile_repository import get_user_profiles_by_user_ids
+from src.services.db.user_progress_repository import (
+    get_user_progress,
+    get_user_progress_by_user_ids,
+    rebuild_user_progress,
 )
+from src.services.logic.achievement_rules import (
+    AchievementEvent,
+    achievement_rules,
+    get_rules_for_events,
+)
+
+
+logger = logging.getLogger(__name__)
+
+_achievement_ids_by_code: dict[str, int] = {}
+
+
+async def init_achievements() -> None:
+    """
+    Добавляет достижения из правил в таблицу achievements, если их там ещё нет.
+    """
+    await create_missing_achievements(
+        [
+            {
+                "code": rule.code,
+                "name": rule.name,
+                "description": rule.description,
+                "icon_url": rule.icon_url,
+            }
+            for rule in achievement_rules
+        ]
+    )
+
+
+async def _get_achievement_ids_by_code() -> dict[str, int]:
+    """
+    Соответствие code -> id достижений. Справочник неизменен, читается один раз.
+    """
+    if not _achievement_ids_by_code:
+        for ach in await get_all_achievements():
+            _achievement_ids_by_code[ach.code] = ach.id
+    return _achievement_ids_by_code
+
+
+async def dispatch_achievement_events(
+    user_events: dict[int, Iterable[AchievementEvent]],
+) -> None:
+    """
+    Проверяет достижения для пачки пользователей: для каждого пользователя только
+    правила, реагирующие на его события, и только ещё не полученные достижения.
+    Данные читаются и новые достижения записываются пачками, а не по одному.
+    """
+    try:
+        achievement_ids = await _get_achievement_ids_by_code()
+        unlocked = await get_unlocked_achievement_ids(user_events.keys())
+
+        pending_rules = {}
+        for user_id, events in user_events.items():
+            rules = [
+                rule
+                for rule in get_rules_for_events(events)
+                if rule.code in achievement_ids
+                and achievement_ids[rule.code] not in unlocked[user_id]
+            ]
+            if rules:
+                pending_rules[user_id] = rules
+        if not pending_rules:
+            return
+
+        progress_by_user = await get_user_progress_by_user_ids(pending_rules.keys())
+        profiles_by_user = await get_user_profiles_by_user_ids(pending_rules.keys())
+
+        unlocks = []
+        for user_id, rules in pending_rules.items():
+            progress = progress_by_user.get(user_id)
+            if not progress:
+                progress = await rebuild_user_progress(user_id)
+            profile = profiles_by_user.get(user_id)
+            for rule in rules:
+                if rule.check(progress, profile):
+                    unlocks.append((user_id, achievement_ids[rule.code]))
+
+        await unlock_user_achievements(unlocks)
+    except Exception as e:
+        logger.error(f"Ошибка при проверке достижений: {str(e)}")
+
+
+async def publish_achievement_events(user_id: int, *events: AchievementEvent) -> None:
+    """
+    Проверяет достижения пользователя, затронутые событиями.
+    """
+    await dispatch_achievement_events({user_id: events})
 
 
 async def check_and_unlock_achievements(telegram_id: int):
     """
-    Проверяет получение пользователем достижений и возвращает их список.
+    Возвращает список достижений пользователя. Сами проверки выполняются при
+    записи данных; здесь — только для пользователей, у которых ещё нет прогресса.
     """
     user = await get_user_by_telegram_id(telegram_id)
     if not user:
@@ -22,6 +117,9 @@ async def check_and_unlock_achievements(telegram_id: int):
 
     user_id = user.id
 
+    if not await get_user_progress(user_id):
+        await publish_achievement_events(user_id, *AchievementEvent)
+
     achievements_list = await get_all_achievements()
     user_achievements = await get_user_achievements(user_id)
     unlocked_map = {
@@ -29,18 +127,6 @@ async def check_and_unlock_achievements(telegram_id: int):
         for user_achievement in user_achievements
     }
 
-    checks = {}
-    checks["start"] = await has_started(user_id)
-    checks["discipline"] = await has_discipline(user_id)
-    checks["halfway"] = await has_halfway(user_id)
-    checks["winner"] = await has_winner(user_id)
-
-    for ach in achievements_list:
-        if ach.code in checks and checks[ach.code]:
-            if ach.id not in unlocked_map:
-                user_achievement = await unlock_user_achievement(user_id, ach.id)
-                unlocked_map[ach.id] = user_achievement
-
     result = []
     for ach in achievements_list:
         user_achievement = unlocked_map.get(ach.id)
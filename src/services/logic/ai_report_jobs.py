@@ -0,0 +1,304 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from src.models.background_job import (
+    BackgroundJob,
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_PENDING,
+    JOB_RUNNING,
+)
+from src.models.user_report import UserReport
+from src.settings import settings
+from src.services.db.background_job_repository import (
+    create_background_job,
+    delete_finished_background_jobs,
+    fail_stale_background_jobs,
+    find_background_job,
+    get_background_job,
+    update_background_job,
+)
+from src.services.db.user_report_repository import get_user_report_by_id
+from src.services.logic.ai_report_service import (
+    collect_report_inputs,
+    compute_report_fingerprint,
+    find_reusable_report,
+    generate_and_save_ai_report,
+)
+
+
+logger = logging.getLogger(__name__)
+
+JOB_KIND = "ai_report"
+INTERRUPTED_MESSAGE = "Задача прервана: обработчик был остановлен."
+
+
+@dataclass
+class AIReportJob:
+    """
+    Задача генерации AI-отчета и её текущее состояние.
+    """
+
+    id: str
+    report_type: str
+    status: str
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    report: Optional[UserReport] = None
+
+
+class AIReportJobQueue:
+    """
+    Очередь фоновой генерации AI-отчетов. Состояние задач хранится в таблице
+    background_jobs, поэтому статус доступен из любого воркера, а задачи с
+    одинаковым ключом (пользователь, тип отчета, отпечаток входных данных)
+    объединяются и между процессами: незавершённая задача с ключом может быть
+    только одна (уникальный индекс). Генерацию выполняет процесс, принявший
+    задачу, не больше workers задач одновременно. Если недавно уже был
+    построен отчет по тем же данным, задача сразу завершается этим отчетом.
+    Незавершённая задача, которая не обновлялась дольше stale_seconds
+    (процесс остановлен или упал), считается прерванной.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        job_ttl_seconds: float,
+        stale_seconds: float,
+        poll_interval: float,
+    ):
+        self._workers_count = workers
+        self._job_ttl_seconds = job_ttl_seconds
+        self._stale_seconds = stale_seconds
+        self._poll_interval = poll_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        # Незавершённые задачи этого процесса
+        self._local_jobs: dict[str, asyncio.Event] = {}
+        self._last_prune: Optional[float] = None
+        self.deduplicated = 0
+        self.reused = 0
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker())
+                for _ in range(self._workers_count)
+            ]
+
+    async def _prune(self) -> None:
+        """
+        Удаляет завершённые задачи старше job_ttl_seconds. Не чаще раза в минуту.
+        """
+        now = time.monotonic()
+        if self._last_prune is not None and now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        try:
+            await delete_finished_background_jobs(
+                JOB_KIND, datetime.now() - timedelta(seconds=self._job_ttl_seconds)
+            )
+        except Exception as e:
+            logger.error(f"Ошибка удаления старых задач AI-отчетов: {str(e)}")
+
+    async def _to_job(self, job: BackgroundJob) -> AIReportJob:
+        status, error = job.status, job.error
+        if job.id not in self._local_jobs and job.is_interrupted(self._stale_seconds):
+            status, error = JOB_FAILED, INTERRUPTED_MESSAGE
+        report = await get_user_report_by_id(job.report_id) if job.report_id else None
+        return AIReportJob(
+            id=job.id,
+            report_type=job.params["report_type"],
+            status=status,
+            created_at=job.created_at,
+            finished_at=job.finished_at,
+            error=error,
+            report=report,
+        )
+
+    async def _find_existing(
+        self, user_id: int, dedup_key: str, force: bool
+    ) -> Optional[BackgroundJob]:
+        now = datetime.now()
+        job = await find_background_job(
+            JOB_KIND,
+            user_id,
+            dedup_key,
+            (JOB_PENDING, JOB_RUNNING),
+            now - timedelta(seconds=self._stale_seconds),
+        )
+        if job is None and not force and settings.ai_report_reuse_window_seconds > 0:
+            job = await find_background_job(
+                JOB_KIND,
+                user_id,
+                dedup_key,
+                (JOB_DONE,),
+                now - timedelta(seconds=self._job_ttl_seconds),
+            )
+        return job
+
+    async def submit(
+        self, telegram_id: int, report_type: str, limit: int = 10, force: bool = False
+    ) -> AIReportJob:
+        """
+        Ставит генерацию отчета в очередь и возвращает задачу. Если такая же
+        задача уже есть, возвращает её. С force готовый отчет не переиспользуется
+        и завершённая задача с тем же ключом не возвращается. Ошибки входных
+        данных (ValueError) бросаются сразу.
+        """
+        await self._prune()
+        user, user_profile, user_nutrition, food_logs = await collect_report_inputs(
+            telegram_id, limit
+        )
+        fingerprint = compute_report_fingerprint(
+            report_type, user_profile, user_nutrition, food_logs
+        )
+        dedup_key = f"{report_type}:{fingerprint}"
+
+        existing_job = await self._find_existing(user.id, dedup_key, force)
+        if existing_job:
+            self.deduplicated += 1
+            return await self._to_job(existing_job)
+
+        # Незавершённая задача остановленного процесса занимает ключ в
+        # уникальном индексе, пока её не отметить прерванной
+        await fail_stale_background_jobs(
+            JOB_KIND,
+            user.id,
+            dedup_key,
+            datetime.now() - timedelta(seconds=self._stale_seconds),
+            INTERRUPTED_MESSAGE,
+        )
+        job = await create_background_job(
+            JOB_KIND,
+            user.id,
+            params={"report_type": report_type, "telegram_id": telegram_id},
+            dedup_key=dedup_key,
+        )
+        if job is None:
+            # Такую же задачу только что создал одновременный запрос
+            existing_job = await self._find_existing(user.id, dedup_key, force=True)
+            if existing_job is None:
+                raise RuntimeError("Не удалось создать задачу генерации отчета.")
+            self.deduplicated += 1
+            return await self._to_job(existing_job)
+
+        reusable_report = None
+        if not force:
+            try:
+                reusable_report = await find_reusable_report(
+                    user.id, report_type, fingerprint
+                )
+            except Exception as e:
+                logger.error(f"Ошибка поиска готового AI-отчета: {str(e)}")
+        if reusable_report:
+            self.reused += 1
+            await self._finish(job.id, reusable_report)
+            return await self.get(job.id)
+
+        self._local_jobs[job.id] = asyncio.Event()
+        self._ensure_workers()
+        inputs = (user, user_profile, user_nutrition, food_logs)
+        self._queue.put_nowait((job.id, report_type, fingerprint, inputs))
+        return await self._to_job(job)
+
+    async def get(self, job_id: str) -> Optional[AIReportJob]:
+        job = await get_background_job(job_id, kind=JOB_KIND)
+        return await self._to_job(job) if job else None
+
+    async def wait(self, job: AIReportJob) -> UserReport:
+        """
+        Дожидается завершения задачи и возвращает отчет или бросает
+        RuntimeError с текстом её ошибки. Задачи этого процесса ожидаются
+        без опроса БД, задачи других воркеров — опросом раз в poll_interval.
+        """
+        event = self._local_jobs.get(job.id)
+        if event is not None:
+            await event.wait()
+            job = await self.get(job.id)
+
+        while job is not None and job.status in (JOB_PENDING, JOB_RUNNING):
+            await asyncio.sleep(self._poll_interval)
+            job = await self.get(job.id)
+
+        if job is None:
+            raise RuntimeError("Задача не найдена.")
+
+        if job.status == JOB_FAILED:
+            raise RuntimeError(job.error or "Не удалось сгенерировать отчет.")
+        return job.report
+
+    async def _finish(self, job_id: str, report: UserReport) -> None:
+        await update_background_job(
+            job_id, status=JOB_DONE, report_id=report.id, finished_at=datetime.now()
+        )
+
+    async def _fail(self, job_id: str, error: str) -> None:
+        await update_background_job(
+            job_id, status=JOB_FAILED, error=error, finished_at=datetime.now()
+        )
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, report_type, fingerprint, inputs = await self._queue.get()
+            try:
+                await update_background_job(job_id, status=JOB_RUNNING)
+                report = await generate_and_save_ai_report(
+                    *inputs,
+                    report_type=report_type,
+                    input_fingerprint=fingerprint,
+                )
+                await self._finish(job_id, report)
+            except Exception as e:
+                logger.error(f"Ошибка генерации AI-отчета {job_id}: {str(e)}")
+                try:
+                    await self._fail(job_id, str(e))
+                except Exception as db_error:
+                    logger.error(f"Не удалось сохранить ошибку задачи: {db_error}")
+            finally:
+                event = self._local_jobs.pop(job_id, None)
+                if event is not None:
+                    event.set()
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "local_jobs": len(self._local_jobs),
+            "deduplicated": self.deduplicated,
+            "reused": self.reused,
+        }
+
+    async def aclose(self) -> None:
+        """
+        Останавливает обработчики очереди и отмечает незавершённые задачи этого
+        процесса прерванными. Вызывается при остановке приложения.
+        """
+        local_jobs = list(self._local_jobs.items())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        for job_id, event in local_jobs:
+            try:
+                await self._fail(job_id, INTERRUPTED_MESSAGE)
+            except Exception as e:
+                logger.error(f"Не удалось отметить задачу {job_id} прерванной: {e}")
+            event.set()
+        self._local_jobs = {}
+
+
+ai_report_job_queue = AIReportJobQueue(
+    workers=settings.ai_report_workers,
+    job_ttl_seconds=settings.ai_report_job_ttl_seconds,
+    stale_seconds=settings.background_job_stale_seconds,
+    poll_interval=settings.background_job_poll_seconds,
+)
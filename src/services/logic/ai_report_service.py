@@ -1,14 +1,30 @@
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, Union
+
 from src.models.user_report import UserReport
+from src.settings import settings
 from src.services.db.user_nutrition_repository import get_nutrition_by_profile_id
 from src.services.db.user_repository import get_user_by_telegram_id
 from src.services.db.user_profile_repository import get_user_profile_by_user_id
 from src.services.db.user_food_log_repository import get_last_food_logs
 from src.services.db.user_report_repository import (
+    get_last_user_report_by_fingerprint,
     get_last_user_report_by_type,
     сreate_user_report,
 )
-from src.services.logic.chat_gpt_service import ai_report
+from src.services.logic.chat_gpt_service import ai_report, ai_report_stream
+
 
+logger = logging.getLogger(__name__)
+
+# Конец потока фрагментов отчета в очереди
+_STREAM_END = object()
+# Генерации, продолжающиеся после отключения клиента
+_stream_tasks: set[asyncio.Task] = set()
 
 async def get_last_ai_report(telegram_id: int, report_type: str):
     user = await get_user_by_telegram_id(telegram_id)
@@ -20,11 +36,10 @@ async def get_last_ai_report(telegram_id: int, report_type: str):
     return last_report
 
 
-async def create_ai_report(
-    telegram_id: int, report_type: str, limit: int = 10
-) -> UserReport:
+async def collect_report_inputs(telegram_id: int, limit: int):
     """
-    Сервисная функция, агрегирующая данные, необходимые для составления и генерации отчета.
+    Собирает данные, необходимые для составления отчета: пользователя,
+    его профиль, норму и последние limit приемов пищи.
     """
     user = await get_user_by_telegram_id(telegram_id)
     if not user:
@@ -42,8 +57,75 @@ async def create_ai_report(
     if not food_logs:
         raise ValueError("У пользователя нет логов за последние 7 дней")
 
-    food_logs = food_logs[:limit]
+    return user, user_profile, user_nutrition, food_logs[:limit]
+
+
+def compute_report_fingerprint(
+    report_type: str, user_profile, user_nutrition, food_logs: List
+) -> str:
+    """
+    Хэш входных данных отчета: типа, профиля, нормы и приемов пищи. Одинаковый
+    отпечаток означает, что модель получила бы тот же запрос.
+    """
+    payload = {
+        "report_type": report_type,
+        "profile": [
+            user_profile.height,
+            user_profile.weight,
+            user_profile.age,
+            user_profile.goal.value,
+        ],
+        "nutrition": [
+            user_nutrition.calories,
+            user_nutrition.proteins,
+            user_nutrition.fats,
+            user_nutrition.carbohydrates,
+        ],
+        "food_logs": [
+            [
+                log.id,
+                log.food_name,
+                log.calories,
+                log.proteins,
+                log.fats,
+                log.carbohydrates,
+            ]
+            for log in food_logs
+        ],
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def find_reusable_report(
+    user_id: int, report_type: str, input_fingerprint: str
+) -> Optional[UserReport]:
+    """
+    Возвращает отчет этого типа, построенный по тем же входным данным не
+    раньше ai_report_reuse_window_seconds назад, иначе None.
+    """
+    if settings.ai_report_reuse_window_seconds <= 0:
+        return None
+    created_after = datetime.now() - timedelta(
+        seconds=settings.ai_report_reuse_window_seconds
+    )
+    return await get_last_user_report_by_fingerprint(
+        user_id, report_type, input_fingerprint, created_after
+    )
+
 
+async def generate_and_save_ai_report(
+    user,
+    user_profile,
+    user_nutrition,
+    food_logs: List,
+    report_type: str,
+    input_fingerprint: Optional[str] = None,
+) -> UserReport:
+    """
+    Генерирует отчет по уже собранным данным и сохраняет его вместе с
+    отпечатком входных данных.
+    """
     report_content = await ai_report(
         user_profile=user_profile,
         user_nutrition=user_nutrition,
@@ -53,8 +135,133 @@ async def create_ai_report(
     if not report_content:
         raise ValueError("Не удалось получить ответ от AI")
 
-    saved_report = await сreate_user_report(
-        user_id=user.id, report_type=report_type, content=report_content
+    return await сreate_user_report(
+        user_id=user.id,
+        report_type=report_type,
+        content=report_content,
+        input_fingerprint=input_fingerprint,
     )
 
-    return saved_report
+
+async def create_ai_report(
+    telegram_id: int, report_type: str, limit: int = 10, force: bool = False
+) -> UserReport:
+    """
+    Сервисная функция, агрегирующая данные, необходимые для составления и генерации отчета.
+    Если недавно уже был построен отчет по тем же данным, возвращает его,
+    пока не передан force.
+    """
+    user, user_profile, user_nutrition, food_logs = await collect_report_inputs(
+        telegram_id, limit
+    )
+    input_fingerprint = compute_report_fingerprint(
+        report_type, user_profile, user_nutrition, food_logs
+    )
+
+    if not force:
+        reusable_report = await find_reusable_report(
+            user.id, report_type, input_fingerprint
+        )
+        if reusable_report:
+            return reusable_report
+
+    return await generate_and_save_ai_report(
+        user, user_profile, user_nutrition, food_logs, report_type, input_fingerprint
+    )
+
+
+async def _stream_and_save_report(
+    queue: asyncio.Queue,
+    user,
+    user_profile,
+    user_nutrition,
+    food_logs,
+    report_type: str,
+    input_fingerprint: str,
+) -> UserReport:
+    """
+    Читает поток модели, передавая фрагменты в queue, и сохраняет отчет.
+    Выполняется отдельной задачей, поэтому оплаченный отчет сохраняется и
+    может быть переиспользован, даже если клиент отключился, не дочитав поток.
+    """
+    chunks = []
+    try:
+        async for chunk in ai_report_stream(
+            user_profile=user_profile,
+            user_nutrition=user_nutrition,
+            food_logs=food_logs,
+            report_type=report_type,
+        ):
+            chunks.append(chunk)
+            queue.put_nowait(chunk)
+    finally:
+        queue.put_nowait(_STREAM_END)
+
+    report_content = "".join(chunks).strip()
+    if not report_content:
+        raise ValueError("Не удалось получить ответ от AI")
+
+    return await сreate_user_report(
+        user_id=user.id,
+        report_type=report_type,
+        content=report_content,
+        input_fingerprint=input_fingerprint,
+    )
+
+
+def _log_stream_task_error(task: asyncio.Task) -> None:
+    _stream_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Ошибка потоковой генерации AI-отчета: {task.exception()}")
+
+
+async def stream_ai_report(
+    telegram_id: int, report_type: str, limit: int = 10, force: bool = False
+) -> AsyncIterator[Union[str, UserReport]]:
+    """
+    Потоковый вариант create_ai_report. Проверки данных выполняются сразу
+    (ValueError бросается до начала потока), затем возвращается генератор,
+    который отдаёт фрагменты текста отчета, а после окончания потока сохраняет
+    отчет и последним элементом отдаёт сохранённый UserReport. Генерация
+    доводится до конца и сохраняется и при закрытии генератора (клиент
+    отключился). Готовый отчет по тем же данным отдаётся одним фрагментом.
+    """
+    user, user_profile, user_nutrition, food_logs = await collect_report_inputs(
+        telegram_id, limit
+    )
+    input_fingerprint = compute_report_fingerprint(
+        report_type, user_profile, user_nutrition, food_logs
+    )
+    reusable_report = None
+    if not force:
+        reusable_report = await find_reusable_report(
+            user.id, report_type, input_fingerprint
+        )
+
+    async def generate():
+        if reusable_report:
+            yield reusable_report.content
+            yield reusable_report
+            return
+
+        queue: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(
+            _stream_and_save_report(
+                queue,
+                user,
+                user_profile,
+                user_nutrition,
+                food_logs,
+                report_type,
+                input_fingerprint,
+            )
+        )
+        _stream_tasks.add(task)
+        task.add_done_callback(_log_stream_task_error)
+
+        while (chunk := await queue.get()) is not _STREAM_END:
+            yield chunk
+        # shield: отмена ожидающего клиента не должна прерывать сохранение
+        yield await asyncio.shield(task)
+
+    return generate()
@@ -1,9 +1,86 @@
+import json
+import logging
+import time
 import traceback
 import re
-from typing import List, Optional
+from typing import AsyncIterator, BinaryIO, List, Literal, Optional
 import httpx
+from pydantic import BaseModel, Field, ValidationError, model_validator
 
 from src.settings import settings
+from src.services.http.client_pool import http_client_pool
+
+
+logger = logging.getLogger(__name__)
+
+NOT_RECOGNIZED_MESSAGE = (
+    "Не удалось посчитать калории, исходя из сообщения. Попробуйте написать точнее."
+)
+
+# Какой путь разбора ответа о КБЖУ сработал: JSON, запасной regex или никакой.
+_parse_stats = {"json": 0, "regex": 0, "failed": 0}
+
+
+class NutritionReply(BaseModel):
+    """
+    Ответ модели о КБЖУ одной позиции в режиме структурированного вывода.
+    """
+
+    position: Optional[int] = None
+    recognized: bool = True
+    food: Optional[str] = None
+    calories: Optional[float] = Field(None, ge=0)
+    proteins: Optional[float] = Field(None, ge=0)
+    fats: Optional[float] = Field(None, ge=0)
+    carbohydrates: Optional[float] = Field(None, ge=0)
+    fiber: Optional[float] = Field(None, ge=0)
+    rating: Optional[Literal["🔴", "🟡", "🟢"]] = None
+
+    @model_validator(mode="after")
+    def check_required_fields(self):
+        if self.recognized:
+            missing = [
+                name
+                for name in (
+                    "food",
+                    "calories",
+                    "proteins",
+                    "fats",
+                    "carbohydrates",
+                    "fiber",
+                    "rating",
+                )
+                if getattr(self, name) is None
+            ]
+            if missing:
+                raise ValueError(f"Не заполнены поля: {', '.join(missing)}")
+        return self
+
+    def to_nutrition_info(self) -> dict:
+        return {
+            "food": self.food.strip(),
+            "calories": self.calories,
+            "proteins": self.proteins,
+            "fats": self.fats,
+            "carbohydrates": self.carbohydrates,
+            "fiber": self.fiber,
+            "rating": self.rating,
+        }
+
+
+def _is_proxy_fault(status_code: int) -> bool:
+    """
+    Ответы, которые говорят о проблеме прокси или сервера, а не запроса:
+    отказ в доступе из региона, ошибка авторизации прокси и 5xx.
+    """
+    return status_code in (403, 407) or status_code >= 500
+
+
+def _is_gpt_answer(answer: str) -> bool:
+    """
+    Отличает ответ модели от сообщений об ошибке запроса из call_gpt_api.
+    """
+    return not answer.startswith(("Возникли проблемы", "Запрос не удался"))
 
 
 async def call_gpt_api(
@@ -13,16 +90,21 @@ async def call_gpt_api(
     Выполняет запрос к API OpenAI, возвращает ответ или сообщение об ошибке.
     """
     try:
+        started_at = time.monotonic()
         response = await client.post(url, headers=headers, json=data, timeout=30)
         if response.status_code == 200:
+            http_client_pool.report_success(client, time.monotonic() - started_at)
             result = response.json()
             if "choices" in result and len(result["choices"]) > 0:
                 return result["choices"][0]["message"]["content"].strip()
             else:
                 return f"Запрос не удался, статус: {response.status_code}: {response.text}"
         else:
+            if _is_proxy_fault(response.status_code):
+                http_client_pool.report_failure(client)
             return "Возникли проблемы с языковой моделью."
     except Exception as e:
+        http_client_pool.report_failure(client)
         traceback.print_exc()
         return "Возникли проблемы с языковой моделью."
 
@@ -35,25 +117,31 @@ async def call_whisper_api(
     голосового сообщения,
     """
     try:
+        started_at = time.monotonic()
         response = await client.post(
             url, headers=headers, data=data, files=files, timeout=60
         )
         if response.status_code == 200:
+            http_client_pool.report_success(client, time.monotonic() - started_at)
             result = response.json()
             return result.get("text", "")
         else:
+            if _is_proxy_fault(response.status_code):
+                http_client_pool.report_failure(client)
             print(
                 f"Запрос не удался, статус: {response.status_code}: {response.text}"
             )
             return ""
     except Exception as e:
+        http_client_pool.report_failure(client)
         traceback.print_exc()
         return ""
 
 
-async def convert_speech_to_text(file_path: str) -> str:
+async def convert_speech_to_text(audio: BinaryIO) -> str:
     """
-    Отправляет аудиофайл на распознавание в OpenAI Whisper.
+    Отправляет аудио из буфера в памяти на распознавание в OpenAI Whisper.
+    Перед каждой попыткой буфер перематывается в начало.
     """
     api_key = settings.gpt_token.get_secret_value()
     url = "https://api.openai.com/v1/audio/transcriptions"
@@ -63,24 +151,13 @@ async def convert_speech_to_text(file_path: str) -> str:
     data = {"model": "whisper-1", "language": "ru"}
 
     try:
-        with open(file_path, "rb") as f:
-            files = {"file": ("audio.ogg", f, "audio/ogg")}
-
-            if not settings.proxy_list:
-                async with settings.create_async_client_with_proxy() as client:
-                    transcript = await call_whisper_api(
-                        url, headers, data, files, client
-                    )
+        for client in http_client_pool.get_clients():
+            audio.seek(0)
+            files = {"file": ("audio.ogg", audio, "audio/ogg")}
+            transcript = await call_whisper_api(url, headers, data, files, client)
+            if transcript:
                 return transcript
 
-            for _ in range(len(settings.proxy_list)):
-                async with settings.create_async_client_with_proxy() as client:
-                    transcript = await call_whisper_api(
-                        url, headers, data, files, client
-                    )
-                    if transcript:
-                        return transcript
-
     except Exception as e:
         print(f"Error in convert_speech_to_text: {e}")
         traceback.print_exc()
@@ -88,18 +165,15 @@ async def convert_speech_to_text(file_path: str) -> str:
     return ""
 
 
-async def ai_report(
+def build_ai_report_request(
     user_profile,
     user_nutrition,
     food_logs: List,
     report_type: str,
-) -> str:
+) -> dict:
     """
-    Функция генерации AI-отчета по пользовательским данным.
+    Собирает тело запроса к OpenAI для AI-отчета по пользовательским данным.
     """
-    if not food_logs:
-        return "Нет данных для анализа."
-
     if report_type == "quality-report":
         prompt_header = """
             Ты должен сделать "Анализ качества питания", а именно:
@@ -154,30 +228,102 @@ async def ai_report(
     """
     print(prompt)
 
-    api_key = settings.gpt_token.get_secret_value()
-    url = "https://api.openai.com/v1/chat/completions"
     messages = [
         {"role": "system", "content": "Ты полезный помощник по питанию."},
         {"role": "user", "content": prompt.strip()},
     ]
-    data = {
+    return {
         "model": "chatgpt-4o-latest",
         "messages": messages,
         "max_tokens": 800,
         "temperature": 0.5,
         "n": 1,
     }
+
+
+async def ai_report(
+    user_profile,
+    user_nutrition,
+    food_logs: List,
+    report_type: str,
+) -> str:
+    """
+    Функция генерации AI-отчета по пользовательским данным. Если модель не
+    ответила, возвращает пустую строку, а не сообщение об ошибке, чтобы оно
+    не было сохранено как отчет.
+    """
+    if not food_logs:
+        return "Нет данных для анализа."
+
+    api_key = settings.gpt_token.get_secret_value()
+    url = "https://api.openai.com/v1/chat/completions"
+    data = build_ai_report_request(user_profile, user_nutrition, food_logs, report_type)
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {api_key}",
     }
 
-    async with settings.create_async_client_with_proxy() as client:
-        response_text = await call_gpt_api(url, headers, data, client)
+    response_text = await call_gpt_api(
+        url, headers, data, http_client_pool.get_client()
+    )
+    if not _is_gpt_answer(response_text):
+        logger.error(f"AI-отчет не получен: {response_text}")
+        return ""
 
     return response_text
 
 
+async def ai_report_stream(
+    user_profile,
+    user_nutrition,
+    food_logs: List,
+    report_type: str,
+) -> AsyncIterator[str]:
+    """
+    Потоковый вариант ai_report: отдаёт фрагменты текста отчета по мере того,
+    как их генерирует модель. При ошибке запроса бросает RuntimeError.
+    """
+    api_key = settings.gpt_token.get_secret_value()
+    url = "https://api.openai.com/v1/chat/completions"
+    data = build_ai_report_request(user_profile, user_nutrition, food_logs, report_type)
+    data["stream"] = True
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}",
+    }
+
+    client = http_client_pool.get_client()
+    started_at = time.monotonic()
+    try:
+        async with client.stream(
+            "POST", url, headers=headers, json=data, timeout=60
+        ) as response:
+            latency = time.monotonic() - started_at
+            if response.status_code != 200:
+                if _is_proxy_fault(response.status_code):
+                    http_client_pool.report_failure(client)
+                await response.aread()
+                raise RuntimeError(
+                    f"Запрос не удался, статус: {response.status_code}: {response.text}"
+                )
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:") :].strip()
+                if payload == "[DONE]":
+                    break
+                chunk = json.loads(payload)
+                if not chunk.get("choices"):
+                    continue
+                content = chunk["choices"][0].get("delta", {}).get("content")
+                if content:
+                    yield content
+    except httpx.HTTPError:
+        http_client_pool.report_failure(client)
+        raise
+    http_client_pool.report_success(client, latency)
+
+
 async def retrieve_nutrition_data(
     product_name: str, image_base64: Optional[str] = None
 ) -> str:
@@ -185,24 +331,31 @@ async def retrieve_nutrition_data(
     Отправляет запрос на расчет калорий и макронутриентов приема пищи.
     """
 
-    api_key = settings.gpt_token.get_secret_value()
-    url = "https://api.openai.com/v1/chat/completions"
-
     if image_base64:
         product_name = "прикрепленная фотография"
 
     prompt = f"""
         Представь, что ты - профессиональный диетолог, и тебе нужно описать клиенту характеристики пищи.
-        Свою еду он описывает так — {product_name}. Опиши точное количество калорий, белков, жиров, углеводов и клетчатки в данном продукте в строгом формате:
+        Свою еду он описывает так — {product_name}. Опиши точное количество калорий, белков, жиров, углеводов и клетчатки в данном продукте.
+        Не пиши диапазоны в калориях, белках, жирах, углеводах и клетчатке, если сомневаешься — пиши среднее значение.
+    """
+    if settings.gpt_structured_output:
+        prompt += """
+        Ответь строго одним JSON-объектом без пояснений и разметки:
+        {"recognized": true, "food": "<то, что описал пользователь, или, если описание не точное (например, нет граммовки), дополненное, если это уместно>", "calories": <число ккал>, "proteins": <число г>, "fats": <число г>, "carbohydrates": <число г>, "fiber": <число г>, "rating": "<🔴, 🟡 или 🟢, если считаешь еду вредной, обычной или полезной соответственно>"}
+        Если сообщение не представляется возможным распознать как еду, ответь строго: {"recognized": false}
+        """
+    else:
+        prompt += """
+        Ответь в строгом формате:
         - Еда: то, что описал пользователь, или, если описание не точное (например, нет граммовки, то дополненное, если это уместно)
         - Калории: <число> ккал
         - Белки: <число> г., Жиры: <число> г., Углеводы: <число> г.
         - Клетчатка: <число> г.
-        Не пиши диапазоны в калориях, белках, жирах, углеводах и клетчатке, если сомневаешься — пиши среднее значение.
         В конце добавь строго одну из таких строк: "Рейтинг: 🔴" или "Рейтинг: 🟡" или "Рейтинг: 🟢", если считаешь еду вредной, обычной или полезной соответственно.
         Если сообщение не представляется возможным распознать как еду, то напиши строго:
         "Не удалось посчитать калории, исходя из сообщения. Попробуйте написать точнее."
-    """
+        """
 
     if image_base64:
         messages = [
@@ -230,25 +383,88 @@ async def retrieve_nutrition_data(
     data = {
         "model": "chatgpt-4o-latest",
         "messages": messages,
-        "max_tokens": 150,
+        "max_tokens": 200 if settings.gpt_structured_output else 150,
         "temperature": 0.5,
         "n": 1,
     }
+    if settings.gpt_structured_output:
+        data["response_format"] = {"type": "json_object"}
+    return await send_nutrition_request(data)
+
+
+async def retrieve_nutrition_data_batch(product_names: List[str]) -> str:
+    """
+    Отправляет один запрос на расчет калорий и макронутриентов для нескольких
+    приемов пищи. Ответ — JSON-объект со списком items или, без режима
+    структурированного вывода, блоки по позициям, разделённые строкой "###".
+    """
+    items_str = "\n".join(
+        f"{idx}) {product_name}"
+        for idx, product_name in enumerate(product_names, start=1)
+    )
+    prompt = f"""
+        Представь, что ты - профессиональный диетолог, и тебе нужно описать клиенту характеристики пищи.
+        Клиент перечислил несколько позиций своей еды:
+        {items_str}
+    """
+    if settings.gpt_structured_output:
+        prompt += """
+        Для каждой позиции опиши точное количество калорий, белков, жиров, углеводов и клетчатки.
+        Не пиши диапазоны, если сомневаешься — пиши среднее значение.
+        Ответь строго одним JSON-объектом без пояснений и разметки:
+        {"items": [{"position": <номер позиции>, "recognized": true, "food": "<то, что описал пользователь, или, если описание не точное (например, нет граммовки), дополненное, если это уместно>", "calories": <число ккал>, "proteins": <число г>, "fats": <число г>, "carbohydrates": <число г>, "fiber": <число г>, "rating": "<🔴, 🟡 или 🟢, если считаешь еду вредной, обычной или полезной соответственно>"}]}
+        Если позицию не представляется возможным распознать как еду, укажи для нее строго: {"position": <номер позиции>, "recognized": false}
+        """
+    else:
+        prompt += """
+        Для каждой позиции опиши точное количество калорий, белков, жиров, углеводов и клетчатки в строгом формате, разделяя позиции строкой "###":
+        - Позиция: <номер позиции>
+        - Еда: то, что описал пользователь, или, если описание не точное (например, нет граммовки, то дополненное, если это уместно)
+        - Калории: <число> ккал
+        - Белки: <число> г., Жиры: <число> г., Углеводы: <число> г.
+        - Клетчатка: <число> г.
+        - Рейтинг: строго одно из 🔴, 🟡 или 🟢, если считаешь еду вредной, обычной или полезной соответственно.
+        Не пиши диапазоны в калориях, белках, жирах, углеводах и клетчатке, если сомневаешься — пиши среднее значение.
+        Если позицию не представляется возможным распознать как еду, то напиши для нее строго:
+        "Позиция: <номер позиции>
+        Не удалось посчитать калории."
+        """
+    messages = [
+        {"role": "system", "content": "Ты полезный помощник по питанию."},
+        {"role": "user", "content": prompt.strip()},
+    ]
+    data = {
+        "model": "chatgpt-4o-latest",
+        "messages": messages,
+        "max_tokens": (200 if settings.gpt_structured_output else 150)
+        * len(product_names),
+        "temperature": 0.5,
+        "n": 1,
+    }
+    if settings.gpt_structured_output:
+        data["response_format"] = {"type": "json_object"}
+    return await send_nutrition_request(data)
+
+
+async def send_nutrition_request(data: dict) -> str:
+    """
+    Отправляет запрос расчета КБЖУ через лучший прокси. При ошибке повторяет его
+    через другие прокси, а при долгом ожидании дублирует через следующий.
+    """
+    api_key = settings.gpt_token.get_secret_value()
+    url = "https://api.openai.com/v1/chat/completions"
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {api_key}",
     }
 
-    if not settings.proxy_list:
-        async with settings.create_async_client_with_proxy() as client:
-            return await call_gpt_api(url, headers, data, client)
-    else:
-        for _ in range(len(settings.proxy_list)):
-            async with settings.create_async_client_with_proxy() as client:
-                answer = await call_gpt_api(url, headers, data, client)
-                if not answer.startswith("Не удалось"):
-                    return answer
+    answer = await http_client_pool.request_with_hedging(
+        lambda client: call_gpt_api(url, headers, data, client),
+        is_success=_is_gpt_answer,
+    )
+    if not answer or not _is_gpt_answer(answer):
         return "Не удалось посчитать калории, исходя из сообщения."
+    return answer
 
 
 async def extract_nutrition_details(response_text: str):
@@ -320,3 +536,114 @@ async def extract_nutrition_details(response_text: str):
 
     except Exception as e:
         return None, f"Ошибка при разборе данных: {str(e)}"
+
+
+async def extract_nutrition_details_batch(
+    response_text: str, items_count: int
+) -> List[tuple[Optional[dict], Optional[str]]]:
+    """
+    Парсит ответ на пакетный запрос: возвращает для каждой из items_count позиций
+    пару (nutrition_info, error), как extract_nutrition_details.
+    """
+    results = [
+        (None, "Не удалось посчитать калории для этой позиции.")
+    ] * items_count
+    for block in response_text.split("###"):
+        position_match = re.search(r"Позиция:\s*(\d+)", block)
+        if not position_match:
+            continue
+        position = int(position_match.group(1))
+        if 1 <= position <= items_count:
+            results[position - 1] = await extract_nutrition_details(block)
+    return results
+
+
+def _load_json_payload(response_text: str):
+    """
+    Достаёт JSON из ответа модели (в том числе обёрнутый в ```json ... ```).
+    Возвращает None, если ответ не является JSON.
+    """
+    text = response_text.strip()
+    fence_match = re.match(r"^```(?:json)?\s*(.*?)\s*```$", text, re.DOTALL)
+    if fence_match:
+        text = fence_match.group(1)
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def _reply_to_result(reply: NutritionReply) -> tuple[Optional[dict], Optional[str]]:
+    if not reply.recognized:
+        return None, NOT_RECOGNIZED_MESSAGE
+    return reply.to_nutrition_info(), None
+
+
+async def parse_nutrition_response(
+    response_text: str,
+) -> tuple[Optional[dict], Optional[str]]:
+    """
+    Разбирает ответ о КБЖУ: сначала как JSON по схеме NutritionReply, при
+    неудаче — запасным regex-парсером extract_nutrition_details.
+    """
+    payload = _load_json_payload(response_text)
+    if isinstance(payload, dict):
+        try:
+            reply = NutritionReply.model_validate(payload)
+        except ValidationError as e:
+            logger.warning(f"Ответ о КБЖУ не прошел проверку схемы: {str(e)}")
+        else:
+            _parse_stats["json"] += 1
+            return _reply_to_result(reply)
+
+    nutrition_info, error = await extract_nutrition_details(response_text)
+    if error:
+        _parse_stats["failed"] += 1
+        if payload is not None:
+            # Сырой JSON пользователю не показываем
+            return None, NOT_RECOGNIZED_MESSAGE
+        return None, error
+
+    _parse_stats["regex"] += 1
+    return nutrition_info, None
+
+
+async def parse_nutrition_response_batch(
+    response_text: str, items_count: int
+) -> List[tuple[Optional[dict], Optional[str]]]:
+    """
+    Пакетный вариант parse_nutrition_response: JSON со списком items или,
+    если ответ не JSON, запасной разбор extract_nutrition_details_batch.
+    """
+    payload = _load_json_payload(response_text)
+    if isinstance(payload, dict) and isinstance(payload.get("items"), list):
+        results = [
+            (None, "Не удалось посчитать калории для этой позиции.")
+        ] * items_count
+        for idx, item in enumerate(payload["items"]):
+            try:
+                reply = NutritionReply.model_validate(item)
+            except ValidationError as e:
+                logger.warning(
+                    f"Позиция ответа о КБЖУ не прошла проверку схемы: {str(e)}"
+                )
+                continue
+            position = reply.position or idx + 1
+            if 1 <= position <= items_count:
+                results[position - 1] = _reply_to_result(reply)
+        for nutrition_info, error in results:
+            _parse_stats["json" if nutrition_info else "failed"] += 1
+        return results
+
+    results = await extract_nutrition_details_batch(response_text, items_count)
+    for nutrition_info, error in results:
+        _parse_stats["regex" if nutrition_info else "failed"] += 1
+    return results
+
+
+def get_nutrition_parse_stats() -> dict:
+    """
+    Сколько ответов о КБЖУ разобрано как JSON, запасным regex-парсером и не
+    разобрано вовсе.
+    """
+    return dict(_parse_stats)
@@ -1,6 +1,8 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from src.services.logic.user_food_log_service import get_food_logs_by_telegram_user_id
+from src.services.logic.user_food_log_service import (
+    get_daily_intake_in_range_by_telegram_user_id,
+)
 
 
 async def get_and_calculate_daily_intake(
@@ -10,9 +12,30 @@ async def get_and_calculate_daily_intake(
     Получает и считает сумму калорий и макронутриентов за день, возвращает вместе
     со списком приемов пищи.
     """
-    food_logs = await get_food_logs_by_telegram_user_id(telegram_user_id, day_start)
-    result = _calculate_daily_intake(food_logs)
-    result["food_logs"] = food_logs
+    return (await get_and_calculate_periodic_intake(telegram_user_id, day_start, 1))[0]
+
+
+async def get_and_calculate_periodic_intake(
+    telegram_user_id: int, first_day_start: datetime, days: int
+) -> list[dict]:
+    """
+    Получает суммы калорий и макронутриентов по каждому дню периода одним запросом.
+    Возвращает список словарей (по возрастанию даты) с ключом "date", суммами и
+    списком приемов пищи. Дни без записей возвращаются с нулевыми суммами.
+    """
+    range_end = first_day_start + timedelta(days=days)
+    intake_by_day = await get_daily_intake_in_range_by_telegram_user_id(
+        telegram_user_id, first_day_start, range_end
+    )
+
+    result = []
+    for i in range(days):
+        day = (first_day_start + timedelta(days=i)).date()
+        day_intake = intake_by_day.get(day) or {
+            **_calculate_daily_intake([]),
+            "food_logs": [],
+        }
+        result.append({"date": day, **day_intake})
     return result
 
 
@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import logging
+from typing import Optional
+
+from src.services.db.data_migration_repository import (
+    is_data_migration_applied,
+    mark_data_migration_applied,
+)
+from src.services.db.user_daily_totals_repository import (
+    rebuild_daily_totals,
+    find_daily_totals_mismatches,
+)
+from src.services.db.user_progress_repository import rebuild_all_user_progress
+
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_MIGRATION = "user_daily_totals_backfill"
+
+
+async def backfill_daily_totals(user_id: Optional[int] = None) -> int:
+    """
+    Заполняет user_daily_totals по сохранённым приемам пищи.
+    """
+    days_count = await rebuild_daily_totals(user_id)
+    logger.info(f"Пересчитано дней: {days_count}")
+    return days_count
+
+
+async def ensure_daily_totals_backfilled() -> None:
+    """
+    Один раз заполняет user_daily_totals по сохранённым приемам пищи и
+    пересчитывает по ним прогресс. Вызывается при инициализации БД, чтобы
+    суммы и серии дней не зависели от ручного запуска backfill.
+    """
+    if await is_data_migration_applied(BACKFILL_MIGRATION):
+        return
+
+    logger.info("Заполняем суммы КБЖУ по дням...")
+    await backfill_daily_totals()
+    users_count = await rebuild_all_user_progress()
+    logger.info(f"Пересчитан прогресс пользователей: {users_count}")
+    await mark_data_migration_applied(BACKFILL_MIGRATION)
+
+
+async def check_daily_totals(user_id: Optional[int] = None) -> list[dict]:
+    """
+    Проверяет, что user_daily_totals совпадает с суммами по приемам пищи.
+    """
+    mismatches = await find_daily_totals_mismatches(user_id)
+    for mismatch in mismatches:
+        logger.warning(
+            f"Расхождение сумм: user_id={mismatch['user_id']}, "
+            f"дата={mismatch['date']}, поля={mismatch['fields']}"
+        )
+    logger.info(f"Найдено расхождений: {len(mismatches)}")
+    return mismatches
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Заполнение и проверка сумм КБЖУ по дням (user_daily_totals)."
+    )
+    parser.add_argument("command", choices=["backfill", "check"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "backfill":
+        await backfill_daily_totals(args.user_id)
+    else:
+        mismatches = await check_daily_totals(args.user_id)
+        if mismatches:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
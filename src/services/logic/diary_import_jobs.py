@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import AsyncIterator, BinaryIO, Optional
+
+from src.models.background_job import BackgroundJob, JOB_DONE, JOB_FAILED, JOB_RUNNING
+from src.settings import settings
+from src.services.db.background_job_repository import (
+    create_background_job,
+    delete_finished_background_jobs,
+    get_background_job,
+    update_background_job,
+)
+from src.services.db.user_repository import get_user_by_telegram_id
+from src.services.logic.diary_import_service import (
+    ImportFormat,
+    ImportResult,
+    import_diary_from_stream,
+    iter_file_chunks,
+)
+
+
+logger = logging.getLogger(__name__)
+
+JOB_KIND = "diary_import"
+INTERRUPTED_MESSAGE = "Импорт прерван: обработчик был остановлен. Запустите его заново."
+FAILED_MESSAGE = "Не удалось импортировать дневник."
+
+
+@dataclass
+class DiaryImportJob:
+    """
+    Задача импорта дневника и её текущее состояние. result — итог импорта,
+    пока задача выполняется — итог по уже записанным пачкам.
+    """
+
+    id: str
+    status: str
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    result: Optional[dict] = None
+
+
+class DiaryImportJobRunner:
+    """
+    Фоновый импорт дневника. Тело запроса сначала сохраняется во временный
+    файл, затем импорт выполняется в фоне процесса, принявшего файл (не больше
+    workers импортов одновременно), а клиент опрашивает статус задачи.
+    Состояние хранится в таблице background_jobs, поэтому статус доступен из
+    любого воркера; после каждой пачки в задачу записывается текущий итог.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_bytes: int,
+        job_ttl_seconds: float,
+        stale_seconds: float,
+    ):
+        self._max_bytes = max_bytes
+        self._job_ttl_seconds = job_ttl_seconds
+        self._stale_seconds = stale_seconds
+        self._semaphore = asyncio.Semaphore(workers)
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._last_prune: Optional[float] = None
+
+    async def _prune(self) -> None:
+        """
+        Удаляет завершённые задачи старше job_ttl_seconds. Не чаще раза в минуту.
+        """
+        now = time.monotonic()
+        if self._last_prune is not None and now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        try:
+            await delete_finished_background_jobs(
+                JOB_KIND, datetime.now() - timedelta(seconds=self._job_ttl_seconds)
+            )
+        except Exception as e:
+            logger.error(f"Ошибка удаления старых задач импорта: {str(e)}")
+
+    def _to_job(self, job: BackgroundJob) -> DiaryImportJob:
+        status, error = job.status, job.error
+        if job.id not in self._tasks and job.is_interrupted(self._stale_seconds):
+            status, error = JOB_FAILED, INTERRUPTED_MESSAGE
+        return DiaryImportJob(
+            id=job.id,
+            status=status,
+            created_at=job.created_at,
+            finished_at=job.finished_at,
+            error=error,
+            result=job.result,
+        )
+
+    async def _spool(self, chunks: AsyncIterator[bytes]) -> BinaryIO:
+        """
+        Сохраняет поток во временный файл, чтобы не держать его в памяти и не
+        занимать HTTP-запрос на всё время импорта.
+        """
+        file = tempfile.TemporaryFile()
+        size = 0
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > self._max_bytes:
+                    raise ValueError(
+                        f"Файл больше {self._max_bytes // (1024 * 1024)} МБ"
+                    )
+                await asyncio.to_thread(file.write, chunk)
+            file.seek(0)
+        except BaseException:
+            file.close()
+            raise
+        return file
+
+    async def submit(
+        self, telegram_id: int, chunks: AsyncIterator[bytes], file_format: ImportFormat
+    ) -> DiaryImportJob:
+        """
+        Принимает файл и запускает его импорт в фоне. Возвращает задачу, статус
+        которой можно получить через get. Ошибки входных данных (ValueError)
+        бросаются сразу.
+        """
+        await self._prune()
+        user = await get_user_by_telegram_id(telegram_id)
+        if not user:
+            raise ValueError("Пользователь не найден.")
+
+        file = await self._spool(chunks)
+        try:
+            job = await create_background_job(
+                JOB_KIND, user.id, params={"file_format": file_format}
+            )
+        except BaseException:
+            file.close()
+            raise
+
+        self._tasks[job.id] = asyncio.create_task(
+            self._run(job.id, telegram_id, file, file_format)
+        )
+        return self._to_job(job)
+
+    async def get(self, job_id: str) -> Optional[DiaryImportJob]:
+        job = await get_background_job(job_id, kind=JOB_KIND)
+        return self._to_job(job) if job else None
+
+    async def _run(
+        self, job_id: str, telegram_id: int, file: BinaryIO, file_format: ImportFormat
+    ) -> None:
+        async def save_progress(result: ImportResult) -> None:
+            await update_background_job(job_id, result=asdict(result))
+
+        try:
+            async with self._semaphore:
+                await update_background_job(job_id, status=JOB_RUNNING)
+                result = await import_diary_from_stream(
+                    telegram_id,
+                    iter_file_chunks(file),
+                    file_format,
+                    on_batch=save_progress,
+                )
+                await update_background_job(
+                    job_id,
+                    status=JOB_DONE,
+                    result=asdict(result),
+                    finished_at=datetime.now(),
+                )
+        except Exception as e:
+            logger.exception(f"Ошибка импорта дневника {job_id}: {str(e)}")
+            error = str(e) if isinstance(e, ValueError) else FAILED_MESSAGE
+            await self._fail(job_id, error)
+        finally:
+            file.close()
+            self._tasks.pop(job_id, None)
+
+    async def _fail(self, job_id: str, error: str) -> None:
+        try:
+            await update_background_job(
+                job_id, status=JOB_FAILED, error=error, finished_at=datetime.now()
+            )
+        except Exception as e:
+            logger.error(f"Не удалось сохранить ошибку задачи {job_id}: {str(e)}")
+
+    async def aclose(self) -> None:
+        """
+        Прерывает незавершённые импорты этого процесса и отмечает их задачи
+        прерванными. Вызывается при остановке приложения.
+        """
+        tasks = dict(self._tasks)
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        for job_id in tasks:
+            await self._fail(job_id, INTERRUPTED_MESSAGE)
+
+
+diary_import_job_runner = DiaryImportJobRunner(
+    workers=settings.import_workers,
+    max_bytes=settings.import_max_bytes,
+    job_ttl_seconds=settings.import_job_ttl_seconds,
+    stale_seconds=settings.background_job_stale_seconds,
+)
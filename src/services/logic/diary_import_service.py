@@ -0,0 +1,415 @@
+import argparse
+import asyncio
+import codecs
+import csv
+import io
+import json
+import logging
+import math
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, BinaryIO, Callable, Literal, Optional
+
+from src.settings import settings
+from src.services.db.user_repository import get_user_by_telegram_id
+from src.services.db.user_food_log_repository import bulk_create_food_logs
+from src.services.db.user_weight_history_repository import bulk_create_weight_records
+from src.services.http.client_pool import http_client_pool
+from src.services.logic.achievement_rules import AchievementEvent
+from src.services.logic.achievements_service import publish_achievement_events
+from src.services.logic.nutrition_cache_service import get_nutrition_info_batch
+
+
+logger = logging.getLogger(__name__)
+
+ImportFormat = Literal["csv", "json"]
+
+NUTRITION_FIELDS = ("calories", "proteins", "fats", "carbohydrates")
+
+_DATE_FORMATS = ("%d.%m.%Y %H:%M", "%d.%m.%Y")
+_MAX_ERRORS = 20
+_MAX_RECORD_CHARS = 1024 * 1024
+
+
+@dataclass
+class ImportResult:
+    """
+    Итог импорта дневника.
+    """
+
+    food_logs_created: int = 0
+    weight_records_created: int = 0
+    recognized: int = 0
+    skipped: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    def add_error(self, message: str) -> None:
+        self.skipped += 1
+        if len(self.errors) < _MAX_ERRORS:
+            self.errors.append(message)
+
+
+async def _iter_text(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Декодирует поток байт в UTF-8 по кускам (в том числе с BOM).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _complete_records_end(text: str) -> int:
+    """
+    Позиция после последнего перевода строки вне кавычек: всё до неё —
+    целые строки CSV, включая поля с переводами строк внутри кавычек.
+    """
+    if '"' not in text:
+        return text.rfind("\n") + 1
+
+    in_quotes = False
+    end = 0
+    for idx, char in enumerate(text):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == "\n" and not in_quotes:
+            end = idx + 1
+    return end
+
+
+async def _iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[dict]:
+    """
+    Построчно разбирает CSV с заголовком, не загружая файл целиком.
+    """
+    header = None
+    pending = ""
+
+    def parse(block: str):
+        nonlocal header
+        for values in csv.reader(io.StringIO(block)):
+            if not any(value.strip() for value in values):
+                continue
+            if header is None:
+                header = [name.strip().lower() for name in values]
+                continue
+            yield dict(zip(header, values))
+
+    async for text in _iter_text(chunks):
+        pending += text
+        end = _complete_records_end(pending)
+        if end:
+            block, pending = pending[:end], pending[end:]
+            for record in parse(block):
+                yield record
+        if len(pending) > _MAX_RECORD_CHARS:
+            raise ValueError("Слишком большая запись CSV или незакрытая кавычка")
+
+    if pending:
+        for record in parse(pending):
+            yield record
+
+
+def _drain_json(
+    decoder: json.JSONDecoder, buffer: str, final: bool
+) -> tuple[str, list[dict]]:
+    """
+    Достаёт из буфера все полностью полученные объекты. Подходит и для
+    JSON-массива объектов, и для JSON Lines. Возвращает остаток буфера.
+    """
+    records = []
+    pos = 0
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n[],":
+            pos += 1
+        if pos == len(buffer):
+            break
+        if buffer[pos] != "{":
+            raise ValueError("Ожидался JSON-объект записи")
+        try:
+            record, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if final:
+                raise ValueError(f"Некорректный JSON: {e.msg}")
+            break
+        records.append(record)
+    return buffer[pos:], records
+
+
+async def _iter_json_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[dict]:
+    """
+    Потоково разбирает JSON-массив объектов или JSON Lines.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    async for text in _iter_text(chunks):
+        buffer, records = _drain_json(decoder, buffer + text, final=False)
+        for record in records:
+            yield record
+        if len(buffer) > _MAX_RECORD_CHARS:
+            raise ValueError("Слишком большая запись JSON")
+
+    _, records = _drain_json(decoder, buffer, final=True)
+    for record in records:
+        yield record
+
+
+def _get_value(record: dict, *names: str) -> Optional[str]:
+    for name in names:
+        value = record.get(name)
+        if value is not None and str(value).strip() != "":
+            return str(value).strip()
+    return None
+
+
+def _parse_number(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    number = float(value.replace(",", "."))
+    if not math.isfinite(number) or number < 0:
+        raise ValueError(f"некорректное число {value}")
+    return number
+
+
+def _parse_date(value: Optional[str]) -> datetime:
+    if value is None:
+        raise ValueError("не указана дата")
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    else:
+        # Даты в БД хранятся без часового пояса, в местном времени
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone().replace(tzinfo=None)
+        return parsed
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    raise ValueError(f"неизвестный формат даты {value}")
+
+
+def _import_entry_uuid(
+    user_id: int,
+    record_number: int,
+    date_added: datetime,
+    food_name: str,
+    amount: int,
+) -> str:
+    """
+    entry_uuid импортированного приема пищи зависит только от его данных и
+    номера записи в файле, поэтому при повторном импорте того же файла запись
+    не дублируется, а одинаковые приемы пищи за день (например, две чашки
+    кофе при датах без времени) сохраняются оба.
+    """
+    return str(
+        uuid.uuid5(
+            uuid.NAMESPACE_URL,
+            f"diary-import:{user_id}:{record_number}:{date_added.isoformat()}:"
+            f"{food_name}:{amount}",
+        )
+    )
+
+
+def _parse_record(
+    record: dict, user_id: int, record_number: int
+) -> tuple[Optional[dict], Optional[dict]]:
+    """
+    Сопоставляет запись файла с номером record_number колонкам UserFoodLog и
+    UserWeightHistory.
+    Возвращает (прием пищи, запись веса), любой из них может быть None.
+    КБЖУ, которых нет в записи, остаются None и распознаются позже.
+    """
+    date_added = _parse_date(_get_value(record, "date_added", "date"))
+
+    food_row = None
+    food_name = _get_value(record, "food_name", "food")
+    if food_name:
+        amount = _parse_number(_get_value(record, "amount"))
+        amount = int(amount) if amount is not None else 100
+        nutrition = {
+            name: _parse_number(_get_value(record, name)) for name in NUTRITION_FIELDS
+        }
+        food_row = {
+            "user_id": user_id,
+            "food_name": food_name,
+            **nutrition,
+            "fiber": _parse_number(_get_value(record, "fiber")),
+            "amount": amount,
+            "date_added": date_added,
+            "is_saved": True,
+            "rating": None,
+            "entry_uuid": _import_entry_uuid(
+                user_id, record_number, date_added, food_name, amount
+            ),
+        }
+
+    weight_row = None
+    weight = _parse_number(_get_value(record, "weight"))
+    if weight is not None:
+        weight_row = {"user_id": user_id, "weight": weight, "date_added": date_added}
+
+    return food_row, weight_row
+
+
+async def _resolve_missing_nutrition(
+    telegram_id: int, food_rows: list[dict], result: ImportResult
+) -> list[dict]:
+    """
+    Заполняет недостающие КБЖУ через кэш и пакетные запросы к языковой модели.
+    Возвращает приемы пищи, для которых КБЖУ известны.
+    """
+    missing = [
+        row for row in food_rows if any(row[name] is None for name in NUTRITION_FIELDS)
+    ]
+    failed = set()
+    batch_size = settings.recognition_batch_max_items
+    for start in range(0, len(missing), batch_size):
+        chunk = missing[start : start + batch_size]
+        recognized = await get_nutrition_info_batch(
+            [row["food_name"] for row in chunk], user_id=telegram_id
+        )
+        for row, (nutrition_info, error) in zip(chunk, recognized):
+            if error:
+                failed.add(id(row))
+                result.add_error(f"{row['food_name']}: {error}")
+                continue
+            for name in NUTRITION_FIELDS:
+                if row[name] is None:
+                    row[name] = nutrition_info[name]
+            if row["fiber"] is None:
+                row["fiber"] = nutrition_info.get("fiber")
+            row["rating"] = nutrition_info.get("rating")
+            result.recognized += 1
+
+    return [row for row in food_rows if id(row) not in failed]
+
+
+async def _write_batch(
+    telegram_id: int,
+    food_rows: list[dict],
+    weight_rows: list[dict],
+    result: ImportResult,
+) -> None:
+    food_rows = await _resolve_missing_nutrition(telegram_id, food_rows, result)
+    result.food_logs_created += len(
+        await bulk_create_food_logs(food_rows, skip_existing=True)
+    )
+    result.weight_records_created += len(
+        await bulk_create_weight_records(weight_rows, skip_existing=True)
+    )
+
+
+async def import_diary_from_stream(
+    telegram_id: int,
+    chunks: AsyncIterator[bytes],
+    file_format: ImportFormat,
+    on_batch: Optional[Callable[[ImportResult], Awaitable[None]]] = None,
+) -> ImportResult:
+    """
+    Импортирует историю питания и веса из CSV или JSON (массив объектов или
+    JSON Lines), читая поток по кускам. Записи пишутся пачками по
+    import_batch_size в отдельных транзакциях, поэтому память не зависит от
+    размера файла. Колонки: date_added (или date), food_name (или food),
+    calories, proteins, fats, carbohydrates, fiber, amount, weight.
+    Уже импортированные записи пропускаются, поэтому прерванный импорт можно
+    просто запустить заново. on_batch вызывается с текущим итогом после
+    записи каждой пачки.
+    """
+    user = await get_user_by_telegram_id(telegram_id)
+    if not user:
+        raise ValueError("Пользователь не найден.")
+
+    records = (
+        _iter_csv_records(chunks)
+        if file_format == "csv"
+        else _iter_json_records(chunks)
+    )
+    result = ImportResult()
+    food_rows: list[dict] = []
+    weight_rows: list[dict] = []
+    record_number = 0
+
+    async for record in records:
+        record_number += 1
+        try:
+            food_row, weight_row = _parse_record(record, user.id, record_number)
+        except (ValueError, TypeError, AttributeError, OverflowError) as e:
+            result.add_error(f"Запись {record_number}: {str(e)}")
+            continue
+        if food_row is None and weight_row is None:
+            result.add_error(f"Запись {record_number}: нет ни еды, ни веса")
+            continue
+
+        if food_row:
+            food_rows.append(food_row)
+        if weight_row:
+            weight_rows.append(weight_row)
+        if len(food_rows) + len(weight_rows) >= settings.import_batch_size:
+            await _write_batch(telegram_id, food_rows, weight_rows, result)
+            food_rows, weight_rows = [], []
+            if on_batch:
+                await on_batch(result)
+
+    await _write_batch(telegram_id, food_rows, weight_rows, result)
+
+    events = []
+    if result.food_logs_created:
+        events.append(AchievementEvent.FOOD_LOG_SAVED)
+    if result.weight_records_created:
+        events.append(AchievementEvent.WEIGHT_RECORDED)
+    if events:
+        await publish_achievement_events(user.id, *events)
+
+    logger.info(
+        f"Импорт дневника {telegram_id}: приемов пищи {result.food_logs_created}, "
+        f"записей веса {result.weight_records_created}, "
+        f"распознано {result.recognized}, пропущено {result.skipped}"
+    )
+    return result
+
+
+async def iter_file_chunks(
+    file: BinaryIO, chunk_size: int = 64 * 1024
+) -> AsyncIterator[bytes]:
+    """
+    Читает открытый файл кусками, не блокируя цикл событий.
+    """
+    while chunk := await asyncio.to_thread(file.read, chunk_size):
+        yield chunk
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Импорт истории питания и веса из CSV или JSON."
+    )
+    parser.add_argument("telegram_id", type=int)
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=["csv", "json"], default=None)
+    args = parser.parse_args()
+
+    file_format = args.format or (
+        "csv" if args.path.suffix.lower() == ".csv" else "json"
+    )
+    try:
+        with open(args.path, "rb") as f:
+            result = await import_diary_from_stream(
+                args.telegram_id, iter_file_chunks(f), file_format
+            )
+    finally:
+        await http_client_pool.aclose()
+
+    for error in result.errors:
+        logger.warning(error)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
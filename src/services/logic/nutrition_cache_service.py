@@ -0,0 +1,196 @@
+import base64
+import hashlib
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+
+from src.settings import settings
+from src.services.cache.lru_cache import LRUCache
+from src.services.db.nutrition_cache_repository import (
+    get_cached_nutrition,
+    save_cached_nutrition,
+)
+from src.services.logic.recognition_scheduler import recognition_scheduler
+from src.services.logic.chat_gpt_service import (
+    retrieve_nutrition_data,
+    retrieve_nutrition_data_batch,
+    parse_nutrition_response,
+    parse_nutrition_response_batch,
+)
+
+
+logger = logging.getLogger(__name__)
+
+_memory_cache = LRUCache(
+    maxsize=settings.nutrition_cache_size,
+    ttl_seconds=settings.nutrition_cache_ttl_seconds,
+)
+_db_stats = {"hits": 0, "misses": 0}
+
+
+def normalize_description(description: str) -> str:
+    """
+    Приводит описание еды к каноническому виду: нижний регистр, ё -> е,
+    без пунктуации по краям и с одиночными пробелами.
+    """
+    text = description.lower().replace("ё", "е")
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" .,!?;:")
+
+
+def make_cache_key(
+    description: str,
+    image_base64: Optional[str] = None,
+    image_hash: Optional[str] = None,
+) -> str:
+    """
+    Ключ кэша: хэш нормализованного текста, перцептивный хэш фотографии
+    (если он посчитан) или хэш содержимого фотографии.
+    """
+    if image_hash:
+        return f"image:{image_hash}"
+    if image_base64:
+        digest = hashlib.sha256(base64.b64decode(image_base64)).hexdigest()
+        return f"image:{digest}"
+    digest = hashlib.sha256(normalize_description(description).encode()).hexdigest()
+    return f"text:{digest}"
+
+
+async def get_nutrition_info(
+    description: str,
+    image_base64: Optional[str] = None,
+    *,
+    user_id: int,
+    image_hash: Optional[str] = None,
+) -> tuple[Optional[dict], Optional[str]]:
+    """
+    Возвращает разобранные данные о КБЖУ (nutrition_info, error), как
+    parse_nutrition_response. Сначала ищет результат в памяти, затем в БД,
+    и только при промахе обращается к языковой модели. Обращения вне памяти
+    проходят через планировщик распознавания с лимитами на пользователя user_id.
+    """
+    cache_key = make_cache_key(description, image_base64, image_hash)
+
+    nutrition_info = _memory_cache.get(cache_key)
+    if nutrition_info is not None:
+        return dict(nutrition_info), None
+
+    nutrition_info, error = await recognition_scheduler.run(
+        user_id,
+        cache_key,
+        lambda: _load_nutrition_info(cache_key, description, image_base64),
+    )
+    return (dict(nutrition_info) if nutrition_info else None), error
+
+
+async def get_nutrition_info_batch(
+    descriptions: list[str], user_id: int
+) -> list[tuple[Optional[dict], Optional[str]]]:
+    """
+    Пакетный вариант get_nutrition_info: позиции, которых нет в кэше,
+    распознаются одним запросом к языковой модели. Возвращает пары
+    (nutrition_info, error) в порядке descriptions.
+    """
+    cache_keys = [make_cache_key(description) for description in descriptions]
+    results: list[Optional[tuple]] = [None] * len(descriptions)
+    for idx, cache_key in enumerate(cache_keys):
+        nutrition_info = _memory_cache.get(cache_key)
+        if nutrition_info is None:
+            nutrition_info = await _get_from_db(cache_key)
+        if nutrition_info is not None:
+            results[idx] = (dict(nutrition_info), None)
+
+    missing = [idx for idx, result in enumerate(results) if result is None]
+    if missing:
+        recognized = await recognition_scheduler.run(
+            user_id,
+            ("batch", *(cache_keys[idx] for idx in missing)),
+            lambda: _recognize_batch(
+                [cache_keys[idx] for idx in missing],
+                [descriptions[idx] for idx in missing],
+            ),
+        )
+        for idx, (nutrition_info, error) in zip(missing, recognized):
+            results[idx] = (dict(nutrition_info) if nutrition_info else None), error
+
+    return results
+
+
+async def _load_nutrition_info(
+    cache_key: str, description: str, image_base64: Optional[str]
+) -> tuple[Optional[dict], Optional[str]]:
+    nutrition_info = await _get_from_db(cache_key)
+    if nutrition_info is not None:
+        return nutrition_info, None
+
+    response_text = await retrieve_nutrition_data(
+        product_name=description, image_base64=image_base64
+    )
+    nutrition_info, error = await parse_nutrition_response(response_text)
+    if error:
+        return None, error
+
+    await _store(cache_key, nutrition_info)
+    return nutrition_info, None
+
+
+async def _recognize_batch(
+    cache_keys: list[str], descriptions: list[str]
+) -> list[tuple[Optional[dict], Optional[str]]]:
+    response_text = await retrieve_nutrition_data_batch(descriptions)
+    results = await parse_nutrition_response_batch(
+        response_text, len(descriptions)
+    )
+    for cache_key, (nutrition_info, error) in zip(cache_keys, results):
+        if not error:
+            await _store(cache_key, nutrition_info)
+    return results
+
+
+async def _get_from_db(cache_key: str) -> Optional[dict]:
+    """
+    Второй уровень кэша. При попадании кладёт результат в память.
+    """
+    if not settings.nutrition_cache_db_enabled:
+        return None
+
+    created_after = datetime.now() - timedelta(
+        seconds=settings.nutrition_cache_ttl_seconds
+    )
+    try:
+        nutrition_info = await get_cached_nutrition(cache_key, created_after)
+    except Exception as e:
+        logger.error(f"Ошибка чтения кэша КБЖУ: {str(e)}")
+        nutrition_info = None
+
+    if nutrition_info is None:
+        _db_stats["misses"] += 1
+        return None
+
+    _db_stats["hits"] += 1
+    _memory_cache.set(cache_key, nutrition_info)
+    return nutrition_info
+
+
+async def _store(cache_key: str, nutrition_info: dict) -> None:
+    _memory_cache.set(cache_key, dict(nutrition_info))
+    if settings.nutrition_cache_db_enabled:
+        try:
+            await save_cached_nutrition(cache_key, nutrition_info)
+        except Exception as e:
+            logger.error(f"Ошибка записи кэша КБЖУ: {str(e)}")
+
+
+def get_nutrition_cache_stats() -> dict:
+    """
+    Счётчики попаданий и промахов кэша КБЖУ по уровням.
+    """
+    return {
+        "memory": _memory_cache.stats(),
+        "db": {
+            "enabled": settings.nutrition_cache_db_enabled,
+            "hits": _db_stats["hits"],
+            "misses": _db_stats["misses"],
+        },
+    }
@@ -9,6 +9,8 @@ from src.services.db.user_nutrition_repository import (
     get_nutrition_by_profile_id,
     create_or_update_nutrition_by_profile_id,
 )
+from src.services.logic.achievements_service import publish_achievement_events
+from src.services.logic.achievement_rules import AchievementEvent
 from src.models.user_nutrition import UserNutrition
 
 
@@ -61,3 +63,4 @@ async def create_or_update_profile_and_nutrition_by_telegram_id(
     )
 
     await create_or_update_nutrition_by_profile_id(user_profile.id, nutrition_data)
+    await publish_achievement_events(user.id, AchievementEvent.PROFILE_UPDATED)
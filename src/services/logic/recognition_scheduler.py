@@ -0,0 +1,66 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Hashable
+
+from src.settings import settings
+from src.services.cache.single_flight import SingleFlight
+
+
+class RecognitionScheduler:
+    """
+    Планировщик распознавания еды. Ограничивает число одновременных запросов
+    к языковой модели на пользователя и в целом, ставя лишние запросы в очередь.
+    Пользователь занимает не больше per_user_limit общих слотов, поэтому серия
+    сообщений от одного пользователя не вытесняет остальных. Одинаковые запросы,
+    которые уже выполняются, объединяются в один.
+    """
+
+    def __init__(self, per_user_limit: int, global_limit: int):
+        self._per_user_limit = per_user_limit
+        self._global_semaphore = asyncio.Semaphore(global_limit)
+        self._user_semaphores: dict[int, asyncio.Semaphore] = {}
+        self._user_tasks: dict[int, int] = {}
+        self._in_flight = SingleFlight()
+
+    @asynccontextmanager
+    async def _user_slot(self, user_id: int):
+        semaphore = self._user_semaphores.setdefault(
+            user_id, asyncio.Semaphore(self._per_user_limit)
+        )
+        self._user_tasks[user_id] = self._user_tasks.get(user_id, 0) + 1
+        try:
+            async with semaphore:
+                yield
+        finally:
+            self._user_tasks[user_id] -= 1
+            if not self._user_tasks[user_id]:
+                del self._user_tasks[user_id]
+                del self._user_semaphores[user_id]
+
+    async def run(
+        self, user_id: int, key: Hashable, recognize: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Выполняет recognize в пределах лимитов. Если запрос с тем же key уже
+        выполняется, дожидается его результата вместо нового вызова.
+        """
+
+        async def limited():
+            async with self._user_slot(user_id):
+                async with self._global_semaphore:
+                    return await recognize()
+
+        return await self._in_flight.run(key, limited)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "active_users": len(self._user_tasks),
+            "coalesced": self._in_flight.coalesced,
+        }
+
+
+recognition_scheduler = RecognitionScheduler(
+    per_user_limit=settings.recognition_per_user_limit,
+    global_limit=settings.recognition_global_limit,
+)
@@ -0,0 +1,162 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Literal
+
+from src.services.db.user_repository import get_user_by_telegram_id
+from src.services.db.user_profile_repository import get_user_profile_by_user_id
+from src.services.db.user_nutrition_repository import get_nutrition_by_profile_id
+from src.services.db.user_food_log_repository import stream_saved_food_logs
+from src.services.db.user_weight_history_repository import stream_weight_records
+
+
+ExportFormat = Literal["txt", "csv", "jsonl"]
+
+# Колонки CSV совпадают с форматом импорта дневника
+CSV_COLUMNS = [
+    "date_added",
+    "food_name",
+    "calories",
+    "proteins",
+    "fats",
+    "carbohydrates",
+    "fiber",
+    "amount",
+    "rating",
+    "weight",
+]
+
+# Сколько строк собирать в один фрагмент ответа
+_LINES_PER_CHUNK = 200
+
+
+async def _chunked(lines: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Склеивает строки во фрагменты по _LINES_PER_CHUNK, чтобы не отправлять
+    каждую строку отдельно.
+    """
+    buffer = []
+    async for line in lines:
+        buffer.append(line)
+        if len(buffer) >= _LINES_PER_CHUNK:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+def _food_log_record(food_log) -> dict:
+    return {
+        "date_added": food_log.date_added.isoformat(),
+        "food_name": food_log.food_name,
+        "calories": food_log.calories,
+        "proteins": food_log.proteins,
+        "fats": food_log.fats,
+        "carbohydrates": food_log.carbohydrates,
+        "fiber": food_log.fiber,
+        "amount": food_log.amount,
+        "rating": food_log.rating,
+    }
+
+
+async def _txt_lines(user_id: int) -> AsyncIterator[str]:
+    yield "Отчет:\n\n"
+
+    profile = await get_user_profile_by_user_id(user_id)
+    if profile:
+        yield "=== ПРОФИЛЬ ===\n"
+        yield f"Пол: {profile.gender.name}\n"
+        yield f"Рост: {profile.height} см\n"
+        yield f"Вес: {profile.weight} кг\n"
+        yield f"Возраст: {profile.age}\n"
+        yield f"Уровень активности: {profile.activity_level.name}\n"
+        yield f"Цель: {profile.goal.name}\n"
+        if profile.target_weight:
+            yield f"Целевой вес: {profile.target_weight} кг\n"
+        yield "\n"
+
+        nutrition = await get_nutrition_by_profile_id(profile.id)
+        if nutrition:
+            yield "=== РАСЧЁТНЫЕ ПАРАМЕТРЫ ПИТАНИЯ ===\n"
+            yield f"Калории: {nutrition.calories:.1f}\n"
+            yield f"Белки: {nutrition.proteins:.1f} г\n"
+            yield f"Жиры: {nutrition.fats:.1f} г\n"
+            yield f"Углеводы: {nutrition.carbohydrates:.1f} г\n"
+            yield "\n"
+
+    header_written = False
+    async for fl in stream_saved_food_logs(user_id):
+        if not header_written:
+            yield "=== ПРИЕМЫ ПИЩИ ===\n"
+            header_written = True
+        dt_str = fl.date_added.strftime("%Y-%m-%d %H:%M")
+        yield f"{dt_str} | {fl.food_name} | {fl.calories} ккал\n"
+    if header_written:
+        yield "\n"
+
+    header_written = False
+    async for wr in stream_weight_records(user_id):
+        if not header_written:
+            yield "=== ИСТОРИЯ ВЕСА ===\n"
+            header_written = True
+        yield f"{wr.date_added.strftime('%Y-%m-%d %H:%M')} -> {wr.weight} кг\n"
+    if header_written:
+        yield "\n"
+
+
+async def _csv_lines(user_id: int) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+
+    def take() -> str:
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writeheader()
+    yield take()
+    async for food_log in stream_saved_food_logs(user_id):
+        writer.writerow(_food_log_record(food_log))
+        yield take()
+    async for record in stream_weight_records(user_id):
+        writer.writerow(
+            {"date_added": record.date_added.isoformat(), "weight": record.weight}
+        )
+        yield take()
+
+
+async def _jsonl_lines(user_id: int) -> AsyncIterator[str]:
+    async for food_log in stream_saved_food_logs(user_id):
+        record = {"type": "food", **_food_log_record(food_log)}
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+    async for record in stream_weight_records(user_id):
+        weight_record = {
+            "type": "weight",
+            "date_added": record.date_added.isoformat(),
+            "weight": record.weight,
+        }
+        yield json.dumps(weight_record, ensure_ascii=False) + "\n"
+
+
+async def stream_user_export(
+    telegram_id: int, export_format: ExportFormat
+) -> AsyncIterator[str]:
+    """
+    Выгрузка всей истории пользователя: приемов пищи и веса. Пользователь
+    проверяется сразу (ValueError до начала потока), затем возвращается
+    генератор фрагментов текста. Записи читаются курсором, поэтому расход
+    памяти не зависит от размера истории. txt — отчет с профилем и нормой,
+    csv и jsonl — записи в формате импорта дневника.
+    """
+    user = await get_user_by_telegram_id(telegram_id)
+    if not user:
+        raise ValueError("Пользователь не найден.")
+
+    if export_format == "csv":
+        lines = _csv_lines(user.id)
+    elif export_format == "jsonl":
+        lines = _jsonl_lines(user.id)
+    else:
+        lines = _txt_lines(user.id)
+    return _chunked(lines)
@@ -1,12 +1,16 @@
-from datetime import datetime
+from datetime import date, datetime
 
 from src.services.db.user_repository import get_user_by_telegram_id
 from src.services.db.user_food_log_repository import (
     create_food_log,
+    create_food_logs,
     get_last_food_logs,
     update_food_save_status,
     get_food_logs_by_user_id_and_day,
+    get_daily_intake_in_range,
 )
+from src.services.logic.achievements_service import publish_achievement_events
+from src.services.logic.achievement_rules import AchievementEvent
 from src.models.user_food_log import UserFoodLog
 
 
@@ -28,6 +32,19 @@ async def create_food_log_by_telegram_user_id(
     )
 
 
+async def create_food_logs_by_telegram_user_id(
+    telegram_user_id: int, entries: list[dict]
+) -> None:
+    """
+    Создает несколько записей о приеме пищи по telegram_id одним запросом.
+    """
+    user = await get_user_by_telegram_id(telegram_user_id)
+    if not user:
+        raise ValueError("Пользователь не найден")
+
+    await create_food_logs(user_id=user.id, entries=entries)
+
+
 async def update_food_save_status_by_telegram_user_id(
     telegram_user_id: int, entry_uuid: str, action: str
 ) -> tuple[str, UserFoodLog]:
@@ -38,7 +55,10 @@ async def update_food_save_status_by_telegram_user_id(
     if not user:
         raise ValueError("Пользователь не найден.")
 
-    return await update_food_save_status(user.id, entry_uuid, action)
+    message_text, food_log = await update_food_save_status(user.id, entry_uuid, action)
+    if action == "save_food":
+        await publish_achievement_events(user.id, AchievementEvent.FOOD_LOG_SAVED)
+    return message_text, food_log
 
 
 async def get_food_logs_by_telegram_user_id(telegram_user_id: int, day_start: datetime):
@@ -54,6 +74,21 @@ async def get_food_logs_by_telegram_user_id(telegram_user_id: int, day_start: da
     return await get_food_logs_by_user_id_and_day(user.id, day_start)
 
 
+async def get_daily_intake_in_range_by_telegram_user_id(
+    telegram_user_id: int, range_start: datetime, range_end: datetime
+) -> dict[date, dict]:
+    """
+    1. Ищем пользователя по telegram_user_id.
+    2. Если нет - ошибка.
+    3. Если есть, возвращаем сохранённые логи и суммы КБЖУ по дням за период.
+    """
+    user = await get_user_by_telegram_id(telegram_user_id)
+    if not user:
+        raise ValueError("Пользователь не найден.")
+
+    return await get_daily_intake_in_range(user.id, range_start, range_end)
+
+
 async def get_last_food_logs_by_telegram_user_id(
     telegram_user_id: int, limit: int = 10
 ):
@@ -3,6 +3,8 @@ from src.services.db.user_weight_history_repository import (
     create_weight_record,
     get_weight_history_by_user_id,
 )
+from src.services.logic.achievements_service import publish_achievement_events
+from src.services.logic.achievement_rules import AchievementEvent
 
 
 async def create_weight_record_by_telegram_id(telegram_id: int, new_weight: float):
@@ -13,6 +15,7 @@ async def create_weight_record_by_telegram_id(telegram_id: int, new_weight: floa
     if not user:
         raise ValueError("Пользователь с таким telegram_id не найден")
     record = await create_weight_record(user.id, new_weight)
+    await publish_achievement_events(user.id, AchievementEvent.WEIGHT_RECORDED)
     return record
 
 
@@ -0,0 +1,18 @@
+import io
+
+
+class BoundedBuffer(io.BytesIO):
+    """
+    Буфер в памяти, который не даёт записать больше max_bytes байт.
+    """
+
+    def __init__(self, max_bytes: int):
+        super().__init__()
+        self.max_bytes = max_bytes
+
+    def write(self, data) -> int:
+        if self.tell() + len(data) > self.max_bytes:
+            raise ValueError(
+                f"Размер файла превышает допустимые {self.max_bytes} байт"
+            )
+        return super().write(data)
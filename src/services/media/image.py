@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import importlib.util
+import io
+import logging
+from dataclasses import dataclass
+
+from aiogram import Bot
+from aiogram.types import PhotoSize
+
+from src.settings import settings
+from src.services.media.buffer import BoundedBuffer
+
+
+logger = logging.getLogger(__name__)
+
+# Пережатие фотографий и перцептивный хэш доступны только с Pillow.
+PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+# Сторона сетки difference hash: 16 x 16 = 256 бит
+_HASH_SIZE = 16
+
+
+@dataclass
+class PreparedImage:
+    """
+    Фотография, подготовленная для отправки в языковую модель.
+    """
+
+    data: bytes
+    image_hash: str
+
+
+def select_photo_size(photos: list[PhotoSize], target_side: int) -> PhotoSize:
+    """
+    Выбирает наименьший размер фотографии, у которого большая сторона не меньше
+    target_side. Если такого нет, возвращает самый большой.
+    """
+    ordered = sorted(photos, key=lambda photo: photo.width * photo.height)
+    for photo in ordered:
+        if max(photo.width, photo.height) >= target_side:
+            return photo
+    return ordered[-1]
+
+
+async def download_photo(bot: Bot, photo: PhotoSize) -> bytes:
+    """
+    Скачивает фотографию в память, не превышая photo_max_bytes.
+    """
+    if photo.file_size and photo.file_size > settings.photo_max_bytes:
+        raise ValueError("Фотография слишком большая")
+
+    buffer = BoundedBuffer(settings.photo_max_bytes)
+    await bot.download(photo.file_id, destination=buffer)
+    return buffer.getvalue()
+
+
+def _difference_hash(image) -> str:
+    """
+    Перцептивный difference hash: сравнение яркости соседних пикселей
+    уменьшенной чёрно-белой копии. Не меняется при пережатии и масштабе.
+    """
+    small = image.convert("L").resize((_HASH_SIZE + 1, _HASH_SIZE))
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(_HASH_SIZE):
+        offset = row * (_HASH_SIZE + 1)
+        for col in range(_HASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{bits:0{_HASH_SIZE * _HASH_SIZE // 4}x}"
+
+
+def _prepare_image_sync(data: bytes) -> PreparedImage:
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image.thumbnail((settings.photo_max_side, settings.photo_max_side))
+        image_hash = _difference_hash(image)
+
+        output = io.BytesIO()
+        image.save(
+            output, format="JPEG", quality=settings.photo_jpeg_quality, optimize=True
+        )
+
+    prepared = output.getvalue()
+    # Пережатие не должно увеличивать уже компактный файл
+    if len(prepared) >= len(data):
+        prepared = data
+    return PreparedImage(data=prepared, image_hash=f"dhash:{image_hash}")
+
+
+async def prepare_image(data: bytes) -> PreparedImage:
+    """
+    Уменьшает фотографию до photo_max_side по большей стороне, пережимает в
+    JPEG с качеством photo_jpeg_quality и считает перцептивный хэш для кэша.
+    Без Pillow или при ошибке разбора отдаёт исходные байты и хэш содержимого.
+    """
+    if PIL_AVAILABLE:
+        try:
+            return await asyncio.to_thread(_prepare_image_sync, data)
+        except Exception as e:
+            logger.error(f"Ошибка подготовки фотографии: {str(e)}")
+
+    return PreparedImage(
+        data=data, image_hash=f"sha256:{hashlib.sha256(data).hexdigest()}"
+    )
@@ -0,0 +1,85 @@
+import asyncio
+import io
+import logging
+import shutil
+
+from aiogram import Bot
+
+from src.settings import settings
+from src.services.media.buffer import BoundedBuffer
+
+
+logger = logging.getLogger(__name__)
+
+# Моно, удаление тишины в начале и пауз длиннее секунды, Opus 24 кбит/с
+_FFMPEG_ARGS = [
+    "-hide_banner",
+    "-loglevel",
+    "error",
+    "-i",
+    "pipe:0",
+    "-ac",
+    "1",
+    "-af",
+    "silenceremove=start_periods=1:start_threshold=-50dB:"
+    "stop_periods=-1:stop_threshold=-50dB:stop_duration=1",
+    "-c:a",
+    "libopus",
+    "-b:a",
+    "24k",
+    "-f",
+    "ogg",
+    "pipe:1",
+]
+
+
+async def download_voice(bot: Bot, file_id: str, file_size: int | None) -> io.BytesIO:
+    """
+    Скачивает голосовое сообщение в память, не превышая voice_max_bytes.
+    Возвращает буфер, перемотанный в начало.
+    """
+    if file_size and file_size > settings.voice_max_bytes:
+        raise ValueError("Голосовое сообщение слишком большое")
+
+    buffer = BoundedBuffer(settings.voice_max_bytes)
+    await bot.download(file_id, destination=buffer)
+    buffer.seek(0)
+    return buffer
+
+
+async def preprocess_voice(audio: io.BytesIO) -> io.BytesIO:
+    """
+    Сводит аудио в моно и вырезает тишину через ffmpeg (stdin/stdout, без
+    временных файлов). Если предобработка выключена, ffmpeg не установлен
+    или завершился с ошибкой, возвращает исходный буфер.
+    """
+    if not settings.voice_preprocess_enabled:
+        return audio
+
+    ffmpeg_path = shutil.which("ffmpeg")
+    if not ffmpeg_path:
+        logger.warning("ffmpeg не найден, предобработка аудио пропущена")
+        return audio
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            ffmpeg_path,
+            *_FFMPEG_ARGS,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await asyncio.wait_for(
+            process.communicate(audio.getvalue()), timeout=30
+        )
+    except Exception as e:
+        logger.error(f"Ошибка предобработки аудио: {str(e)}")
+        audio.seek(0)
+        return audio
+
+    if process.returncode != 0 or not stdout:
+        logger.error(f"ffmpeg завершился с ошибкой: {stderr.decode(errors='ignore')}")
+        audio.seek(0)
+        return audio
+
+    return io.BytesIO(stdout)